@@ -0,0 +1,83 @@
+"""
+Benchmark of concurrent appends to CSV storage: throughput of processes adding
+transactions one by one at the same time, with appends queued under contention and
+committed in groups, against every append taking the lock and syncing to disk on its own.
+
+Disks syncing faster than storage devices usually do, e.g. virtual disks with host
+caching, can be slowed down to a given fsync latency with --sync-latency.
+
+Usage: python benchmarks/bench_concurrent_add.py [--processes 1 2 4 8] [--adds N]
+                                                 [--dir DIR] [--sync-latency MS]
+"""
+
+import argparse
+import datetime
+import multiprocessing
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from personal_wallet.models.storage import CsvStorage
+from personal_wallet.models.transaction import Transaction
+
+
+def add(file: Path, adds: int, grouped: bool, sync_latency: float, start) -> None:
+    if sync_latency:
+        fsync = os.fsync
+
+        def slow_fsync(fd):
+            fsync(fd)
+            time.sleep(sync_latency)
+
+        os.fsync = slow_fsync
+    storage = CsvStorage(file)
+    transaction = Transaction(datetime.datetime(2024, 5, 1), 500, "expenses", "Benchmark")
+    append = storage.append_data if grouped else lambda t: storage.extend_data([t])
+    start.wait()
+    for _ in range(adds):
+        append(transaction)
+
+
+def measure(
+    directory: Path, processes: int, adds: int, grouped: bool, sync_latency: float
+) -> float:
+    """Return transactions added per second by all the processes."""
+    file = directory / f"transactions-{processes}-{grouped}.csv"
+    start = multiprocessing.Event()
+    workers = [
+        multiprocessing.Process(target=add, args=(file, adds, grouped, sync_latency, start))
+        for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    started = time.perf_counter()
+    start.set()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    rows = sum(1 for _ in CsvStorage(file).iter_data())
+    assert rows == processes * adds, f"{rows} rows instead of {processes * adds}"
+    return rows / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--adds", type=int, default=200, help="Transactions per process")
+    parser.add_argument("--dir", type=Path, help="Directory on the disk to test")
+    parser.add_argument("--sync-latency", type=float, default=0, help="Added to fsync, ms")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+        print(f"{'processes':>9}{'serial adds/s':>16}{'grouped adds/s':>16}{'speedup':>9}")
+        for processes in args.processes:
+            options = (processes, args.adds)
+            latency = args.sync_latency / 1000
+            serial = measure(Path(directory), *options, grouped=False, sync_latency=latency)
+            grouped = measure(Path(directory), *options, grouped=True, sync_latency=latency)
+            print(f"{processes:>9}{serial:>16.0f}{grouped:>16.0f}{grouped / serial:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
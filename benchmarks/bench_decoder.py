@@ -0,0 +1,54 @@
+"""
+Benchmark of csv rows decoding: csv.DictReader with Transaction.from_csv_row against
+CsvRowDecoder used by CsvStorage.
+
+Usage: python benchmarks/bench_decoder.py [--rows N]
+"""
+
+import argparse
+import csv
+import tempfile
+import time
+from pathlib import Path
+
+from ledger import write_ledger
+from personal_wallet.models.csv_decoder import CsvRowDecoder
+from personal_wallet.models.transaction import Transaction
+
+
+def decode_with_dict_reader(file: Path) -> int:
+    with open(file, "r", encoding="utf-8") as csvfile:
+        return sum(1 for row in csv.DictReader(csvfile) if Transaction.from_csv_row(row))
+
+
+def decode_with_row_decoder(file: Path) -> int:
+    with open(file, "r", encoding="utf-8") as csvfile:
+        reader = csv.reader(csvfile)
+        decode = CsvRowDecoder(next(reader)).decode
+        return sum(1 for row in reader if decode(row))
+
+
+def measure(name: str, decode, file: Path) -> float:
+    started = time.perf_counter()
+    rows = decode(file)
+    elapsed = time.perf_counter() - started
+    rate = rows / elapsed
+    print(f"{name:<24}{rows:>10} rows{elapsed:>10.3f} s{rate:>14,.0f} rows/s")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Rows in synthetic ledger")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        file = Path(directory) / "transactions.csv"
+        write_ledger(file, args.rows)
+        baseline = measure("DictReader+strptime", decode_with_dict_reader, file)
+        optimized = measure("CsvRowDecoder", decode_with_row_decoder, file)
+    print(f"Speedup: {optimized / baseline:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark of filtering transactions: chain of isinstance checks against compiled queries.
+
+Transactions are filtered in a list and as rows of TransactionTable.
+
+Usage: python benchmarks/bench_query.py [--rows N]
+"""
+
+import argparse
+import datetime
+import re
+import tempfile
+import time
+from pathlib import Path
+
+from ledger import write_ledger
+from personal_wallet.models.query import Query
+from personal_wallet.models.storage import CsvStorage
+
+# Filters of typical `find` queries as (date, amount, category, description).
+QUERIES = {
+    "category": (None, None, "expenses", None),
+    "amount": (None, 350, None, None),
+    "month, category": (
+        (datetime.datetime(2020, 5, 1), datetime.datetime(2020, 5, 31)),
+        None,
+        "expenses",
+        None,
+    ),
+    "%coffee%": (None, None, None, re.compile(".*?coffee")),
+    "Rent%, amount range": (None, (100_000, 200_000), None, re.compile("^Rent.*?")),
+    "regex pattern": (None, None, "income", re.compile(".*?S.l.ry")),
+}
+
+
+def matches(transaction, date, amount, category, description) -> bool:
+    """Return whether transaction matches the filters, dispatching every filter on its type,
+    as transactions were filtered before queries were compiled."""
+    return not (
+        category is not None
+        and transaction.category != category
+        or date is not None
+        and (
+            isinstance(date, datetime.datetime)
+            and transaction.date != date
+            or isinstance(date, tuple)
+            and not date[0] <= transaction.date <= date[1]
+        )
+        or amount is not None
+        and (
+            isinstance(amount, int)
+            and transaction.amount != amount
+            or isinstance(amount, tuple)
+            and not amount[0] <= transaction.amount <= amount[1]
+        )
+        or description is not None
+        and (
+            isinstance(description, str)
+            and transaction.description != description
+            or isinstance(description, re.Pattern)
+            and re.search(description, transaction.description or "") is None
+        )
+    )
+
+
+def per_row(filter_rows, rows: int) -> float:
+    """Return nanoseconds per row of filtering all the rows."""
+    started = time.perf_counter()
+    found = filter_rows()
+    elapsed = time.perf_counter() - started
+    assert found is not None
+    return elapsed / rows * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Rows in synthetic ledger")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        storage = CsvStorage(Path(directory) / "transactions.csv")
+        write_ledger(storage.file, args.rows)
+        transactions = storage.read_data()
+        table = storage.read_table()
+
+    print(
+        f"{'query':<24}{'matches':>12}{'compiled':>12}"
+        f"{'table matches':>16}{'table compiled':>16}{'found':>10}"
+    )
+    for name, filters in QUERIES.items():
+        query = Query(*filters)
+        predicate, row_predicate = query.predicate(), query.row_predicate(table)
+        positions = range(len(table))
+        results = [
+            per_row(lambda: [t for t in transactions if matches(t, *filters)], args.rows),
+            per_row(lambda: list(filter(predicate, transactions)), args.rows),
+            # Tables were filtered creating a transaction of each row.
+            per_row(lambda: [i for i in positions if matches(table[i], *filters)], args.rows),
+            per_row(lambda: list(filter(row_predicate, positions)), args.rows),
+        ]
+        found = sum(map(row_predicate, positions))
+        print(
+            f"{name:<24}{results[0]:>9.0f} ns{results[1]:>9.0f} ns"
+            f"{results[2]:>13.0f} ns{results[3]:>13.0f} ns{found:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark of CLI startup: wall time of short commands and modules imported by them,
+as reported by `python -X importtime`.
+
+With --baseline the same is measured for another git revision, checked out into a
+temporary worktree, to show the difference.
+
+Usage: python benchmarks/bench_startup.py [--runs N] [--baseline REV]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parents[1]
+
+COMMANDS = [["--version"], ["--help"], ["balance"], ["find", "-i", "0"]]
+
+
+def run(src_dir: Path, data_dir: Path, args: list[str], importtime: bool = False):
+    """Run command with the package from src_dir, return wall time and stderr."""
+    options = [] if args[0].startswith("--") else ["--data-path", str(data_dir)]
+    options += [] if args[0].startswith("--") else ["--config", os.devnull]
+    argv = [sys.executable, *(["-X", "importtime"] if importtime else [])]
+    argv += ["-m", "personal_wallet", *args, *options]
+    env = {**os.environ, "PYTHONPATH": str(src_dir)}
+    started = time.perf_counter()
+    result = subprocess.run(argv, env=env, capture_output=True, text=True, check=True)
+    return time.perf_counter() - started, result.stderr
+
+
+def imports(stderr: str) -> tuple[int, list[tuple[int, str]]]:
+    """Return total import time in microseconds and cumulative times of top level
+    imports, parsed from -X importtime output."""
+    total = 0
+    top_level = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time, cumulative, name = line[len("import time:") :].split("|")
+        total += int(self_time)
+        if not name.startswith("  "):
+            top_level.append((int(cumulative), name.strip()))
+    return total, sorted(top_level, reverse=True)
+
+
+def measure(name: str, src_dir: Path, runs: int) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as data_dir:
+        for args in COMMANDS:
+            times = [run(src_dir, Path(data_dir), args)[0] for _ in range(runs)]
+            total, top_level = imports(run(src_dir, Path(data_dir), args, importtime=True)[1])
+            command = " ".join(args)
+            results[command] = statistics.median(times)
+            print(
+                f"{name:<10}{command:<16}{statistics.median(times) * 1000:>9.1f} ms wall"
+                f"{total / 1000:>9.1f} ms imports"
+                f"{len(top_level):>5} top-level modules"
+            )
+            if command == "balance":
+                slowest = ", ".join(f"{module} {us / 1000:.1f} ms" for us, module in top_level[:5])
+                print(f"{'':<26}slowest: {slowest}")
+    return results
+
+
+@contextmanager
+def worktree(revision: str):
+    """Check out revision into a temporary git worktree, yielding its directory."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "worktree"
+        subprocess.run(
+            ["git", "-C", REPO_DIR, "worktree", "add", "--detach", path, revision],
+            check=True,
+            capture_output=True,
+        )
+        try:
+            yield path
+        finally:
+            subprocess.run(
+                ["git", "-C", REPO_DIR, "worktree", "remove", "--force", path],
+                check=True,
+                capture_output=True,
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="Runs of every command")
+    parser.add_argument("--baseline", help="Git revision to compare with")
+    args = parser.parse_args()
+
+    current = measure("current", REPO_DIR / "src", args.runs)
+    if args.baseline:
+        with worktree(args.baseline) as path:
+            baseline = measure(args.baseline[:10], path / "src", args.runs)
+        for command, elapsed in current.items():
+            print(f"{command:<16}{elapsed / baseline[command]:>7.2f}x of baseline time")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Benchmark of loading a wallet: list of Transaction objects against TransactionTable.
+
+Usage: python benchmarks/bench_table.py [--rows N]
+"""
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from ledger import write_ledger
+from personal_wallet.models.storage import CsvStorage
+
+
+def measure(name: str, load) -> None:
+    started = time.perf_counter()
+    transactions = load()
+    elapsed = time.perf_counter() - started
+    del transactions
+
+    # Memory is traced on a separate run, since tracing slows loading down.
+    tracemalloc.start()
+    transactions = load()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{name:<24}{len(transactions):>10} rows{elapsed:>10.3f} s{memory / 2**20:>10.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Rows in synthetic ledger")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        storage = CsvStorage(Path(directory) / "transactions.csv")
+        write_ledger(storage.file, args.rows)
+        measure("list[Transaction]", storage.read_data)
+        measure("TransactionTable", storage.read_table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Deterministic synthetic ledger generator for benchmarks.
+
+Ledgers look like years of personal finance records: dates mostly go up as transactions
+are added, with some entered late, income comes as salary twice a month and a few
+irregular payments, expense descriptions follow a long-tailed distribution of
+merchants with some one-off transfers and missing descriptions, and amounts are
+log-normally distributed around a typical amount of every description.
+
+Usage: python benchmarks/ledger.py ROWS FILE [--seed N]
+"""
+
+import argparse
+import csv
+import datetime
+import random
+from pathlib import Path
+from typing import Iterator
+
+from personal_wallet.models.transaction import Transaction
+
+SIZES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+
+START_DATE = datetime.date(2015, 1, 1)
+
+# Transactions per day, so larger ledgers span more years.
+DAILY_RATE = 40
+
+INCOME = [("Salary", 250_000), ("Freelance", 60_000), ("Interest", 1_500), ("Refund", 3_000)]
+
+MERCHANTS = [
+    ("Groceries", 4_500),
+    ("Bought coffee", 350),
+    ("Lunch", 900),
+    ("Taxi", 1_200),
+    ("Public transport", 250),
+    ("Fuel", 4_000),
+    ("Pharmacy", 1_500),
+    ("Rent", 120_000),
+    ("Electricity bill", 6_000),
+    ("Mobile phone", 1_000),
+    ("Internet", 1_200),
+    ("Ordered food delivery", 1_700),
+    ("Restaurant", 5_500),
+    ("Cinema", 1_400),
+    ("Books", 2_000),
+    ("Clothes", 8_000),
+    ("Gym membership", 4_000),
+    ("Streaming subscription", 800),
+    ("Hardware store", 3_500),
+    ("Gift", 5_000),
+    ("Haircut", 2_000),
+    ("Pet food", 2_500),
+    ("Car service", 25_000),
+    ("Insurance", 15_000),
+    ("Flight tickets", 40_000),
+    ("Hotel", 30_000),
+    ("Charity", 1_000),
+    ("Bakery", 300),
+    ("Marketplace order", 6_000),
+    ("Dentist", 12_000),
+]
+
+# Zipf-like weights: a few merchants account for most of the expenses.
+MERCHANT_WEIGHTS = [1 / rank for rank in range(1, len(MERCHANTS) + 1)]
+
+
+def generate_rows(rows: int, seed: int = 0) -> Iterator[tuple[str, int, str, str]]:
+    """Yield date, amount, category and description of synthetic transactions."""
+    rng = random.Random(seed)
+    days = max(1, rows // DAILY_RATE)
+    dates = [str(START_DATE + datetime.timedelta(days=day)) for day in range(days + 31)]
+    transfer = 0
+    for i in range(rows):
+        day = i * days // rows
+        if rng.random() < 0.01:
+            # Entered late.
+            day = max(0, day - rng.randrange(1, 31))
+        date = dates[day]
+
+        if date.endswith(("-01", "-15")) and rng.random() < 0.2 or rng.random() < 0.03:
+            category = "income"
+            description, typical = INCOME[0] if rng.random() < 0.7 else rng.choice(INCOME)
+        else:
+            category = "expenses"
+            roll = rng.random()
+            if roll < 0.03:
+                description, typical = "", 2_000
+            elif roll < 0.08:
+                transfer += 1
+                description, typical = f"Transfer #{transfer:08d}", 10_000
+            else:
+                description, typical = rng.choices(MERCHANTS, MERCHANT_WEIGHTS)[0]
+        amount = max(1, int(rng.lognormvariate(0, 0.5) * typical))
+        yield date, amount, category, description
+
+
+def write_ledger(file: Path, rows: int, seed: int = 0) -> None:
+    """Write synthetic ledger of rows transactions as CsvStorage does."""
+    file.parent.mkdir(parents=True, exist_ok=True)
+    with open(file, "w", encoding="utf-8", newline="") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(Transaction.fieldnames())
+        writer.writerows(generate_rows(rows, seed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("rows", type=int, help="Number of transactions")
+    parser.add_argument("file", type=Path, help="CSV file to write")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+    write_ledger(args.file, args.rows, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Load test of the wallet HTTP JSON API.
+
+Concurrent clients send a mix of balance and find requests with some adds and updates
+over keep-alive connections for the given time, then requests per second and median
+and 99th percentile latency of every kind of request are reported. Without --url the
+`api` command is started on a copy of a synthetic ledger.
+
+Usage: python benchmarks/load_test.py [--url URL] [--size 10k] [--storage csv]
+                                      [--clients N] [--duration S] [--write-ratio R]
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from urllib.parse import quote, urlsplit
+
+from ledger import DAILY_RATE, SIZES, START_DATE
+from suite import CACHE_DIR, prepare
+
+
+def reads(rows: int) -> list[tuple[str, str]]:
+    """Return kind and path of read requests for a ledger of rows transactions."""
+    days = max(1, rows // DAILY_RATE)
+    middle = START_DATE + datetime.timedelta(days=days // 2)
+    week_later = middle + datetime.timedelta(days=7)
+    return [
+        ("balance", "/balance"),
+        ("find index", f"/transactions?index={rows // 2}"),
+        ("find date range", f"/transactions?date={middle}..{week_later}"),
+        ("find amount", "/transactions?amount=350"),
+        ("find description", f"/transactions?description={quote('%coffee%')}"),
+    ]
+
+
+def writes(rows: int, rng: random.Random) -> list[tuple[str, str, str, dict]]:
+    """Return kind, method, path and body of write requests."""
+    return [
+        ("add", "POST", "/transactions", {"amount": 500, "category": "expenses"}),
+        ("update", "PATCH", f"/transactions/{rng.randrange(rows)}", {"amount": 1000}),
+    ]
+
+
+async def client(host, port, rows, deadline, write_ratio, seed, latencies, errors):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    read_requests = reads(rows)
+    try:
+        while time.perf_counter() < deadline:
+            if rng.random() < write_ratio:
+                kind, method, path, body = rng.choice(writes(rows, rng))
+            else:
+                (kind, path), method, body = rng.choice(read_requests), "GET", None
+            payload = b"" if body is None else json.dumps(body).encode("utf-8")
+            started = time.perf_counter()
+            writer.write(
+                f"{method} {path} HTTP/1.1\r\nHost: {host}\r\n"
+                f"Content-Length: {len(payload)}\r\n\r\n".encode("latin-1") + payload
+            )
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while (line := await reader.readline()) != b"\r\n":
+                name, _, value = line.decode("latin-1").partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            latencies.setdefault(kind, []).append(time.perf_counter() - started)
+            if status >= 400:
+                errors[kind] = errors.get(kind, 0) + 1
+    finally:
+        writer.close()
+
+
+async def load(host, port, rows, clients, duration, write_ratio, seed):
+    latencies, errors = {}, {}
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(
+            client(host, port, rows, deadline, write_ratio, seed + number, latencies, errors)
+            for number in range(clients)
+        )
+    )
+    return time.perf_counter() - started, latencies, errors
+
+
+def report(elapsed: float, latencies: dict[str, list[float]], errors: dict[str, int]) -> None:
+    print(f"{'request':<20}{'count':>9}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    everything = [latency for kind in latencies.values() for latency in kind]
+    for kind, times in sorted(latencies.items()) + [("total", everything)]:
+        if len(times) < 2:
+            continue
+        percentiles = statistics.quantiles(times, n=100)
+        count_errors = sum(errors.values()) if kind == "total" else errors.get(kind, 0)
+        print(
+            f"{kind:<20}{len(times):>9}{len(times) / elapsed:>10.1f}"
+            f"{percentiles[49] * 1000:>10.2f}{percentiles[98] * 1000:>10.2f}{count_errors:>8}"
+        )
+
+
+@contextmanager
+def api_server(size: str, storage: str, seed: int, cache_dir: Path):
+    """Start `api` command on a copy of a synthetic ledger, yielding its host and port."""
+    with tempfile.TemporaryDirectory() as directory:
+        data_dir = Path(directory) / "data"
+        prepare(size, seed, storage, data_dir, cache_dir)
+        argv = [sys.executable, "-m", "personal_wallet", "api", "--port", "0"]
+        argv += ["--data-path", str(data_dir), "--storage", storage, "--config", os.devnull]
+        with subprocess.Popen(argv, stdout=subprocess.PIPE, text=True) as process:
+            try:
+                line = process.stdout.readline()
+                if not line.startswith("Serving wallet API on "):
+                    raise RuntimeError(f"API server failed to start: {line}")
+                url = urlsplit(line.split()[-1])
+                yield url.hostname, url.port
+            finally:
+                process.terminate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="URL of a running API server instead of starting one")
+    parser.add_argument("--size", choices=SIZES, default="10k", help="Ledger size")
+    parser.add_argument("--rows", type=int, help="Transactions of the running server")
+    parser.add_argument(
+        "--storage", choices=["csv", "sqlite", "binary", "partitioned", "compressed"], default="csv"
+    )
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent connections")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of load")
+    parser.add_argument("--write-ratio", type=float, default=0.05, help="Share of writes")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--cache-dir", type=Path, default=CACHE_DIR, help="Ledgers directory")
+    args = parser.parse_args()
+    rows = args.rows or SIZES[args.size]
+
+    if args.url:
+        url = urlsplit(args.url)
+        server = nullcontext((url.hostname, url.port))
+    else:
+        server = api_server(args.size, args.storage, args.seed, args.cache_dir)
+    with server as (host, port):
+        elapsed, latencies, errors = asyncio.run(
+            load(host, port, rows, args.clients, args.duration, args.write_ratio, args.seed)
+        )
+    print(f"{args.clients} clients, {elapsed:.1f} s, {args.write_ratio:.0%} writes")
+    report(elapsed, latencies, errors)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Benchmark suite of wallet commands on synthetic ledgers.
+
+Every command runs as a separate `python -m personal_wallet` process, so timings include
+interpreter and CLI startup, and peak memory is the resident set size of that process.
+Ledgers are generated once per size and seed and kept in the cache directory; commands
+run on a copy of them.
+
+Usage: python benchmarks/suite.py [--sizes 10k 1m 10m] [--storage csv sqlite binary]
+                                  [--repeat N] [--output FILE] [--compare FILE]
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from ledger import DAILY_RATE, SIZES, START_DATE, write_ledger
+
+CACHE_DIR = Path(tempfile.gettempdir()) / "personal_wallet_ledgers"
+
+
+def benchmarks(rows: int) -> list[tuple[str, list[str], list[str]]]:
+    """Return name, command arguments and files to remove before every run of each
+    benchmark, for a ledger of rows transactions."""
+    days = max(1, rows // DAILY_RATE)
+    middle = str(START_DATE + datetime.timedelta(days=days // 2))
+    month_later = str(START_DATE + datetime.timedelta(days=days // 2 + 30))
+    index = str(rows // 2)
+    sidecars = [
+        "transactions.totals",
+        "transactions.index",
+        "transactions.index-journal",
+        "transactions.table",
+        "transactions.table-journal",
+    ]
+    return [
+        ("startup", ["--version"], []),
+        ("balance cold", ["balance"], sidecars),
+        ("balance", ["balance"], []),
+        ("find index", ["find", "-i", index], []),
+        ("find index range", ["find", "-i", f"{index}..{int(index) + 100}"], []),
+        ("find date", ["find", "-d", middle], []),
+        ("find date range", ["find", "-d", f"{middle}..{month_later}"], []),
+        ("find amount", ["find", "-a", "350"], []),
+        ("find amount range", ["find", "-a", "100000..150000"], []),
+        ("find category", ["find", "-c", "income"], []),
+        ("find description cold", ["find", "-s", "Dentist"], sidecars),
+        ("find description", ["find", "-s", "Dentist"], []),
+        ("find description pattern", ["find", "-s", "%coffee%"], []),
+        ("find stream", ["find", "--stream", "-s", "Dentist"], []),
+        ("report month", ["report", "-g", "month"], []),
+        ("report week description", ["report", "-g", "week", "-g", "description"], []),
+        ("add", ["add", "-d", middle, "-a", "500", "-c", "expenses", "-s", "Benchmark"], []),
+        ("update", ["update", "-i", index, "-a", "1000"], []),
+        ("delete", ["delete", "-i", index], []),
+    ]
+
+
+def run(argv: list[str]) -> tuple[float, int]:
+    """Run command, return its wall time in seconds and peak memory in KiB."""
+    started = time.perf_counter()
+    process = subprocess.Popen(argv, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    _, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - started
+    process.returncode = os.waitstatus_to_exitcode(status)
+    stderr = process.stderr.read().decode()
+    process.stderr.close()
+    if process.returncode:
+        raise RuntimeError(f"{' '.join(argv)} failed:\n{stderr}")
+    return elapsed, usage.ru_maxrss
+
+
+def prepare(size: str, seed: int, storage: str, data_dir: Path, cache_dir: Path) -> None:
+    """Put ledger of the given size into data directory in the given storage."""
+    ledger = cache_dir / f"ledger-{size}-{seed}.csv"
+    if not ledger.exists():
+        print(f"Generating {size} ledger...", file=sys.stderr)
+        write_ledger(ledger.with_suffix(".tmp"), SIZES[size], seed)
+        ledger.with_suffix(".tmp").replace(ledger)
+    shutil.rmtree(data_dir, ignore_errors=True)
+    data_dir.mkdir(parents=True)
+    shutil.copyfile(ledger, data_dir / "transactions.csv")
+    if storage != "csv":
+        run(command(data_dir, "csv", ["migrate", "--to", storage]))
+        (data_dir / "transactions.csv").unlink()
+        for sidecar in data_dir.glob("transactions.*"):
+            if sidecar.suffix in (".totals", ".index", ".index-journal"):
+                sidecar.unlink()
+
+
+def command(data_dir: Path, storage: str, args: list[str]) -> list[str]:
+    options = ["--data-path", str(data_dir), "--storage", storage, "--config", os.devnull]
+    if args == ["--version"]:
+        options = []
+    return [sys.executable, "-m", "personal_wallet", *args, *options]
+
+
+def compare(results: list[dict], previous_file: Path) -> None:
+    """Print median time and peak memory changes against results of a previous run."""
+    previous = {
+        (result["size"], result["storage"], result["benchmark"]): result
+        for result in json.loads(previous_file.read_text(encoding="utf-8"))["results"]
+    }
+    print(f"\nCompared to {previous_file}:")
+    for result in results:
+        old = previous.get((result["size"], result["storage"], result["benchmark"]))
+        if old is None:
+            continue
+        time_change = result["median"] / old["median"] - 1
+        memory_change = result["max_rss_kib"] / old["max_rss_kib"] - 1
+        print(
+            f"{result['size']:>4} {result['storage']:<7}{result['benchmark']:<28}"
+            f"{time_change:>+9.1%} time{memory_change:>+9.1%} memory"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", choices=SIZES, default=["10k", "1m"])
+    parser.add_argument(
+        "--storage", nargs="+", choices=["csv", "sqlite", "binary", "partitioned", "compressed"]
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Runs of every benchmark")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of ledgers")
+    parser.add_argument("--cache-dir", type=Path, default=CACHE_DIR, help="Ledgers directory")
+    parser.add_argument("--output", type=Path, default=Path("benchmark-results.json"))
+    parser.add_argument("--compare", type=Path, help="Results of a previous run")
+    args = parser.parse_args()
+    storages = args.storage or ["csv"]
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        data_dir = Path(directory) / "data"
+        for size in args.sizes:
+            for storage in storages:
+                prepare(size, args.seed, storage, data_dir, args.cache_dir)
+                for name, command_args, remove in benchmarks(SIZES[size]):
+                    times, memory = [], []
+                    for _ in range(args.repeat):
+                        for filename in remove:
+                            (data_dir / filename).unlink(missing_ok=True)
+                        elapsed, max_rss = run(command(data_dir, storage, command_args))
+                        times.append(elapsed)
+                        memory.append(max_rss)
+                    result = {
+                        "size": size,
+                        "rows": SIZES[size],
+                        "storage": storage,
+                        "benchmark": name,
+                        "args": command_args,
+                        "times": times,
+                        "min": min(times),
+                        "median": statistics.median(times),
+                        "max_rss_kib": max(memory),
+                    }
+                    results.append(result)
+                    print(
+                        f"{size:>4} {storage:<7}{name:<28}{result['median']:>9.3f} s"
+                        f"{result['max_rss_kib'] / 1024:>9.1f} MiB"
+                    )
+
+    report = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "commit": git_commit(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"Results written to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    main()
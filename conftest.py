@@ -1,3 +1,4 @@
+import shutil
 from pathlib import Path
 
 import pytest
@@ -15,8 +16,11 @@ def config():
 @pytest.fixture(autouse=True)
 def csv_teardown():
     yield
-    csvfile = PROJECT_DIR / "tests" / "transactions.csv"
-    csvfile.unlink(missing_ok=True)
+    for datafile in (PROJECT_DIR / "tests").glob("transactions.*"):
+        if datafile.is_dir():
+            shutil.rmtree(datafile)
+        else:
+            datafile.unlink(missing_ok=True)
 
 
 @pytest.fixture
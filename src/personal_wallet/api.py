@@ -0,0 +1,256 @@
+import asyncio
+import contextlib
+import datetime
+import json
+from http import HTTPStatus
+from urllib.parse import parse_qsl, urlsplit
+
+import click
+
+from personal_wallet.cli_types import (
+    AMOUNT,
+    CATEGORY,
+    DATE,
+    DATE_OR_DATE_RANGE,
+    NON_NEG_INT_OR_INT_RANGE,
+    STRING_OR_PATTERN,
+)
+from personal_wallet.daemon import WalletService
+
+# Largest request body accepted, transactions are a few hundred bytes at most.
+MAX_BODY_SIZE = 1 << 20
+
+# Query parameters of `GET /transactions`, parsed as the options of `find`.
+FILTERS = {
+    "index": NON_NEG_INT_OR_INT_RANGE,
+    "date": DATE_OR_DATE_RANGE,
+    "amount": NON_NEG_INT_OR_INT_RANGE,
+    "category": CATEGORY,
+    "description": STRING_OR_PATTERN,
+}
+
+# Fields of transactions sent to `POST /transactions` and `PATCH /transactions/<index>`,
+# parsed as the options of `add` and `update`.
+FIELDS = {"date": DATE, "amount": AMOUNT, "category": CATEGORY, "description": click.STRING}
+
+
+class HttpError(Exception):
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class ReadWriteLock:
+    """Asyncio lock held by any number of readers at once or by a single writer.
+
+    A waiting writer stops new readers from taking the lock, so a steady stream of reads
+    doesn't hold writes off forever.
+    """
+
+    def __init__(self):
+        self.condition = asyncio.Condition()
+        self.readers = 0
+        self.writing = False
+        self.writers_waiting = 0
+
+    @contextlib.asynccontextmanager
+    async def read(self):
+        async with self.condition:
+            await self.condition.wait_for(lambda: not self.writing and not self.writers_waiting)
+            self.readers += 1
+        try:
+            yield
+        finally:
+            async with self.condition:
+                self.readers -= 1
+                self.condition.notify_all()
+
+    @contextlib.asynccontextmanager
+    async def write(self):
+        async with self.condition:
+            self.writers_waiting += 1
+            try:
+                await self.condition.wait_for(lambda: not self.writing and not self.readers)
+            finally:
+                self.writers_waiting -= 1
+            self.writing = True
+        try:
+            yield
+        finally:
+            async with self.condition:
+                self.writing = False
+                self.condition.notify_all()
+
+
+class WalletApi:
+    """HTTP JSON API of the wallet kept in memory by the service.
+
+    Reads run in worker threads concurrently with each other, while adding, updating and
+    deleting transactions, as well as reloading the wallet changed by another process,
+    hold the lock exclusively.
+
+    Routes:
+        GET /balance
+        GET /transactions?index=&date=&amount=&category=&description=
+        POST /transactions
+        PATCH /transactions/<index>
+        DELETE /transactions/<index>
+    """
+
+    def __init__(self, service: WalletService):
+        self.service = service
+        self.lock = ReadWriteLock()
+
+    async def read(self, command: str, **args):
+        if self.service.stale():
+            async with self.lock.write():
+                # Another request may have reloaded it while this one waited.
+                if self.service.stale():
+                    await asyncio.to_thread(self.service.load)
+        async with self.lock.read():
+            return await asyncio.to_thread(self.service.run, command, **args)
+
+    async def write(self, command: str, **args):
+        async with self.lock.write():
+            if self.service.stale():
+                await asyncio.to_thread(self.service.load)
+            return await asyncio.to_thread(self.service.run, command, **args)
+
+    async def route(self, method: str, target: str, body: bytes) -> tuple[HTTPStatus, object]:
+        """Answer request, returning response status and JSON value of its body."""
+        url = urlsplit(target)
+        parts = url.path.strip("/").split("/")
+        if parts == ["balance"]:
+            allow(method, "GET")
+            income, expenses = await self.read("balance")
+            return HTTPStatus.OK, {
+                "balance": income - expenses,
+                "income": income,
+                "expenses": expenses,
+            }
+        if parts == ["transactions"]:
+            allow(method, "GET", "POST")
+            if method == "GET":
+                filters = parse_values(dict(parse_qsl(url.query)), FILTERS)
+                return HTTPStatus.OK, await self.read(
+                    "find", **{**dict.fromkeys(FILTERS), **filters}
+                )
+            fields = parse_values(parse_body(body), FIELDS)
+            if "amount" not in fields or "category" not in fields:
+                raise HttpError(HTTPStatus.BAD_REQUEST, "Error: Amount and category are required.")
+            fields.setdefault("date", DATE.convert(str(datetime.date.today()), None, None))
+            await self.write("add", **{**dict.fromkeys(FIELDS), **fields})
+            return HTTPStatus.CREATED, {"message": "Added transaction successfully!"}
+        if len(parts) == 2 and parts[0] == "transactions":
+            allow(method, "PATCH", "DELETE")
+            index = parse_value("index", parts[1], click.IntRange(min=0))
+            if method == "PATCH":
+                fields = parse_values(parse_body(body), FIELDS)
+                await self.write("update", index=index, **{**dict.fromkeys(FIELDS), **fields})
+                return HTTPStatus.OK, {"message": "Updated transaction successfully!"}
+            await self.write("delete", index=index)
+            return HTTPStatus.OK, {"message": "Deleted transaction successfully!"}
+        raise HttpError(HTTPStatus.NOT_FOUND, f"Error: No such resource {url.path!r}.")
+
+    async def respond(self, method: str, target: str, body: bytes) -> tuple[HTTPStatus, object]:
+        try:
+            return await self.route(method, target, body)
+        except HttpError as e:
+            return e.status, {"error": str(e)}
+        except LookupError as e:
+            # Wallet is empty or there's no transaction with the index.
+            return HTTPStatus.NOT_FOUND, {"error": str(e)}
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Answer HTTP/1.1 requests of a connection, kept alive until the client closes it."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    writer.write(response(HTTPStatus.BAD_REQUEST, {"error": "Bad request."}, False))
+                    break
+                if not 0 <= length <= MAX_BODY_SIZE:
+                    status, payload = HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "Too large."}
+                    writer.write(response(status, payload, False))
+                    break
+                body = await reader.readexactly(length)
+                status, payload = await self.respond(method, target, body)
+                keep_alive = version == "HTTP/1.1" and headers.get("connection") != "close"
+                writer.write(response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def allow(method: str, *methods: str) -> None:
+    if method not in methods:
+        raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED, f"Error: Method {method} not allowed.")
+
+
+def parse_body(body: bytes) -> dict:
+    try:
+        fields = json.loads(body or b"{}")
+    except ValueError as e:
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"Error: Invalid JSON: {e}.") from e
+    if not isinstance(fields, dict):
+        raise HttpError(HTTPStatus.BAD_REQUEST, "Error: Expected a JSON object.")
+    return fields
+
+
+def parse_value(name: str, value, param_type: click.ParamType):
+    try:
+        return param_type.convert(value, None, None)
+    except click.BadParameter as e:
+        raise HttpError(
+            HTTPStatus.BAD_REQUEST, f"Error: Invalid value for {name!r}: {e.message}"
+        ) from e
+
+
+def parse_values(values: dict, types: dict[str, click.ParamType]) -> dict:
+    """Convert values with the param types of the same name, skipping nulls."""
+    unknown = values.keys() - types.keys()
+    if unknown:
+        raise HttpError(
+            HTTPStatus.BAD_REQUEST, f"Error: Unknown fields {', '.join(sorted(unknown))}."
+        )
+    return {
+        name: parse_value(name, value, types[name])
+        for name, value in values.items()
+        if value is not None
+    }
+
+
+def response(status: HTTPStatus, payload, keep_alive: bool) -> bytes:
+    body = json.dumps(payload).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+async def serve(api: WalletApi, host: str, port: int, ready=None) -> None:
+    """Answer HTTP requests to the API until cancelled. Calls ready with the server once it
+    accepts connections."""
+    server = await asyncio.start_server(api.handle_connection, host, port)
+    async with server:
+        if ready is not None:
+            ready(server)
+        await server.serve_forever()
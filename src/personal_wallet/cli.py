@@ -1,18 +1,71 @@
+import sys
+
 import click
 
-from personal_wallet import commands
+from personal_wallet.lazy_group import LazyGroup
 
 __version__ = "0.1.0"
 
 
 @click.version_option(prog_name="personal_wallet", version=__version__)
-@click.group()
-def main():
-    pass
+@click.group(
+    cls=LazyGroup,
+    # Commands are imported on use, so running one command doesn't import dependencies
+    # of the others.
+    lazy_subcommands={
+        "balance": "personal_wallet.commands.balance",
+        "add": "personal_wallet.commands.add",
+        "import": "personal_wallet.commands.import_",
+        "find": "personal_wallet.commands.find",
+        "export": "personal_wallet.commands.export",
+        "report": "personal_wallet.commands.report",
+        "update": "personal_wallet.commands.update",
+        "delete": "personal_wallet.commands.delete",
+        "migrate": "personal_wallet.commands.migrate",
+        "compact": "personal_wallet.commands.compact",
+        "serve": "personal_wallet.commands.serve",
+        "api": "personal_wallet.commands.api",
+    },
+)
+@click.option(
+    "--stats",
+    "collect_stats",
+    is_flag=True,
+    help="Print time, rows, I/O and memory of every phase of the command to stderr.",
+)
+@click.option(
+    "--stats-format",
+    type=click.Choice(["text", "json"]),
+    default="text",
+    help="Format of printed stats.",
+    show_default=True,
+)
+@click.option(
+    "--profile",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Profile the command with cProfile and dump the stats into the file.",
+)
+@click.pass_context
+def main(ctx: click.Context, collect_stats: bool, stats_format: str, profile: str | None):
+    if collect_stats:
+        from personal_wallet import stats
+
+        stats.enable()
+
+        def report():
+            stats.report(sys.stderr, stats_format)
+            stats.disable()
+
+        ctx.call_on_close(report)
+
+    if profile is not None:
+        import cProfile
+
+        profiler = cProfile.Profile()
 
+        def dump():
+            profiler.disable()
+            profiler.dump_stats(profile)
 
-main.add_command(commands.balance)
-main.add_command(commands.add)
-main.add_command(commands.find)
-main.add_command(commands.update)
-main.add_command(commands.delete)
+        ctx.call_on_close(dump)
+        profiler.enable()
@@ -4,6 +4,8 @@ from gettext import ngettext
 
 import click
 
+from personal_wallet.models.transaction_table import MAX_AMOUNT
+
 
 class StringOrPatternParamType(click.types.StringParamType):
     name = "text or pattern"
@@ -131,3 +133,8 @@ class DateTimeOrDateTimeRange(click.types.DateTime):
 
 NON_NEG_INT_OR_INT_RANGE = NonNegIntOrIntRangeParamType()
 STRING_OR_PATTERN = StringOrPatternParamType()
+DATE_OR_DATE_RANGE = DateTimeOrDateTimeRange(formats=["%Y-%m-%d"])
+
+DATE = click.DateTime(formats=["%Y-%m-%d"])
+AMOUNT = click.IntRange(min=0, max=MAX_AMOUNT)
+CATEGORY = click.Choice(["income", "expenses"])
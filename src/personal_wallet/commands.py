@@ -1,19 +1,56 @@
 import datetime
 import functools
+import importlib
+import io
+import os
 import re
+import signal
+import time
 
 import click
-import tabulate
 
+from personal_wallet import daemon, exporter, importer, stats
 from personal_wallet.cli_types import (
-    DateTimeOrDateTimeRange,
+    AMOUNT,
+    CATEGORY,
+    DATE,
+    DATE_OR_DATE_RANGE,
     NON_NEG_INT_OR_INT_RANGE,
     STRING_OR_PATTERN,
 )
 from personal_wallet.config import configure
 from personal_wallet.constants import DEFAULT_CFG, PROJECT_DIR
+from personal_wallet.models.aggregation import GROUPINGS
+from personal_wallet.models.storage import Storage
 from personal_wallet.models.transaction import Transaction
 from personal_wallet.models.wallet import Wallet
+from personal_wallet.render import stream_table
+
+# Storage classes by name. They are imported only when opened, since SQLite and binary
+# storage modules take a noticeable share of command startup time.
+STORAGES = {
+    "csv": "personal_wallet.models.storage.CsvStorage",
+    "sqlite": "personal_wallet.models.sqlite_storage.SqliteStorage",
+    "binary": "personal_wallet.models.binary_storage.BinaryStorage",
+    "partitioned": "personal_wallet.models.partitioned_storage.PartitionedStorage",
+    "compressed": "personal_wallet.models.compressed_storage.CompressedStorage",
+}
+
+
+def open_storage(data_path: str, storage: str, workers: int = 1) -> Storage:
+    """Return storage of the given kind located in the data directory."""
+    module_name, _, class_name = STORAGES[storage].rpartition(".")
+    storage_class = getattr(importlib.import_module(module_name), class_name)
+    return storage_class(PROJECT_DIR / data_path / storage_class.filename, workers)
+
+
+def request_daemon(data_path: str, storage: str, command: str, **args):
+    """Send command to the daemon serving the wallet, showing its errors as errors of the
+    command. Raises daemon.NotRunning if there is no daemon."""
+    try:
+        return daemon.request(data_path, storage, command, **args)
+    except daemon.RemoteError as e:
+        raise click.ClickException(str(e)) from e
 
 
 def common_options(func):
@@ -32,6 +69,71 @@ def common_options(func):
         default="data",
         help="Directory for storing transaction data",
     )
+    @click.option(
+        "--storage",
+        type=click.Choice(list(STORAGES)),
+        default="csv",
+        help="Storage backend for transaction data",
+        show_default=True,
+    )
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return func(*args, **kwargs)
+
+    return wrapper
+
+
+def workers_option(func):
+    @click.option(
+        "-w",
+        "--workers",
+        type=click.IntRange(min=0),
+        default=1,
+        help="Number of processes parsing CSV file in parallel, 0 for one per CPU core.",
+        show_default=True,
+    )
+    @functools.wraps(func)
+    def wrapper(*args, workers: int, **kwargs):
+        return func(*args, workers=workers or os.cpu_count() or 1, **kwargs)
+
+    return wrapper
+
+
+def filter_options(func):
+    @click.option(
+        "-i",
+        "--index",
+        type=NON_NEG_INT_OR_INT_RANGE,
+        help="Index of transaction. Single non-negative integer or `from..to` range "
+        "(e.g., `1` or `1..15`)",
+    )
+    @click.option(
+        "-d",
+        "--date",
+        type=DATE_OR_DATE_RANGE,
+        help="Transaction date. Single date in YYYY-MM-DD format or `from..to` range "
+        "(e.g., `2024-05-08` or `2024-05-01..2024-05-09`)",
+    )
+    @click.option(
+        "-a",
+        "--amount",
+        type=NON_NEG_INT_OR_INT_RANGE,
+        help="Transaction amount. Single non-negative integer or `from..to` range "
+        "(e.g., `100` or `50..200`)",
+    )
+    @click.option(
+        "-c",
+        "--category",
+        type=CATEGORY,
+        help="Transaction category (income/expenses).",
+    )
+    @click.option(
+        "-s",
+        "--description",
+        type=STRING_OR_PATTERN,
+        help="Transaction description. Exact description or pattern using % "
+        "(e.g., `Salary` or `Sa%`). The % wildcard represents any number of characters.",
+    )
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         return func(*args, **kwargs)
@@ -40,13 +142,15 @@ def common_options(func):
 
 
 @click.command("balance", help="Shows the current balance, income and expenses.")
+@workers_option
 @common_options
-def balance(data_path: str):
+def balance(data_path: str, storage: str, workers: int):
     """Shows the current balance, income and expenses."""
-    csvfile = PROJECT_DIR / data_path / "transactions.csv"
-
-    wallet = Wallet(file=csvfile)
-    income, expenses = wallet.get_balance()
+    try:
+        income, expenses = request_daemon(data_path, storage, "balance")
+    except daemon.NotRunning:
+        wallet = Wallet(open_storage(data_path, storage, workers))
+        income, expenses = wallet.get_balance()
 
     click.echo(f"Current balance: {income - expenses}")
     click.echo(f"Income: {income}")
@@ -58,20 +162,20 @@ def balance(data_path: str):
     "-d",
     "--date",
     help="Transaction date in YYYY-MM-DD format.",
-    type=click.DateTime(formats=["%Y-%m-%d"]),
+    type=DATE,
     default=str(datetime.date.today()),
 )
 @click.option(
     "-a",
     "--amount",
-    type=click.IntRange(min=0),
+    type=AMOUNT,
     required=True,
     help="Transaction amount as non-negative integer.",
 )
 @click.option(
     "-c",
     "--category",
-    type=click.Choice(["income", "expenses"]),
+    type=CATEGORY,
     required=True,
     help="Transaction category (income/expenses).",
 )
@@ -83,74 +187,186 @@ def balance(data_path: str):
 @common_options
 def add(
     data_path: str,
+    storage: str,
     date: datetime.datetime,
     amount: int,
     category: str,
     description: str | None,
 ):
     """Add a new transaction to the wallet."""
-    csvfile = PROJECT_DIR / data_path / "transactions.csv"
-
-    wallet = Wallet(file=csvfile)
-    transaction = Transaction(date=date, amount=amount, category=category, description=description)
-    wallet.add_transaction(transaction)
+    fields = {"date": date, "amount": amount, "category": category, "description": description}
+    try:
+        request_daemon(data_path, storage, "add", **fields)
+    except daemon.NotRunning:
+        wallet = Wallet(open_storage(data_path, storage))
+        wallet.add_transaction(Transaction(**fields))
 
     click.echo("Added transaction successfully!")
 
 
+@click.command(name="import", help="Import transactions from a CSV or JSON Lines file.")
+@click.argument("file", type=click.File("rb"))
+@click.option(
+    "-f",
+    "--format",
+    "file_format",
+    type=click.Choice(importer.FORMATS),
+    help="Format of the file. Guessed by its extension by default, stdin is read as CSV.",
+)
+@common_options
+def import_(data_path: str, storage: str, file, file_format: str | None):
+    """Import transactions from a CSV or JSON Lines file, `-` for stdin."""
+    file_format = file_format or importer.guess_format(getattr(file, "name", ""))
+    wallet = Wallet(open_storage(data_path, storage))
+    start = time.perf_counter()
+    try:
+        with stats.phase("import") as phase:
+            table = importer.read_table(
+                io.TextIOWrapper(file, encoding="utf-8", newline=""), file_format
+            )
+            count = wallet.add_transactions(table)
+            phase.rows_read = count
+    except importer.RowError as e:
+        raise click.ClickException(f"{e} No transactions were imported.") from e
+    elapsed = time.perf_counter() - start
+
+    rate = f" ({count / elapsed:.0f} rows/s)" if elapsed else ""
+    click.echo(f"Imported {count} transactions successfully in {elapsed:.2f} s{rate}.")
+
+
 @click.command(name="find", help="Search transactions by date, amount, category or description.")
+@filter_options
 @click.option(
-    "-i",
-    "--index",
-    type=NON_NEG_INT_OR_INT_RANGE,
-    help="Index of transaction. Single non-negative integer or `from..to` range "
-    "(e.g., `1` or `1..15`)",
+    "--stream",
+    is_flag=True,
+    help="Read transactions one by one and print matches as soon as they are found.",
+)
+@workers_option
+@common_options
+def find(
+    index: int,
+    data_path: str,
+    storage: str,
+    stream: bool,
+    workers: int,
+    date: datetime.datetime | tuple[datetime.datetime, datetime.datetime] | None,
+    amount: int | tuple[int, int] | None,
+    category: str | None,
+    description: str | re.Pattern | None,
+):
+    """Search transactions by date, amount, category or description."""
+    wallet = Wallet(open_storage(data_path, storage, workers), stream=stream)
+    if stream:
+        transactions = wallet.iter_transactions(
+            index=index, date=date, amount=amount, category=category, description=description
+        )
+        with stats.phase("stream") as phase:
+            for line in stream_table(stats.counted(transactions, phase, "rows_matched")):
+                click.echo(line)
+        return
+
+    filters = {
+        "index": index,
+        "date": date,
+        "amount": amount,
+        "category": category,
+        "description": description,
+    }
+    try:
+        transactions = request_daemon(data_path, storage, "find", **filters)
+    except daemon.NotRunning:
+        transactions = wallet.find_transactions(**filters)
+    # transactions = (t.as_dict() for t in transactions)
+    with stats.phase("render"):
+        # Imported here, since only this command needs it and it's slow to import.
+        import tabulate
+
+        click.echo(tabulate.tabulate(transactions, headers="keys"))
+
+
+@click.command(name="export", help="Export found transactions as CSV, TSV or JSON Lines.")
+@filter_options
+@click.option(
+    "-f",
+    "--format",
+    "file_format",
+    type=click.Choice(exporter.FORMATS),
+    default="csv",
+    help="Format of exported transactions.",
+    show_default=True,
+)
+@click.option(
+    "-o",
+    "--output",
+    type=click.File("w", encoding="utf-8", lazy=True),
+    default="-",
+    help="File to export transactions into, stdout by default.",
+)
+@common_options
+def export(
+    index: int,
+    data_path: str,
+    storage: str,
+    file_format: str,
+    output,
+    date: datetime.datetime | tuple[datetime.datetime, datetime.datetime] | None,
+    amount: int | tuple[int, int] | None,
+    category: str | None,
+    description: str | re.Pattern | None,
+):
+    """Export found transactions, writing them out as soon as they are found."""
+    wallet = Wallet(open_storage(data_path, storage), stream=True)
+    transactions = wallet.iter_transactions(
+        index=index, date=date, amount=amount, category=category, description=description
+    )
+    with stats.phase("export") as phase:
+        count = exporter.write_rows(transactions, output, file_format)
+        phase.rows_matched = count
+    if output.name != "-":
+        click.echo(f"Exported {count} transactions successfully!")
+
+
+@click.command(name="report", help="Show totals of transactions grouped by date or category.")
+@click.option(
+    "-g",
+    "--group-by",
+    type=click.Choice(GROUPINGS),
+    multiple=True,
+    required=True,
+    help="Grouping of transactions, repeated to group by several (e.g., `-g month -g category`).",
 )
 @click.option(
     "-d",
     "--date",
-    type=DateTimeOrDateTimeRange(formats=["%Y-%m-%d"]),
+    type=DATE_OR_DATE_RANGE,
     help="Transaction date. Single date in YYYY-MM-DD format or `from..to` range "
     "(e.g., `2024-05-08` or `2024-05-01..2024-05-09`)",
 )
-@click.option(
-    "-a",
-    "--amount",
-    type=NON_NEG_INT_OR_INT_RANGE,
-    help="Transaction amount. Single non-negative integer or `from..to` range "
-    "(e.g., `100` or `50..200`)",
-)
 @click.option(
     "-c",
     "--category",
-    type=click.Choice(["income", "expenses"]),
+    type=CATEGORY,
     help="Transaction category (income/expenses).",
 )
-@click.option(
-    "-s",
-    "--description",
-    type=STRING_OR_PATTERN,
-    help="Transaction description. Exact description or pattern using % "
-    "(e.g., `Salary` or `Sa%`). The % wildcard represents any number of characters.",
-)
 @common_options
-def find(
-    index: int,
+def report(
     data_path: str,
+    storage: str,
+    group_by: tuple[str, ...],
     date: datetime.datetime | tuple[datetime.datetime, datetime.datetime] | None,
-    amount: int | tuple[int, int] | None,
     category: str | None,
-    description: str | re.Pattern | None,
 ):
-    """Search transactions by date, amount, category or description."""
-    csvfile = PROJECT_DIR / data_path / "transactions.csv"
+    """Show count, income and expenses totals, balance and average, min and max amount of
+    transactions grouped by year, month, week, category or description."""
+    options = {"group_by": list(group_by), "date": date, "category": category}
+    try:
+        rows = request_daemon(data_path, storage, "report", **options)
+    except daemon.NotRunning:
+        rows = Wallet(open_storage(data_path, storage)).report(**options)
+    with stats.phase("render"):
+        import tabulate
 
-    wallet = Wallet(file=csvfile)
-    transactions = wallet.find_transactions(
-        index=index, date=date, amount=amount, category=category, description=description
-    )
-    # transactions = (t.as_dict() for t in transactions)
-    click.echo(tabulate.tabulate(transactions, headers="keys"))
+        click.echo(tabulate.tabulate(rows, headers="keys", floatfmt=".2f"))
 
 
 @click.command(
@@ -166,19 +382,19 @@ def find(
 @click.option(
     "-d",
     "--date",
-    type=click.DateTime(formats=["%Y-%m-%d"]),
+    type=DATE,
     help="Transaction date in YYYY-MM-DD format.",
 )
 @click.option(
     "-a",
     "--amount",
-    type=click.IntRange(min=0),
+    type=AMOUNT,
     help="Transaction amount as non-negative integer.",
 )
 @click.option(
     "-c",
     "--category",
-    type=click.Choice(["income", "expenses"]),
+    type=CATEGORY,
     help="Transaction category (income/expenses).",
 )
 @click.option(
@@ -190,6 +406,7 @@ def find(
 @common_options
 def update(
     data_path: str,
+    storage: str,
     index: int,
     date: datetime.datetime | None,
     amount: int | None,
@@ -197,13 +414,18 @@ def update(
     description: str | None,
 ):
     """Update transaction date, amount, category or description by its index."""
-    csvfile = PROJECT_DIR / data_path / "transactions.csv"
-
-    wallet = Wallet(file=csvfile)
+    fields = {
+        "index": index,
+        "date": date,
+        "amount": amount,
+        "category": category,
+        "description": description,
+    }
     try:
-        wallet.update_transaction(
-            index=index, date=date, amount=amount, category=category, description=description
-        )
+        try:
+            request_daemon(data_path, storage, "update", **fields)
+        except daemon.NotRunning:
+            Wallet(open_storage(data_path, storage)).update_transaction(**fields)
         click.echo("Updated transaction successfully!")
     except Exception as e:
         error_message = str(e)
@@ -219,14 +441,97 @@ def update(
     help="Index of transaction.",
 )
 @common_options
-def delete(data_path: str, index: int):
+def delete(data_path: str, storage: str, index: int):
     """Delete a transaction by its index."""
-    csvfile = PROJECT_DIR / data_path / "transactions.csv"
-
-    wallet = Wallet(file=csvfile)
     try:
-        wallet.delete_transaction(index=index)
+        try:
+            request_daemon(data_path, storage, "delete", index=index)
+        except daemon.NotRunning:
+            Wallet(open_storage(data_path, storage)).delete_transaction(index=index)
         click.echo("Deleted transaction successfully!")
     except Exception as e:
         error_message = str(e)
         click.echo(error_message)
+
+
+@click.command(name="migrate", help="Copy all transactions into another storage backend.")
+@click.option(
+    "-t",
+    "--to",
+    "target",
+    type=click.Choice(list(STORAGES)),
+    required=True,
+    help="Storage backend to copy transactions into.",
+)
+@common_options
+def migrate(data_path: str, storage: str, target: str):
+    """Copy all transactions into another storage backend."""
+    if target == storage:
+        click.echo("Error: Source and target storage are the same.")
+        return
+
+    source = open_storage(data_path, storage)
+    destination = open_storage(data_path, target)
+    if next(destination.iter_data(), None) is not None:
+        click.echo("Error: Target storage already contains transactions.")
+        return
+
+    # Transactions are streamed from source to destination without loading them all.
+    count = destination.extend_data(source.iter_data())
+    click.echo(f"Migrated {count} transactions successfully!")
+
+
+@click.command(name="compact", help="Fold logged updates and deletions into the data file.")
+@common_options
+def compact(data_path: str, storage: str):
+    """Fold logged updates and deletions into the data file."""
+    open_storage(data_path, storage).compact()
+    click.echo("Compacted transactions successfully!")
+
+
+@click.command(name="serve", help="Keep the wallet in memory and answer other commands.")
+@common_options
+def serve(data_path: str, storage: str):
+    """Keep the wallet in memory and answer other commands over a Unix socket."""
+    path = daemon.socket_path(data_path, storage)
+    service = daemon.WalletService(open_storage(data_path, storage))
+    service.load()
+    # Stopped with SIGTERM as with Ctrl+C, so the socket is removed.
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        daemon.serve(service, path, ready=lambda server: click.echo(f"Serving wallet on {path}"))
+    except RuntimeError as e:
+        click.echo(str(e))
+    except KeyboardInterrupt:
+        click.echo("Stopped serving wallet.")
+
+
+@click.command(name="api", help="Serve the wallet as an HTTP JSON API.")
+@click.option("--host", default="127.0.0.1", help="Address to listen on.", show_default=True)
+@click.option("--port", type=click.IntRange(0, 65535), default=8000, show_default=True)
+@common_options
+def api(data_path: str, storage: str, host: str, port: int):
+    """Serve the wallet kept in memory as an HTTP JSON API."""
+    # Imported here, since asyncio takes a while to import and only this command needs it.
+    import asyncio
+
+    from personal_wallet import api as wallet_api
+
+    service = daemon.WalletService(open_storage(data_path, storage))
+    service.load()
+
+    def ready(server):
+        address, bound_port = server.sockets[0].getsockname()[:2]
+        click.echo(f"Serving wallet API on http://{address}:{bound_port}")
+
+    async def run():
+        # Stopped with SIGTERM as with Ctrl+C, letting requests in progress finish cleanly.
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        await wallet_api.serve(wallet_api.WalletApi(service), host, port, ready)
+
+    try:
+        asyncio.run(run())
+    except OSError as e:
+        click.echo(f"Error: {e.strerror}.")
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        click.echo("Stopped serving wallet API.")
@@ -0,0 +1,232 @@
+import datetime
+import json
+import os
+import re
+import socket
+import threading
+from pathlib import Path
+
+from personal_wallet.constants import PROJECT_DIR
+
+# Time to wait for an answer of the daemon, long queries included.
+TIMEOUT = 60
+
+# Commands changing the wallet.
+WRITES = ("add", "update", "delete")
+
+# Longest path of a Unix socket, without the terminating null byte.
+MAX_SOCKET_PATH = 107
+
+
+class NotRunning(Exception):
+    """Raised by the client when no daemon serves the wallet."""
+
+
+class RemoteError(Exception):
+    """Raised by the client for an error of the daemon handling the request."""
+
+
+def socket_path(data_path: str, storage: str) -> Path:
+    """Return path of Unix socket of the daemon serving the given storage."""
+    return PROJECT_DIR / data_path / f"transactions.{storage}.sock"
+
+
+def encode(value):
+    """Convert command argument to JSON value."""
+    if isinstance(value, datetime.datetime):
+        return {"date": str(value.date())}
+    if isinstance(value, tuple):
+        return {"range": [encode(item) for item in value]}
+    if isinstance(value, re.Pattern):
+        return {"pattern": value.pattern}
+    return value
+
+
+def decode(value):
+    """Convert JSON value back to command argument."""
+    if isinstance(value, dict):
+        if "date" in value:
+            return datetime.datetime.strptime(value["date"], "%Y-%m-%d")
+        if "range" in value:
+            return tuple(decode(item) for item in value["range"])
+        if "pattern" in value:
+            return re.compile(value["pattern"])
+    return value
+
+
+def request(data_path: str, storage: str, command: str, **args):
+    """Send command to the daemon serving the wallet and return its result.
+
+    Raises NotRunning if there is no daemon or its socket can't be connected to, e.g.
+    if its path is too long, so the command is run locally instead.
+    """
+    path = socket_path(data_path, storage)
+    if len(os.fsencode(path)) > MAX_SOCKET_PATH:
+        raise NotRunning(path)
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(str(path))
+    except OSError as e:
+        client.close()
+        raise NotRunning(path) from e
+    with client:
+        client.settimeout(TIMEOUT)
+        message = {"command": command, "args": {key: encode(v) for key, v in args.items()}}
+        client.sendall(json.dumps(message).encode("utf-8") + b"\n")
+        with client.makefile("rb") as stream:
+            line = stream.readline()
+    if not line:
+        raise RemoteError("Error: Wallet daemon closed the connection.")
+    reply = json.loads(line)
+    if "error" in reply:
+        raise RemoteError(reply["error"])
+    return reply["result"]
+
+
+class WalletService:
+    """Wallet kept in memory by the daemon, answering commands of clients.
+
+    The wallet is loaded once and reloaded only when the data file is changed by
+    something else than the daemon, e.g. by `import` or `compact`, which is told by
+    the storage identity. Changes are made holding the storage lock, and the identity
+    after a change is taken as the daemon's own only if no rows of other processes were
+    committed along with it. Balance is cached until the next change.
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.lock = threading.Lock()
+        self.wallet = None
+        self.identity = None
+        self.balance_cache = None
+        # Number of rows committed to storage while the daemon changes it.
+        self.committed = 0
+        # Readers running at once compute the balance only once, as it may save totals.
+        self.balance_lock = threading.Lock()
+
+    def load(self) -> None:
+        # Imported here, since clients don't need the wallet.
+        from personal_wallet.models.wallet import Wallet
+
+        # Taken before reading, so a change made meanwhile makes the wallet stale.
+        identity = self.storage.identity()
+        self.wallet = Wallet(self.storage)
+        self.balance_cache = None
+        if not self.wallet.indexed:
+            # Read transactions and build indexes before the first query.
+            len(self.wallet)
+            for name in ("date_index", "amount_index", "description_index"):
+                getattr(self.wallet, name)
+        self.identity = identity
+
+        journal = self.storage.on_append
+
+        def count_committed(before: dict | None, after: dict | None, transactions: list):
+            self.committed += len(transactions)
+            journal(before, after, transactions)
+
+        self.storage.on_append = count_committed
+
+    def stale(self) -> bool:
+        """Return whether the wallet isn't loaded yet or the data file was changed since."""
+        return self.wallet is None or self.storage.identity() != self.identity
+
+    def run(self, command: str, **args):
+        """Run command on the loaded wallet and return its result, keeping track of changes
+        of the data file made by it. Callers serialize writes and reloads."""
+        handler = getattr(self, f"do_{command}", None)
+        if handler is None:
+            raise ValueError(f"Error: Unknown command {command!r}.")
+        if command not in WRITES:
+            # Changes of other processes made meanwhile are found stale by the next request.
+            return handler(**args)
+
+        with self.storage.locked():
+            # Changed by another process since checked, so positions would be stale.
+            if self.storage.identity() != self.identity:
+                self.load()
+            self.committed = 0
+            try:
+                return handler(**args)
+            finally:
+                self.balance_cache = None
+                # Rows queued by other processes may be committed along with the added one,
+                # and the wallet doesn't have them.
+                if self.committed > (1 if command == "add" else 0):
+                    self.wallet = None
+                else:
+                    self.identity = self.storage.identity()
+
+    def handle(self, command: str, args: dict):
+        """Run command with JSON encoded arguments on the wallet and return its result."""
+        with self.lock:
+            if self.stale():
+                self.load()
+            return self.run(command, **{key: decode(value) for key, value in args.items()})
+
+    def do_balance(self) -> tuple[int, int]:
+        with self.balance_lock:
+            if self.balance_cache is None:
+                self.balance_cache = self.wallet.get_balance()
+            return self.balance_cache
+
+    def do_find(self, **filters) -> list[dict]:
+        return self.wallet.find_transactions(**filters)
+
+    def do_report(self, group_by: list[str], **filters) -> list[dict]:
+        return self.wallet.report(group_by, **filters)
+
+    def do_add(self, **fields) -> None:
+        from personal_wallet.models.transaction import Transaction
+
+        self.wallet.add_transaction(Transaction(**fields))
+
+    def do_update(self, **fields) -> None:
+        self.wallet.update_transaction(**fields)
+
+    def do_delete(self, index: int) -> None:
+        self.wallet.delete_transaction(index)
+
+
+def serve(service: WalletService, path: Path, ready=None) -> None:
+    """Answer requests to the wallet service on Unix socket until interrupted.
+
+    Stale socket left by a daemon that didn't exit cleanly is replaced. Calls ready with
+    the server once it accepts connections.
+    """
+    import socketserver
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                try:
+                    message = json.loads(line)
+                    result = service.handle(message["command"], message.get("args", {}))
+                    reply = {"result": result}
+                except Exception as e:  # pylint: disable=broad-exception-caught
+                    # Errors are shown by the client as if the command was run locally.
+                    reply = {"error": str(e)}
+                self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+                self.wfile.flush()
+
+    class Server(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+    if path.exists():
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        with probe:
+            try:
+                probe.connect(str(path))
+            except ConnectionRefusedError:
+                path.unlink()
+            else:
+                raise RuntimeError(f"Error: Wallet daemon is already running on {path}.")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with Server(str(path), Handler) as server:
+        try:
+            if ready is not None:
+                ready(server)
+            server.serve_forever()
+        finally:
+            path.unlink(missing_ok=True)
@@ -0,0 +1,30 @@
+import csv
+import json
+from typing import IO, Iterable
+
+FORMATS = ("csv", "jsonl", "tsv")
+
+FIELDNAMES = ["index", "date", "amount", "category", "description"]
+
+
+def write_rows(rows: Iterable[dict], file: IO[str], file_format: str) -> int:
+    """Write found transaction rows to file as they come, return the number of rows.
+
+    CSV and TSV files start with a header, missing descriptions are written as empty
+    values. JSON Lines files have an object per row.
+    """
+    count = 0
+
+    def counted(rows):
+        nonlocal count
+        for count, row in enumerate(rows, 1):
+            yield row
+
+    if file_format == "jsonl":
+        file.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in counted(rows))
+    else:
+        delimiter = "\t" if file_format == "tsv" else ","
+        writer = csv.DictWriter(file, FIELDNAMES, delimiter=delimiter, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(counted(rows))
+    return count
@@ -0,0 +1,72 @@
+import csv
+import datetime
+import json
+from typing import IO, Iterator
+
+import click
+
+from personal_wallet.cli_types import AMOUNT, CATEGORY, DATE
+from personal_wallet.models.transaction import Transaction
+from personal_wallet.models.transaction_table import TransactionTable
+
+FORMATS = ("csv", "jsonl")
+
+
+class RowError(ValueError):
+    """Raised for a row of imported file that isn't a valid transaction."""
+
+    def __init__(self, number: int, message: str):
+        super().__init__(f"Row {number}: {message}")
+        self.number = number
+
+
+def guess_format(filename: str) -> str:
+    """Return import format by file extension, csv by default."""
+    return "jsonl" if filename.endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def parse_row(row: dict) -> Transaction:
+    """Create transaction from imported row, validated as `add` command options."""
+    if not isinstance(row, dict):
+        raise ValueError("Expected an object with transaction fields.")
+    date = row.get("date") or str(datetime.date.today())
+    for name in ("amount", "category"):
+        if row.get(name) in (None, ""):
+            raise ValueError(f"Missing {name}.")
+    description = row.get("description")
+    return Transaction(
+        date=DATE.convert(str(date), None, None),
+        amount=AMOUNT.convert(str(row["amount"]), None, None),
+        category=CATEGORY.convert(str(row["category"]), None, None),
+        description=None if description in (None, "") else str(description),
+    )
+
+
+def read_transactions(file: IO[str], file_format: str) -> Iterator[Transaction]:
+    """Read transactions from csv file with a header or JSON Lines file one by one.
+
+    Raises RowError on the first invalid row, after all the previous rows were yielded.
+    """
+    if file_format == "csv":
+        rows = enumerate(csv.DictReader(file), 1)
+    else:
+        rows = ((number, line) for number, line in enumerate(file, 1) if line.strip())
+
+    for number, row in rows:
+        try:
+            if file_format == "jsonl":
+                row = json.loads(row)
+            transaction = parse_row(row)
+        except click.BadParameter as e:
+            raise RowError(number, e.message) from e
+        except ValueError as e:
+            raise RowError(number, str(e)) from e
+        yield transaction
+
+
+def read_table(file: IO[str], file_format: str) -> TransactionTable:
+    """Read all transactions of the file into a table, so they are all validated before
+    any of them is added. Raises RowError on the first invalid row."""
+    table = TransactionTable()
+    table.extend(read_transactions(file, file_format))
+    return table
@@ -0,0 +1,31 @@
+import importlib
+
+import click
+
+
+class LazyGroup(click.Group):
+    """Click group importing its subcommands only when they are invoked or listed.
+
+    Subcommands are given as a mapping of command names to import paths of command
+    objects, e.g. `{"balance": "personal_wallet.commands.balance"}`, so `--version` and
+    `--help` of the group don't import the commands and their dependencies at all.
+    """
+
+    def __init__(self, *args, lazy_subcommands: dict[str, str] | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_subcommands = lazy_subcommands or {}
+
+    def list_commands(self, ctx: click.Context) -> list[str]:
+        return sorted([*super().list_commands(ctx), *self.lazy_subcommands])
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> click.Command | None:
+        if cmd_name in self.lazy_subcommands:
+            return self._load(cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+    def _load(self, cmd_name: str) -> click.Command:
+        module_name, _, command_name = self.lazy_subcommands[cmd_name].rpartition(".")
+        command = getattr(importlib.import_module(module_name), command_name)
+        if not isinstance(command, click.Command):
+            raise ValueError(f"{self.lazy_subcommands[cmd_name]} is not a click command.")
+        return command
@@ -0,0 +1,141 @@
+import datetime
+import itertools
+import operator
+import sys
+from array import array
+from typing import Callable, Iterator, Sequence
+
+from personal_wallet.models.transaction_table import TransactionTable, date_of
+
+# Labels of date groups by grouping.
+DATE_GROUPINGS: dict[str, Callable[[datetime.datetime], str]] = {
+    "year": lambda date: f"{date.year:04d}",
+    "month": lambda date: f"{date.year:04d}-{date.month:02d}",
+    "week": lambda date: "{0:04d}-W{1:02d}".format(*date.isocalendar()),
+}
+
+GROUPINGS = (*DATE_GROUPINGS, "category", "description")
+
+FIELDS = ["count", "income", "expenses", "balance", "average", "min", "max"]
+
+# Number of combinations of groups of several groupings, over which aggregates are kept
+# only for combinations found in the table.
+MAX_COMBINED_GROUPS = 1 << 20
+
+
+def group_column(table: TransactionTable, grouping: str) -> tuple[Sequence[int], list[str]]:
+    """Return column of group codes of table rows and labels of groups by their codes.
+    Codes are numbered in order of labels."""
+    if grouping in DATE_GROUPINGS:
+        column, label_date = table.dates, DATE_GROUPINGS[grouping]
+
+        def label(ordinal: int) -> str:
+            return label_date(date_of(ordinal))
+
+    elif grouping == "category":
+        column, label = table.categories, table.category_names.__getitem__
+    else:
+        column, label = table.descriptions, lambda description: description or ""
+    # Values repeat a lot, so only distinct values are labeled, and rows are coded by
+    # looking up their value.
+    value_labels = {value: label(value) for value in set(column)}
+    labels = sorted(set(value_labels.values()))
+    label_codes = {label: code for code, label in enumerate(labels)}
+    value_codes = {value: label_codes[label] for value, label in value_labels.items()}
+    return array("I", map(value_codes.__getitem__, column)), labels
+
+
+def group_codes(
+    table: TransactionTable, group_by: Sequence[str]
+) -> tuple[Sequence[int], list[tuple]]:
+    """Return column of group codes of table rows by all the groupings and label tuples of
+    groups by their codes."""
+    codes, labels = group_column(table, group_by[0])
+    labels = [(label,) for label in labels]
+    for grouping in group_by[1:]:
+        more_codes, more_labels = group_column(table, grouping)
+        radix = len(more_labels)
+        combined = map(operator.add, map(operator.mul, codes, itertools.repeat(radix)), more_codes)
+        if len(labels) * radix <= MAX_COMBINED_GROUPS:
+            codes = array("Q", combined)
+            labels = [label + (more,) for label in labels for more in more_labels]
+        else:
+            found = {}
+            codes = array("I", (found.setdefault(code, len(found)) for code in combined))
+            labels = [labels[code // radix] + (more_labels[code % radix],) for code in found]
+    return codes, labels
+
+
+def aggregate(
+    table: TransactionTable,
+    group_by: Sequence[str],
+    date: datetime.datetime | tuple[datetime.datetime, datetime.datetime] | None = None,
+    category: str | None = None,
+) -> list[dict]:
+    """Return count, income and expenses totals, balance and average, min and max amount of
+    transactions within date and category grouped by group_by, in order of groups.
+
+    Group codes are computed column at a time, then all the groups are aggregated in one
+    pass over group code, amount and category code columns.
+    """
+    codes, labels = group_codes(table, group_by)
+    groups = len(labels)
+    if date is not None or category is not None:
+        # Rows left out are aggregated into an extra group, which isn't returned.
+        codes = array(codes.typecode, select(table, codes, groups, date, category))
+
+    counts = [0] * (groups + 1)
+    totals = [[0] * (groups + 1) for _ in table.category_names]
+    minimums = [sys.maxsize] * (groups + 1)
+    maximums = [-1] * (groups + 1)
+    for code, amount, category_code in zip(codes, table.amounts, table.categories):
+        counts[code] += 1
+        totals[category_code][code] += amount
+        if amount < minimums[code]:
+            minimums[code] = amount
+        if amount > maximums[code]:
+            maximums[code] = amount
+
+    def category_totals(name: str) -> list[int]:
+        code = table.category_codes.get(name)
+        return totals[code] if code is not None else [0] * (groups + 1)
+
+    income, expenses = category_totals("income"), category_totals("expenses")
+    rows = []
+    for code, label in sorted(enumerate(labels), key=lambda item: item[1]):
+        if not counts[code]:
+            continue
+        rows.append(
+            {
+                **dict(zip(group_by, label)),
+                "count": counts[code],
+                "income": income[code],
+                "expenses": expenses[code],
+                "balance": income[code] - expenses[code],
+                "average": round((income[code] + expenses[code]) / counts[code], 2),
+                "min": minimums[code],
+                "max": maximums[code],
+            }
+        )
+    return rows
+
+
+def select(
+    table: TransactionTable,
+    codes: Sequence[int],
+    excluded: int,
+    date: datetime.datetime | tuple[datetime.datetime, datetime.datetime] | None,
+    category: str | None,
+) -> Iterator[int]:
+    """Return group codes of rows within date and category, and excluded code of others."""
+    flags = []
+    if date is not None:
+        date_from, date_to = date if isinstance(date, tuple) else (date, date)
+        date_from, date_to = date_from.toordinal(), date_to.toordinal()
+        within = {ordinal: date_from <= ordinal <= date_to for ordinal in set(table.dates)}
+        flags.append(map(within.__getitem__, table.dates))
+    if category is not None:
+        flags.append(map(category.__eq__, map(table.category_names.__getitem__, table.categories)))
+    selected = flags[0] if len(flags) == 1 else map(operator.and_, *flags)
+    # Picks the code of selected rows from (excluded, code) pairs.
+    return map(operator.getitem, zip(itertools.repeat(excluded), codes), selected)
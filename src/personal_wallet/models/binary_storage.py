@@ -0,0 +1,305 @@
+import datetime
+import functools
+import mmap
+import os
+import re
+import struct
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator
+
+from personal_wallet.models.storage import IndexedStorage
+from personal_wallet.models.transaction import Transaction
+
+MAGIC = b"PWREC001"
+
+# Fixed-width record: epoch day, category code, amount, description offset and length
+# in the string heap. Offset -1 stands for missing description.
+RECORD = struct.Struct("<iB3xqqI4x")
+
+# Records unpacked per mapping of the files by scans, which yield them only once the files
+# are closed, so a consumer stopping early leaves no file open.
+SCAN_CHUNK_RECORDS = 1 << 14
+
+CATEGORIES = ("income", "expenses")
+CATEGORY_CODES = {category: code for code, category in enumerate(CATEGORIES)}
+
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+
+def to_epoch_day(date: datetime.datetime) -> int:
+    return date.toordinal() - EPOCH_ORDINAL
+
+
+@functools.lru_cache(maxsize=None)
+def from_epoch_day(day: int) -> str:
+    """Return date in YYYY-MM-DD format. Cached, since ledgers repeat dates a lot."""
+    return str(datetime.date.fromordinal(day + EPOCH_ORDINAL))
+
+
+class BinaryStorage(IndexedStorage):
+    """Concrete class for fixed-width binary record storage.
+
+    Records live in a memory-mapped file, so record N is found by its offset and
+    dates, amounts and categories are scanned without creating transactions.
+    Descriptions are appended to a separate string heap file.
+    """
+
+    filename = "transactions.bin"
+
+    @property
+    def heap_file(self):
+        return self.file.with_suffix(".heap")
+
+    @contextmanager
+    def mapped(self):
+        """Map records and heap files into memory, yielding (records, heap) views, which
+        are closed along with the files once the block is left."""
+        try:
+            records_file = open(self.file, "rb")
+        except FileNotFoundError:
+            yield memoryview(b""), b""
+            return
+        with records_file, open(self.heap_file, "rb") as heap_file:
+            records, heap = self._map(records_file), self._map(heap_file)
+            try:
+                if records[: len(MAGIC)] != MAGIC:
+                    raise ValueError(f"{self.file} is not a transactions record file.")
+                with memoryview(records) as view, view[len(MAGIC) :] as body:
+                    yield body, heap
+            finally:
+                for mapping in (records, heap):
+                    if isinstance(mapping, mmap.mmap):
+                        mapping.close()
+
+    def _scan(self, start: int, stop: int, unpack: Callable) -> Iterator:
+        """Yield items of lists returned by unpack(records, heap, first) for chunks of
+        records from start to stop, first being the index of the first of them. Files
+        are mapped only while a chunk is unpacked."""
+        for chunk_start in range(start, stop, SCAN_CHUNK_RECORDS):
+            chunk_stop = min(stop, chunk_start + SCAN_CHUNK_RECORDS)
+            with (
+                self.mapped() as (records, heap),
+                records[chunk_start * RECORD.size : chunk_stop * RECORD.size] as chunk,
+            ):
+                results = unpack(chunk, heap, chunk_start)
+            yield from results
+
+    @staticmethod
+    def _map(file) -> mmap.mmap | bytes:
+        # Zero-length files can't be memory-mapped.
+        if not file.seek(0, 2):
+            return b""
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _pack(self, transaction: Transaction, heap_offset: int) -> tuple[bytes, bytes]:
+        """Return packed record and description bytes to put at heap_offset."""
+        try:
+            category = CATEGORY_CODES[transaction.category]
+        except KeyError as e:
+            raise ValueError(f"Unknown category {transaction.category!r}.") from e
+        if transaction.description is None:
+            description, heap_offset = b"", -1
+        else:
+            description = transaction.description.encode("utf-8")
+        record = RECORD.pack(
+            to_epoch_day(transaction.date),
+            category,
+            transaction.amount,
+            heap_offset,
+            len(description),
+        )
+        return record, description
+
+    @staticmethod
+    def _unpack_description(heap, offset: int, length: int) -> str | None:
+        if offset < 0:
+            return None
+        return bytes(heap[offset : offset + length]).decode("utf-8")
+
+    def _unpack(self, record: tuple, heap) -> Transaction:
+        day, category, amount, offset, length = record
+        return Transaction(
+            date=datetime.datetime.fromordinal(day + EPOCH_ORDINAL),
+            amount=amount,
+            category=CATEGORIES[category],
+            description=self._unpack_description(heap, offset, length),
+        )
+
+    def read_data(self) -> list[Transaction]:
+        """Read all the transactions."""
+        return list(self.iter_data())
+
+    def iter_data(self) -> Iterator[Transaction]:
+        """Read transactions record by record."""
+        return self._scan(
+            0,
+            self.count_data(),
+            lambda records, heap, first: [
+                self._unpack(record, heap) for record in RECORD.iter_unpack(records)
+            ],
+        )
+
+    def write_data(self, transactions: list[Transaction]) -> None:
+        """Write all the transactions, replacing records and heap files by new ones once
+        they are complete and synced to disk."""
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        records_temp = self.file.with_suffix(".bin.tmp")
+        heap_temp = self.heap_file.with_suffix(".heap.tmp")
+        with self.locked():
+            with open(records_temp, "wb") as records_file, open(heap_temp, "wb") as heap_file:
+                records_file.write(MAGIC)
+                self._write(records_file, heap_file, transactions)
+                for file in (records_file, heap_file):
+                    file.flush()
+                    os.fsync(file.fileno())
+            # Heap goes first, as records of the old heap don't point past its end.
+            os.replace(heap_temp, self.heap_file)
+            os.replace(records_temp, self.file)
+
+    def append_data(self, transaction: Transaction) -> None:
+        """Append a new transaction."""
+        self.extend_data([transaction])
+
+    def extend_data(self, transactions: Iterable[Transaction]) -> int:
+        """Append many transactions, opening records and heap files only once and syncing
+        them to disk at the end."""
+        with self.locked():
+            if not self.file.exists():
+                self.write_data([])
+            with open(self.file, "ab") as records_file, open(self.heap_file, "ab") as heap_file:
+                count = self._write(records_file, heap_file, transactions)
+                # Heap goes first, so synced records don't point past its synced end.
+                for file in (heap_file, records_file):
+                    file.flush()
+                    os.fsync(file.fileno())
+            return count
+
+    def _write(self, records_file, heap_file, transactions: Iterable[Transaction]) -> int:
+        heap_offset = heap_file.tell()
+        count = 0
+        for transaction in transactions:
+            record, description = self._pack(transaction, heap_offset)
+            records_file.write(record)
+            heap_file.write(description)
+            heap_offset += len(description)
+            count += 1
+        return count
+
+    def count_data(self) -> int:
+        try:
+            size = self.file.stat().st_size
+        except FileNotFoundError:
+            return 0
+        return max(0, size - len(MAGIC)) // RECORD.size
+
+    def read_totals(self) -> tuple[int, int]:
+        """Return total income and total expenses, scanning only record columns."""
+        totals = [0] * len(CATEGORIES)
+        with self.mapped() as (records, _):
+            for _, category, amount, _, _ in RECORD.iter_unpack(records):
+                totals[category] += amount
+        return totals[CATEGORY_CODES["income"]], totals[CATEGORY_CODES["expenses"]]
+
+    def find_data(
+        self,
+        index: int | tuple[int, int] | None,
+        date: datetime.datetime | tuple[datetime.datetime, datetime.datetime] | None,
+        amount: int | tuple[int, int] | None,
+        category: str | None,
+        description: str | re.Pattern | None,
+    ) -> Iterator[dict]:
+        """Scan records matching index, date, amount, category or description,
+        yielding them as they are found."""
+
+        # Define search range.
+        start, stop = 0, self.count_data()
+        if index is not None:
+            if isinstance(index, tuple):
+                start, stop = index[0], min(stop, index[1] + 1)
+            else:
+                start, stop = index, min(stop, index + 1)
+        if start >= stop:
+            return
+
+        # Integer bounds for record columns.
+        date_from = date_to = amount_from = amount_to = category_code = None
+        if date is not None:
+            date_from, date_to = date if isinstance(date, tuple) else (date, date)
+            date_from, date_to = to_epoch_day(date_from), to_epoch_day(date_to)
+        if amount is not None:
+            amount_from, amount_to = amount if isinstance(amount, tuple) else (amount, amount)
+        if category is not None:
+            category_code = CATEGORY_CODES.get(category, -1)
+
+        def unpack(records: memoryview, heap, first: int) -> list[dict]:
+            found = []
+            for i, (day, code, value, offset, length) in enumerate(
+                RECORD.iter_unpack(records), first
+            ):
+                if (
+                    date_from is not None
+                    and not date_from <= day <= date_to
+                    or amount_from is not None
+                    and not amount_from <= value <= amount_to
+                    or category_code is not None
+                    and code != category_code
+                ):
+                    continue
+                text = self._unpack_description(heap, offset, length)
+                if (
+                    isinstance(description, str)
+                    and text != description
+                    or isinstance(description, re.Pattern)
+                    and re.search(description, text or "") is None
+                ):
+                    continue
+                found.append(
+                    {
+                        "index": i,
+                        "date": from_epoch_day(day),
+                        "amount": value,
+                        "category": CATEGORIES[code],
+                        "description": text,
+                    }
+                )
+            return found
+
+        yield from self._scan(start, stop, unpack)
+
+    def get_data(self, index: int) -> Transaction:
+        """Return transaction by its index."""
+        if not 0 <= index < self.count_data():
+            raise IndexError(index)
+        with self.mapped() as (records, heap):
+            record = RECORD.unpack_from(records, index * RECORD.size)
+            return self._unpack(record, heap)
+
+    def update_data(
+        self, index: int, transaction: Transaction, previous: Transaction | None = None
+    ) -> None:
+        """Overwrite record in place, appending the new description to the heap."""
+        with self.locked():
+            if not 0 <= index < self.count_data():
+                raise IndexError(index)
+            with open(self.heap_file, "ab") as heap_file:
+                record, description = self._pack(transaction, heap_file.tell())
+                heap_file.write(description)
+            with open(self.file, "r+b") as records_file:
+                records_file.seek(len(MAGIC) + index * RECORD.size)
+                records_file.write(record)
+
+    def delete_data(self, index: int, previous: Transaction | None = None) -> None:
+        """Delete record by its index, writing the records around it to a new records file,
+        which replaces the current one once complete and synced to disk. Heap is kept, as
+        the remaining records point into it."""
+        with self.locked():
+            if not 0 <= index < self.count_data():
+                raise IndexError(index)
+            records_temp = self.file.with_suffix(".bin.tmp")
+            with self.mapped() as (records, _), open(records_temp, "wb") as records_file:
+                records_file.write(MAGIC)
+                records_file.write(records[: index * RECORD.size])
+                records_file.write(records[(index + 1) * RECORD.size :])
+                records_file.flush()
+                os.fsync(records_file.fileno())
+            os.replace(records_temp, self.file)
@@ -0,0 +1,102 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+
+class CommitQueue:
+    """Rows appended by processes waiting for the storage lock, to be committed together by
+    whichever process takes the lock next.
+
+    Every waiting row is put into a file of its own in the queue directory. Before
+    appending a batch of rows, the committing process syncs a record of it with the data
+    file size before and after the batch to disk, so a batch interrupted by a crash is
+    either found complete or cut off the data file and committed again from the queued
+    files, which are removed only after the batch is synced. Appends of rows not queued,
+    including ones of unknown size, are recorded the same way, so a row torn by a crash is
+    known to be one.
+    """
+
+    def __init__(self, data_file: Path):
+        self.data_file = data_file
+        self.directory = data_file.with_name(data_file.name + ".pending")
+        self.record_file = self.directory / "batch.json"
+
+    def put(self, data: bytes) -> Path:
+        """Queue row data, returning its file, which is gone once the row is committed."""
+        name = f"{time.time_ns():020d}-{os.getpid()}-{threading.get_ident()}"
+        path = self.directory / f"{name}.row"
+        while True:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            temp_file = path.with_suffix(".tmp")
+            try:
+                temp_file.write_bytes(data)
+            except FileNotFoundError:
+                # Emptied queue directory was removed by the committing process meanwhile.
+                continue
+            os.replace(temp_file, path)
+            return path
+
+    def take(self) -> tuple[list[Path], bytes]:
+        """Return queued files in order of queueing and their rows. Rows written only
+        partially, by a process killed along with the system, are dropped."""
+        files = []
+        rows = []
+        for path in sorted(self.directory.glob("*.row")):
+            data = path.read_bytes()
+            if data.endswith(b"\n"):
+                files.append(path)
+                rows.append(data)
+            else:
+                path.unlink()
+        return files, b"".join(rows)
+
+    def begin(self, files: list[Path], inode: int, start: int, end: int | None) -> None:
+        """Record batch of queued files about to be appended at start of the data file,
+        ending at end, or None if the size of the batch isn't known in advance."""
+        record = {"inode": inode, "start": start, "end": end, "files": [f.name for f in files]}
+        self.directory.mkdir(parents=True, exist_ok=True)
+        temp_file = self.record_file.with_suffix(".tmp")
+        with open(temp_file, "w", encoding="utf-8") as file:
+            json.dump(record, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_file, self.record_file)
+
+    def end(self, files: list[Path]) -> None:
+        """Remove committed files and the record of their batch."""
+        for path in files:
+            path.unlink(missing_ok=True)
+        self.record_file.unlink(missing_ok=True)
+        try:
+            self.directory.rmdir()
+        except OSError:
+            # More rows are queued or there's no queue at all.
+            pass
+
+    def recover(self) -> None:
+        """Finish batch interrupted by a crash: remove its files if it reached the data
+        file, otherwise cut it off the data file, leaving its files queued."""
+        try:
+            record = json.loads(self.record_file.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except ValueError:
+            # Record wasn't synced, so nothing was appended after it.
+            self.record_file.unlink()
+            return
+        try:
+            stat = self.data_file.stat()
+        except FileNotFoundError:
+            stat = None
+        end = record["end"]
+        if stat is None or stat.st_ino == record["inode"] and (end is None or stat.st_size < end):
+            if stat is not None:
+                os.truncate(self.data_file, record["start"])
+            self.record_file.unlink()
+        else:
+            # Batch is complete, or the data file was rewritten since then, which happens
+            # only after complete batches. Batch of unknown size is complete only once its
+            # record is removed.
+            self.end([self.directory / name for name in record["files"]])
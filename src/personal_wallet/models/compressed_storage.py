@@ -0,0 +1,414 @@
+import contextlib
+import csv
+import datetime
+import io
+import json
+import os
+import re
+import struct
+import zlib
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from personal_wallet.models.csv_decoder import CsvRowDecoder
+from personal_wallet.models.query import Query
+from personal_wallet.models.storage import IndexedStorage, count_totals, encode_rows
+from personal_wallet.models.transaction import Transaction
+
+# Length of the compressed rows, prefixed to every block.
+FRAME = struct.Struct("<I")
+
+# Inode of the data file the last block follows, prefixed to the last block file.
+LAST_HEADER = struct.Struct("<Q")
+
+COMPRESSION_LEVEL = 6
+
+
+def compress(transactions: list[Transaction]) -> bytes:
+    """Return block of transactions csv rows compressed with zlib, prefixed with its length."""
+    data = zlib.compress(encode_rows(transactions), COMPRESSION_LEVEL)
+    return FRAME.pack(len(data)) + data
+
+
+def decompress(block: bytes) -> list[Transaction]:
+    """Return transactions of compressed block."""
+    rows = zlib.decompress(block[FRAME.size :]).decode("utf-8")
+    decode = CsvRowDecoder(Transaction.fieldnames()).decode
+    return [decode(row) for row in csv.reader(io.StringIO(rows)) if row]
+
+
+def describe(transactions: list[Transaction], length: int, offset: int | None = None) -> dict:
+    """Return block index entry: block offset and length in the data file, count, income
+    and expenses totals and date range of its transactions."""
+    entry = {} if offset is None else {"offset": offset}
+    dates = [transaction.date for transaction in transactions]
+    return {
+        **entry,
+        "length": length,
+        **count_totals(transactions),
+        "min_date": f"{min(dates):%Y-%m-%d}",
+        "max_date": f"{max(dates):%Y-%m-%d}",
+    }
+
+
+class CompressedStorage(IndexedStorage):
+    """Concrete class for storage of transactions in compressed blocks.
+
+    Csv rows of every block_rows transactions are compressed with zlib independently of
+    other blocks and appended to the data file. A block index lists offset and length of
+    every block in the data file along with count, totals and date range of its
+    transactions, so index and date queries decompress only the blocks within range and
+    the balance is added up from the index.
+
+    The last block, which isn't full yet, is kept in a file of its own, which is replaced
+    on appending, so appends touch only the last block and the index. It's marked with the
+    inode of the data file it follows, so the index rebuilt from the data file takes it
+    back unless the data file was rewritten with all the transactions since. Changed blocks are
+    appended to the data file anew, and the data file is rewritten once more of it is taken
+    by replaced blocks than by the current ones.
+    """
+
+    filename = "transactions.zblocks"
+
+    # Number of transactions in a block.
+    block_rows = 1024
+
+    @property
+    def index_file(self) -> Path:
+        return self.file.with_suffix(".zindex")
+
+    @property
+    def last_file(self) -> Path:
+        return self.file.with_suffix(".zlast")
+
+    def identity(self) -> dict | None:
+        """Return size and modification time of the block index, saved on every change."""
+        try:
+            stat = self.index_file.stat()
+        except FileNotFoundError:
+            return None
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def _inode(self) -> int | None:
+        try:
+            return self.file.stat().st_ino
+        except FileNotFoundError:
+            return None
+
+    def _load_index(self) -> dict:
+        """Return saved block index. Missing or damaged index describes no data file, so
+        it's rebuilt if there is one."""
+        try:
+            index = json.loads(self.index_file.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            index = None
+        if not isinstance(index, dict) or set(index) != {"inode", "blocks", "last"}:
+            return {"inode": None, "blocks": [], "last": None}
+        return index
+
+    def _save_index(self, index: dict) -> None:
+        """Replace block index atomically. Called holding the lock."""
+        temp_file = self.index_file.with_suffix(".zindex.tmp")
+        temp_file.write_text(json.dumps(index), encoding="utf-8")
+        os.replace(temp_file, self.index_file)
+
+    def _stale(self, index: dict) -> bool:
+        if index["inode"] != self._inode():
+            return True
+        try:
+            size = self.last_file.stat().st_size
+        except FileNotFoundError:
+            size = None
+        return index["last"] is not None and index["last"]["length"] != size
+
+    def read_index(self) -> dict:
+        """Return data file inode, entries of blocks in the data file and the last block.
+
+        Index of a data file replaced by an interrupted rewrite is rebuilt from the data
+        file. Last block replaced by an interrupted append is described anew.
+        """
+        index = self._load_index()
+        if self._stale(index):
+            with self.locked():
+                index = self._load_index()
+                if index["inode"] != self._inode():
+                    index = self._rebuild_index()
+                    self._save_index(index)
+                elif self._stale(index):
+                    index["last"] = self._describe_last(index["inode"])
+                    self._save_index(index)
+        return index
+
+    def _describe_last(self, inode: int | None) -> dict | None:
+        """Return index entry of the last block file following data file inode. Last block
+        file of another data file, left over by an interrupted rewrite, is dropped."""
+        try:
+            data = self.last_file.read_bytes()
+        except FileNotFoundError:
+            return None
+        try:
+            if LAST_HEADER.unpack_from(data)[0] == inode:
+                return describe(decompress(data[LAST_HEADER.size :]), len(data))
+        except (struct.error, zlib.error):
+            pass
+        self.last_file.unlink()
+        return None
+
+    def _rebuild_index(self) -> dict:
+        """Describe blocks of the data file one by one, and the last block file following
+        it."""
+        blocks = []
+        try:
+            data = self.file.read_bytes()
+        except FileNotFoundError:
+            data = b""
+        offset = 0
+        while offset + FRAME.size <= len(data):
+            (length,) = FRAME.unpack_from(data, offset)
+            block = data[offset : offset + FRAME.size + length]
+            try:
+                transactions = decompress(block)
+            except zlib.error:
+                # Block cut off by a crash.
+                break
+            blocks.append(describe(transactions, len(block), offset))
+            offset += len(block)
+        inode = self._inode()
+        return {"inode": inode, "blocks": blocks, "last": self._describe_last(inode)}
+
+    @staticmethod
+    def _blocks(index: dict) -> list[dict]:
+        """Return index entries of all the blocks, the last one included."""
+        return index["blocks"] + ([index["last"]] if index["last"] is not None else [])
+
+    @contextlib.contextmanager
+    def _opened(self):
+        """Yield block index and the data file it describes opened for reading, or None if
+        there is no data file."""
+        while True:
+            index = self.read_index()
+            try:
+                datafile = open(self.file, "rb")
+            except FileNotFoundError:
+                datafile = None
+                break
+            if os.fstat(datafile.fileno()).st_ino == index["inode"]:
+                break
+            # Data file was rewritten after reading the index.
+            datafile.close()
+        with datafile or contextlib.nullcontext():
+            yield index, datafile
+
+    def _read_block(self, datafile, entry: dict) -> list[Transaction]:
+        if "offset" not in entry:
+            return decompress(self.last_file.read_bytes()[LAST_HEADER.size :])
+        datafile.seek(entry["offset"])
+        return decompress(datafile.read(entry["length"]))
+
+    def _write_block(self, datafile, transactions: list[Transaction]) -> dict:
+        """Append block to data file opened for writing, returning its index entry."""
+        block = compress(transactions)
+        offset = datafile.seek(0, os.SEEK_END)
+        datafile.write(block)
+        return describe(transactions, len(block), offset)
+
+    def _write_last(self, transactions: list[Transaction], inode: int) -> dict | None:
+        """Replace last block file following data file inode atomically, returning its index
+        entry."""
+        if not transactions:
+            self.last_file.unlink(missing_ok=True)
+            return None
+        block = LAST_HEADER.pack(inode) + compress(transactions)
+        temp_file = self.last_file.with_suffix(".zlast.tmp")
+        with open(temp_file, "wb") as blockfile:
+            blockfile.write(block)
+            blockfile.flush()
+            os.fsync(blockfile.fileno())
+        os.replace(temp_file, self.last_file)
+        return describe(transactions, len(block))
+
+    @staticmethod
+    def _end(index: dict) -> int:
+        """Return end of the blocks in the data file. Anything after it was left by an
+        interrupted change."""
+        return max((entry["offset"] + entry["length"] for entry in index["blocks"]), default=0)
+
+    @contextlib.contextmanager
+    def _appending(self, index: dict):
+        """Yield data file opened for appending blocks after the blocks in the index, and
+        sync it to disk. Called holding the lock."""
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        with open(os.open(self.file, os.O_RDWR | os.O_CREAT, 0o644), "r+b") as datafile:
+            index["inode"] = os.fstat(datafile.fileno()).st_ino
+            end = self._end(index)
+            datafile.truncate(end)
+            datafile.seek(end)
+            yield datafile
+            datafile.flush()
+            os.fsync(datafile.fileno())
+
+    def read_data(self) -> list[Transaction]:
+        return list(self.iter_data())
+
+    def iter_data(self) -> Iterator[Transaction]:
+        """Decompress blocks one by one."""
+        with self._opened() as (index, datafile):
+            for entry in self._blocks(index):
+                yield from self._read_block(datafile, entry)
+
+    def write_data(self, transactions: Iterable[Transaction]) -> None:
+        """Write all the transactions in full blocks to a new data file, replacing it
+        atomically."""
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        temp_file = self.file.with_suffix(".zblocks.tmp")
+        with self.locked():
+            index = {"inode": None, "blocks": [], "last": None}
+            with open(temp_file, "wb") as datafile:
+                rows = []
+                # Transactions may be streamed from the current data file, which is
+                # replaced only when the new one is complete and synced to disk.
+                for transaction in transactions:
+                    rows.append(transaction)
+                    if len(rows) == self.block_rows:
+                        index["blocks"].append(self._write_block(datafile, rows))
+                        rows = []
+                if rows:
+                    index["blocks"].append(self._write_block(datafile, rows))
+                datafile.flush()
+                os.fsync(datafile.fileno())
+                index["inode"] = os.fstat(datafile.fileno()).st_ino
+            os.replace(temp_file, self.file)
+            self.last_file.unlink(missing_ok=True)
+            self._save_index(index)
+
+    def append_data(self, transaction: Transaction) -> None:
+        self.extend_data([transaction])
+
+    def extend_data(self, transactions: Iterable[Transaction]) -> int:
+        """Add transactions to the last block, appending it to the data file whenever it's
+        full, and replace the last block file with the rest."""
+        with self.locked():
+            index = self.read_index()
+            rows = self._read_block(None, index["last"]) if index["last"] is not None else []
+            count = 0
+            sealed = False
+            with self._appending(index) as datafile:
+                for transaction in transactions:
+                    rows.append(transaction)
+                    count += 1
+                    if len(rows) == self.block_rows:
+                        index["blocks"].append(self._write_block(datafile, rows))
+                        rows = []
+                        sealed = True
+            if sealed:
+                # Index is saved before the last block file is replaced, so the rows of
+                # appended blocks are never found in both.
+                index["last"] = None
+                self._save_index(index)
+            if count:
+                index["last"] = self._write_last(rows, index["inode"])
+                self._save_index(index)
+        return count
+
+    def compact(self) -> None:
+        """Rewrite the data file without replaced blocks, in full blocks."""
+        with self.locked():
+            self.write_data(self.iter_data())
+
+    def count_data(self) -> int:
+        return sum(entry["count"] for entry in self._blocks(self.read_index()))
+
+    def read_totals(self) -> tuple[int, int]:
+        """Add up block totals from the index, without decompressing any block."""
+        blocks = self._blocks(self.read_index())
+        return (
+            sum(entry["income"] for entry in blocks),
+            sum(entry["expenses"] for entry in blocks),
+        )
+
+    def find_data(
+        self,
+        index: int | tuple[int, int] | None,
+        date: datetime.datetime | tuple[datetime.datetime, datetime.datetime] | None,
+        amount: int | tuple[int, int] | None,
+        category: str | None,
+        description: str | re.Pattern | None,
+    ) -> Iterator[dict]:
+        """Decompress blocks within index and date range, yielding matching transactions
+        as they are found."""
+        start, stop = 0, None
+        if index is not None:
+            start, stop = index if isinstance(index, tuple) else (index, index)
+        date_from = date_to = None
+        if date is not None:
+            date_from, date_to = date if isinstance(date, tuple) else (date, date)
+            date_from, date_to = f"{date_from:%Y-%m-%d}", f"{date_to:%Y-%m-%d}"
+
+        matches = Query(date, amount, category, description).predicate()
+        with self._opened() as (block_index, datafile):
+            end = 0
+            for entry in self._blocks(block_index):
+                first, end = end, end + entry["count"]
+                if stop is not None and first > stop:
+                    break
+                if (
+                    end <= start
+                    or date_from is not None
+                    and (entry["max_date"] < date_from or entry["min_date"] > date_to)
+                ):
+                    continue
+                for i, transaction in enumerate(self._read_block(datafile, entry), first):
+                    if start <= i and (stop is None or i <= stop) and matches(transaction):
+                        yield {"index": i, **transaction.as_dict()}
+
+    def _locate(self, index: dict, position: int) -> tuple[int, int]:
+        """Return number of the block holding transaction by its index and its position in
+        the block. Number of the last block is the number of blocks in the data file."""
+        if position >= 0:
+            for number, entry in enumerate(self._blocks(index)):
+                if position < entry["count"]:
+                    return number, position
+                position -= entry["count"]
+        raise IndexError(position)
+
+    def get_data(self, index: int) -> Transaction:
+        """Return transaction by its index, decompressing only its block."""
+        with self._opened() as (block_index, datafile):
+            number, position = self._locate(block_index, index)
+            entry = self._blocks(block_index)[number]
+            return self._read_block(datafile, entry)[position]
+
+    def _change(self, index: int, transaction: Transaction | None) -> None:
+        """Replace transaction by its index, or delete it if transaction is None, rewriting
+        only its block."""
+        with self.locked():
+            block_index = self.read_index()
+            number, position = self._locate(block_index, index)
+            entry = self._blocks(block_index)[number]
+            with self._appending(block_index) as datafile:
+                transactions = self._read_block(datafile, entry)
+                if transaction is None:
+                    transactions.pop(position)
+                else:
+                    transactions[position] = transaction
+                if number == len(block_index["blocks"]):
+                    block_index["last"] = self._write_last(transactions, block_index["inode"])
+                elif transactions:
+                    block_index["blocks"][number] = self._write_block(datafile, transactions)
+                else:
+                    block_index["blocks"].pop(number)
+                # Reading the block moved the position, unless a block was written after.
+                size = datafile.seek(0, os.SEEK_END)
+            self._save_index(block_index)
+
+            current = sum(entry["length"] for entry in block_index["blocks"])
+            if size - current > current:
+                self.compact()
+
+    def update_data(
+        self, index: int, transaction: Transaction, previous: Transaction | None = None
+    ) -> None:
+        self._change(index, transaction)
+
+    def delete_data(self, index: int, previous: Transaction | None = None) -> None:
+        self._change(index, None)
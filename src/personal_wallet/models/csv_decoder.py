@@ -0,0 +1,55 @@
+import datetime
+import sys
+
+from personal_wallet.models.transaction import Transaction
+from personal_wallet.models.transaction_table import TransactionTable
+
+
+class CsvRowDecoder:
+    """Decodes rows of transactions csv file read with csv.reader.
+
+    Columns are taken by position, parsed dates are memoized by their text, since ledgers
+    repeat dates a lot, and category strings are interned.
+    """
+
+    def __init__(self, header: list[str]):
+        fieldnames = Transaction.fieldnames()
+        try:
+            self.positions = [header.index(name) for name in fieldnames]
+        except ValueError as e:
+            raise ValueError(f"CSV header {header!r} doesn't match {fieldnames!r}.") from e
+        self.in_order = header == fieldnames
+        self.dates = {}
+        self.ordinals = {}
+
+    def parse_date(self, value: str) -> datetime.datetime:
+        try:
+            return self.dates[value]
+        except KeyError:
+            date = datetime.datetime.strptime(value, "%Y-%m-%d")
+            self.dates[value] = date
+            return date
+
+    def parse_ordinal(self, value: str) -> int:
+        try:
+            return self.ordinals[value]
+        except KeyError:
+            ordinal = self.parse_date(value).toordinal()
+            self.ordinals[value] = ordinal
+            return ordinal
+
+    def columns(self, row: list[str]) -> list[str | None]:
+        """Return date, amount, category and description values of csv row."""
+        if self.in_order and len(row) == 4:
+            return row
+        return [row[i] if i < len(row) else None for i in self.positions]
+
+    def decode(self, row: list[str]) -> Transaction:
+        """Create transaction from csv row."""
+        date, amount, category, description = self.columns(row)
+        return Transaction(self.parse_date(date), int(amount), sys.intern(category), description)
+
+    def decode_into(self, table: TransactionTable, row: list[str]) -> None:
+        """Append csv row to transaction table without creating a transaction."""
+        date, amount, category, description = self.columns(row)
+        table.append_row(self.parse_ordinal(date), int(amount), category, description)
@@ -0,0 +1,149 @@
+import bisect
+import functools
+import re
+from array import array
+from typing import Iterable
+
+from personal_wallet.models.indexes import intersect
+from personal_wallet.models.journaled_file import JournaledFile
+
+VERSION = 1
+
+# Markers of description start and end, so prefix and suffix patterns have trigrams
+# of their own and literals shorter than three characters can still be looked up.
+START = "\x02"
+END = "\x03"
+
+# Regex metacharacters, which prevent taking a pattern as a literal string.
+SPECIAL_CHARS = set(".^$*+?{}[]\\|()")
+
+
+def parse_pattern(pattern: re.Pattern) -> tuple[str, bool, bool] | None:
+    """Return literal of a `%` description pattern and whether it's anchored to description
+    start and end, or None if the pattern isn't a plain string."""
+    source = pattern.pattern
+    if source.startswith("^") and source.endswith(".*?"):
+        literal, at_start, at_end = source[1:-3], True, False
+    elif source.startswith(".*?") and source.endswith("$"):
+        literal, at_start, at_end = source[3:-1], False, True
+    elif source.startswith(".*?"):
+        literal, at_start, at_end = source[3:], False, False
+    else:
+        return None
+    if SPECIAL_CHARS.intersection(literal):
+        return None
+    return literal, at_start, at_end
+
+
+def trigrams(text: str) -> set[str]:
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+class DescriptionIndex:
+    """Inverted index of transaction positions by exact description and by description
+    trigrams, used to find candidates for substring, prefix and suffix patterns."""
+
+    def __init__(self, descriptions: Iterable[str | None] = ()):
+        self.rows = 0
+        self.exact: dict[str | None, array] = {}
+        self.trigrams: dict[str, array] = {}
+        for description in descriptions:
+            self.add(self.rows, description)
+
+    @staticmethod
+    def _grams(description: str | None) -> set[str]:
+        if description is None:
+            return set()
+        return trigrams(f"{START}{description}{END}")
+
+    def add(self, position: int, description: str | None) -> None:
+        """Add description at position, which is either a new last row or a row whose
+        description was removed."""
+        postings = [self.exact.setdefault(description, array("i"))]
+        postings.extend(
+            self.trigrams.setdefault(gram, array("i")) for gram in self._grams(description)
+        )
+        for positions in postings:
+            if not positions or positions[-1] < position:
+                positions.append(position)
+            else:
+                positions.insert(bisect.bisect_left(positions, position), position)
+        self.rows = max(self.rows, position + 1)
+
+    def remove(self, position: int, description: str | None) -> None:
+        """Remove description at position, leaving the row without description indexed."""
+        for key, postings in [(description, self.exact)] + [
+            (gram, self.trigrams) for gram in self._grams(description)
+        ]:
+            positions = postings[key]
+            del positions[bisect.bisect_left(positions, position)]
+            if not positions:
+                del postings[key]
+
+    def delete(self, position: int, description: str | None) -> None:
+        """Remove the row at position, shifting positions of the rows after it."""
+        self.remove(position, description)
+        for postings in (self.exact, self.trigrams):
+            for positions in postings.values():
+                start = bisect.bisect_right(positions, position)
+                if start < len(positions):
+                    positions[start:] = array("i", (p - 1 for p in positions[start:]))
+        self.rows -= 1
+
+    def lookup(self, description: str | re.Pattern) -> list[int] | None:
+        """Return sorted positions of candidate transactions for description or pattern,
+        or None if the pattern can't be looked up and all transactions must be checked.
+        Candidates for a pattern still have to be matched against it."""
+        if isinstance(description, str):
+            return list(self.exact.get(description, ()))
+
+        parsed = parse_pattern(description)
+        if parsed is None:
+            return None
+        literal, at_start, at_end = parsed
+        grams = trigrams(f"{START if at_start else ''}{literal}{END if at_end else ''}")
+        if not grams:
+            return None
+        postings = sorted((self.trigrams.get(gram, ()) for gram in grams), key=len)
+        return functools.reduce(intersect, postings[1:], list(postings[0]))
+
+    def to_dict(self) -> dict:
+        return {
+            "rows": self.rows,
+            "exact": {key: positions.tobytes() for key, positions in self.exact.items()},
+            "trigrams": {key: positions.tobytes() for key, positions in self.trigrams.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DescriptionIndex":
+        index = cls()
+        index.rows = data["rows"]
+        for name in ("exact", "trigrams"):
+            postings = getattr(index, name)
+            for key, positions in data[name].items():
+                postings[key] = array("i", positions)
+        return index
+
+
+class DescriptionIndexFile(JournaledFile):
+    """Description index persisted next to the data file, kept up to date by the journal
+    of descriptions added, changed and deleted through the wallet."""
+
+    suffix = ".index"
+    version = VERSION
+
+    def to_dict(self, data: DescriptionIndex) -> dict:
+        return data.to_dict()
+
+    def from_dict(self, data: dict) -> DescriptionIndex:
+        return DescriptionIndex.from_dict(data)
+
+    def apply(self, data: DescriptionIndex, change: dict) -> None:
+        if change["operation"] == "add":
+            for description in change["descriptions"]:
+                data.add(data.rows, description)
+        elif change["operation"] == "update":
+            data.remove(change["position"], change["previous"])
+            data.add(change["position"], change["description"])
+        else:
+            data.delete(change["position"], change["previous"])
@@ -0,0 +1,77 @@
+import os
+import threading
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows, where storage isn't locked across processes.
+    fcntl = None
+
+
+class FileLock:
+    """Exclusive advisory lock of a lock file, held across processes with flock.
+
+    The lock is reentrant within a thread, so storage methods holding it can call each
+    other, and it's released by the system if the holding process dies.
+    """
+
+    def __init__(self, file: Path):
+        self.file = file
+        self.mutex = threading.RLock()
+        self.owner = None
+        self.depth = 0
+        self.fd = None
+
+    @property
+    def held(self) -> bool:
+        """Whether the lock is held by the current thread."""
+        return self.owner == threading.get_ident()
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """Take the lock, waiting for other holders if blocking, and return whether it's
+        taken."""
+        if not self.mutex.acquire(blocking):
+            return False
+        if self.depth == 0 and fcntl is not None:
+            try:
+                self.fd = self._lock(blocking)
+            except BaseException:
+                self.mutex.release()
+                raise
+            if self.fd is None:
+                self.mutex.release()
+                return False
+        self.owner = threading.get_ident()
+        self.depth += 1
+        return True
+
+    def _lock(self, blocking: bool) -> int | None:
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.file, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return None
+        except BaseException:
+            os.close(fd)
+            raise
+        return fd
+
+    def release(self) -> None:
+        self.depth -= 1
+        if self.depth == 0:
+            self.owner = None
+            if self.fd is not None:
+                fcntl.flock(self.fd, fcntl.LOCK_UN)
+                os.close(self.fd)
+                self.fd = None
+        self.mutex.release()
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
@@ -0,0 +1,50 @@
+import bisect
+import itertools
+from typing import Iterable
+
+
+class SortedIndex:
+    """Sorted index of transaction positions by an integer column, like date ordinal or
+    amount."""
+
+    def __init__(self, keys: Iterable[int]):
+        self.positions: dict[int, list[int]] = {}
+        for position, key in enumerate(keys):
+            self.positions.setdefault(key, []).append(position)
+        self.keys = sorted(self.positions)
+
+    def add(self, position: int, key: int) -> None:
+        if key not in self.positions:
+            bisect.insort(self.keys, key)
+            self.positions[key] = []
+        bisect.insort(self.positions[key], position)
+
+    def remove(self, position: int, key: int) -> None:
+        positions = self.positions[key]
+        del positions[bisect.bisect_left(positions, position)]
+        if not positions:
+            del self.positions[key]
+            del self.keys[bisect.bisect_left(self.keys, key)]
+
+    def lookup(self, start: int, end: int) -> list[int]:
+        """Return sorted positions of transactions with keys from start to end inclusive."""
+        low = bisect.bisect_left(self.keys, start)
+        high = bisect.bisect_right(self.keys, end)
+        if high - low == 1:
+            return self.positions[self.keys[low]]
+        return sorted(
+            itertools.chain.from_iterable(self.positions[key] for key in self.keys[low:high])
+        )
+
+
+def intersect(positions: list[int], other: list[int]) -> list[int]:
+    """Return sorted positions found in both sorted lists, searching the shorter one's
+    positions in the other."""
+    if len(positions) > len(other):
+        positions, other = other, positions
+    found = []
+    for position in positions:
+        i = bisect.bisect_left(other, position)
+        if i < len(other) and other[i] == position:
+            found.append(position)
+    return found
@@ -0,0 +1,94 @@
+import json
+import marshal
+import os
+from pathlib import Path
+
+
+class JournaledFile:
+    """Data derived from the data file, persisted next to it.
+
+    The file keeps the identity of the data file it was built for. Changes made through
+    the wallet are appended to a journal along with data file identity before and after
+    them, so the data is brought up to date without rebuilding. Any other change of the
+    data file breaks this chain, as does a damaged file, and the data is rebuilt.
+
+    Subclasses define the suffix and version of the file, how the data is converted to
+    and from a marshalable dictionary and how a journaled change is applied to it.
+    """
+
+    suffix = ""
+    version = 1
+
+    def __init__(self, data_file: Path):
+        self.file = data_file.with_suffix(self.suffix)
+        self.journal_file = data_file.with_suffix(f"{self.suffix}-journal")
+
+    def to_dict(self, data) -> dict:
+        raise NotImplementedError
+
+    def from_dict(self, data: dict):
+        raise NotImplementedError
+
+    def apply(self, data, change: dict) -> None:
+        raise NotImplementedError
+
+    def exists(self) -> bool:
+        return self.file.exists()
+
+    def load(self, identity: dict | None):
+        """Return data if it's up to date with data file identity, otherwise None."""
+        if identity is None:
+            return None
+        try:
+            # Unmarshaling from bytes is several times faster than from a file object,
+            # which is read a few bytes at a time.
+            saved = marshal.loads(self.file.read_bytes())
+        except (FileNotFoundError, EOFError, ValueError, TypeError):
+            return None
+        if not isinstance(saved, dict) or saved.get("version") != self.version:
+            return None
+
+        changes = 0
+        try:
+            data = self.from_dict(saved)
+            current = saved["identity"]
+            try:
+                with open(self.journal_file, "r", encoding="utf-8") as journal:
+                    for line in journal:
+                        change = json.loads(line)
+                        if change["before"] != current:
+                            return None
+                        self.apply(data, change)
+                        current = change["after"]
+                        changes += 1
+            except FileNotFoundError:
+                pass
+        except (KeyError, IndexError, TypeError, ValueError):
+            return None
+        if current != identity:
+            return None
+        if changes:
+            self.save(data, identity)
+        return data
+
+    def save(self, data, identity: dict | None) -> None:
+        """Write data for data file identity, replacing the file atomically."""
+        if identity is None:
+            return
+        temp_file = self.file.with_suffix(f"{self.suffix}.tmp")
+        with open(temp_file, "wb") as file:
+            marshal.dump(
+                {"version": self.version, "identity": identity, **self.to_dict(data)}, file
+            )
+        os.replace(temp_file, self.file)
+        self.journal_file.unlink(missing_ok=True)
+
+    def record(self, before: dict | None, after: dict | None, operation: str, **change) -> None:
+        """Append a change made to the data file to the journal."""
+        with open(self.journal_file, "a", encoding="utf-8") as journal:
+            entry = {"before": before, "after": after, "operation": operation, **change}
+            journal.write(json.dumps(entry) + "\n")
+
+    def remove(self) -> None:
+        self.file.unlink(missing_ok=True)
+        self.journal_file.unlink(missing_ok=True)
@@ -0,0 +1,132 @@
+import csv
+import io
+import mmap
+from pathlib import Path
+from typing import Iterator
+
+from personal_wallet.models.csv_decoder import CsvRowDecoder
+from personal_wallet.models.query import Query
+
+# Size of csv file chunks parsed by worker processes. Files that fit in a single chunk
+# are scanned in the calling process.
+CHUNK_SIZE = 8 << 20
+
+# Size of pieces in which quotes are counted, so the file isn't copied all at once.
+COUNT_SIZE = 1 << 20
+
+
+class CsvChunks:
+    """Splits csv file into byte ranges of whole rows, to be parsed by worker processes.
+
+    Ranges end at line breaks outside of quoted values, so descriptions with line breaks
+    are never split. Rows of a range are numbered from zero, the caller shifts them by
+    counts of rows in the preceding ranges.
+    """
+
+    def __init__(self, file: Path, workers: int):
+        self.file = file
+        self.workers = workers
+        self.header = None
+        self.ranges = []
+        try:
+            csvfile = open(file, "rb")
+        except FileNotFoundError:
+            return
+        with csvfile:
+            line = csvfile.readline()
+            if not line:
+                return
+            self.header = next(csv.reader([line.decode("utf-8")]))
+            size = csvfile.seek(0, 2)
+            if size > len(line):
+                with mmap.mmap(csvfile.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    self.ranges = split_rows(data, len(line), size, CHUNK_SIZE)
+
+    def map(self, task, *args) -> Iterator:
+        """Run task(file, header, start, end, *args) for every range, yielding results in
+        order of ranges."""
+        tasks = [(self.file, self.header, start, end, *args) for start, end in self.ranges]
+        if len(tasks) < 2 or self.workers < 2:
+            for task_args in tasks:
+                yield task(*task_args)
+            return
+        # Imported here, since multiprocessing takes a while to import and most commands
+        # never start processes.
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(min(self.workers, len(tasks))) as executor:
+            yield from executor.map(task, *zip(*tasks))
+
+
+def split_rows(data, start: int, end: int, chunk_size: int) -> list[tuple[int, int]]:
+    """Split data[start:end] into ranges of about chunk_size bytes ending at line breaks
+    outside of quoted values."""
+    ranges = []
+    quotes = 0
+    counted = start
+    while end - start > chunk_size:
+        position = start + chunk_size
+        while True:
+            line_end = data.find(b"\n", position, end)
+            if line_end < 0:
+                break
+            # Quotes are paired, escaped quotes included, so an even number of them
+            # means the line break isn't inside a quoted value.
+            quotes += count_quotes(data, counted, line_end)
+            counted = line_end
+            if quotes % 2 == 0:
+                break
+            position = line_end + 1
+        if line_end < 0 or line_end + 1 == end:
+            break
+        ranges.append((start, line_end + 1))
+        start = line_end + 1
+    ranges.append((start, end))
+    return ranges
+
+
+def count_quotes(data, start: int, end: int) -> int:
+    return sum(
+        data[offset : min(end, offset + COUNT_SIZE)].count(b'"')
+        for offset in range(start, end, COUNT_SIZE)
+    )
+
+
+def read_rows(
+    file: Path, header: list[str], start: int, end: int
+) -> Iterator[tuple[CsvRowDecoder, list[str]]]:
+    """Read csv rows of a byte range, yielding them along with the decoder for them."""
+    with open(file, "rb") as csvfile:
+        csvfile.seek(start)
+        data = csvfile.read(end - start)
+    decoder = CsvRowDecoder(header)
+    for row in csv.reader(io.TextIOWrapper(io.BytesIO(data), encoding="utf-8")):
+        # Blank lines are skipped, as in sequential reading.
+        if row:
+            yield decoder, row
+
+
+def find_rows(
+    file: Path, header: list[str], start: int, end: int, filters: tuple
+) -> tuple[int, list[tuple[int, dict]]]:
+    """Return number of rows in a byte range and its rows matching filters, numbered
+    within the range."""
+    matches = Query(*filters).predicate()
+    found = []
+    count = 0
+    for count, (decoder, row) in enumerate(read_rows(file, header, start, end), 1):
+        transaction = decoder.decode(row)
+        if matches(transaction):
+            found.append((count - 1, transaction.as_dict()))
+    return count, found
+
+
+def count_rows(file: Path, header: list[str], start: int, end: int) -> dict:
+    """Return income, expenses and count totals of a byte range."""
+    totals = {"income": 0, "expenses": 0, "count": 0}
+    for decoder, row in read_rows(file, header, start, end):
+        _, amount, category, _ = decoder.columns(row)
+        if category in ("income", "expenses"):
+            totals[category] += int(amount)
+        totals["count"] += 1
+    return totals
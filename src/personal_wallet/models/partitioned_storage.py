@@ -0,0 +1,269 @@
+import csv
+import datetime
+import json
+import os
+import re
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from personal_wallet.models.csv_decoder import CsvRowDecoder
+from personal_wallet.models.query import Query
+from personal_wallet.models.storage import IndexedStorage, count_totals, encode_rows
+from personal_wallet.models.transaction import Transaction
+
+# Number of transactions buffered by month before appending them to partition files.
+APPEND_BATCH_SIZE = 100_000
+
+HEADER = (",".join(Transaction.fieldnames()) + "\r\n").encode("utf-8")
+
+
+def month_of(date: datetime.datetime) -> str:
+    """Return YYYY-MM name of the partition holding transactions of the date."""
+    return f"{date.year:04d}-{date.month:02d}"
+
+
+class PartitionedStorage(IndexedStorage):
+    """Concrete class for CSV storage partitioned by month.
+
+    Transactions of every month are kept in a csv file of their own, named YYYY-MM.csv,
+    in the storage directory along with a manifest holding row count, income and expense
+    totals and file size of every partition. Transactions are numbered month by month,
+    in order of adding within a month.
+
+    Date queries read only the partitions of matching months, the balance is added up from
+    the manifest and changes rewrite only the partitions they touch. Partitions whose size
+    doesn't match the manifest, e.g. after a change interrupted by a crash, are recounted.
+    """
+
+    filename = "transactions.parts/manifest.json"
+
+    @property
+    def directory(self) -> Path:
+        return self.file.parent
+
+    def partition_file(self, month: str) -> Path:
+        return self.directory / f"{month}.csv"
+
+    def _load_manifest(self) -> dict[str, dict]:
+        try:
+            manifest = json.loads(self.file.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+        return dict(sorted(manifest["partitions"].items()))
+
+    def _save_manifest(self, partitions: dict[str, dict]) -> None:
+        """Replace manifest atomically. Called holding the lock."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        temp_file = self.file.with_suffix(".json.tmp")
+        temp_file.write_text(json.dumps({"partitions": partitions}), encoding="utf-8")
+        os.replace(temp_file, self.file)
+
+    def _stale(self, partitions: dict[str, dict]) -> list[str]:
+        """Return months whose partition file size doesn't match the manifest."""
+        sizes = {}
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    name, _, suffix = entry.name.partition(".")
+                    if suffix == "csv" and len(name) == 7:
+                        sizes[name] = entry.stat().st_size
+        except FileNotFoundError:
+            pass
+        return [
+            month
+            for month in sorted(sizes.keys() | partitions.keys())
+            if sizes.get(month, 0) != partitions.get(month, {}).get("size", 0)
+        ]
+
+    def read_manifest(self) -> dict[str, dict]:
+        """Return count, income and expenses totals and file size of partitions by month,
+        in order of months, recounting partitions that don't match the manifest."""
+        partitions = self._load_manifest()
+        if self._stale(partitions):
+            with self.locked():
+                # Partitions might have been appended by a change finishing meanwhile.
+                partitions = self._load_manifest()
+                stale = self._stale(partitions)
+                for month in stale:
+                    self._write_partition(partitions, month, list(self._iter_partition(month)))
+                if stale:
+                    self._save_manifest(partitions)
+        return partitions
+
+    def _iter_partition(self, month: str) -> Iterator[Transaction]:
+        try:
+            csvfile = open(self.partition_file(month), "r", encoding="utf-8", newline="")
+        except FileNotFoundError:
+            return
+        with csvfile:
+            reader = csv.reader(csvfile)
+            header = next(reader, None)
+            if header is None:
+                return
+            decode = CsvRowDecoder(header).decode
+            for row in reader:
+                if row:
+                    yield decode(row)
+
+    def _write_partition(
+        self, partitions: dict[str, dict], month: str, transactions: list[Transaction]
+    ) -> None:
+        """Replace partition file atomically, removing it if there are no transactions left,
+        and update its manifest entry. Called holding the lock."""
+        file = self.partition_file(month)
+        if not transactions:
+            file.unlink(missing_ok=True)
+            partitions.pop(month, None)
+            return
+        data = HEADER + encode_rows(transactions)
+        temp_file = file.with_suffix(".csv.tmp")
+        with open(temp_file, "wb") as csvfile:
+            csvfile.write(data)
+            csvfile.flush()
+            os.fsync(csvfile.fileno())
+        os.replace(temp_file, file)
+        partitions[month] = {**count_totals(transactions), "size": len(data)}
+
+    def _append(self, partitions: dict[str, dict], batch: dict[str, list[Transaction]]) -> None:
+        """Append transactions to partitions of their months and update their manifest
+        entries. Called holding the lock."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for month, transactions in batch.items():
+            with open(self.partition_file(month), "ab") as csvfile:
+                if not csvfile.tell():
+                    csvfile.write(HEADER)
+                csvfile.write(encode_rows(transactions))
+                csvfile.flush()
+                os.fsync(csvfile.fileno())
+                size = csvfile.tell()
+            totals = partitions.get(month, count_totals([]))
+            appended = count_totals(transactions)
+            partitions[month] = {
+                **{key: totals[key] + appended[key] for key in appended},
+                "size": size,
+            }
+
+    def read_data(self) -> list[Transaction]:
+        return list(self.iter_data())
+
+    def iter_data(self) -> Iterator[Transaction]:
+        """Read partitions one by one in order of months."""
+        for month in self.read_manifest():
+            yield from self._iter_partition(month)
+
+    def write_data(self, transactions: Iterable[Transaction]) -> None:
+        """Replace all the partitions with transactions."""
+        with self.locked():
+            # Transactions may be streamed from the partitions being replaced.
+            transactions = list(transactions)
+            partitions = self.read_manifest()
+            for month in list(partitions):
+                self._write_partition(partitions, month, [])
+            self._save_manifest(partitions)
+            self.extend_data(transactions)
+
+    def append_data(self, transaction: Transaction) -> None:
+        self.extend_data([transaction])
+
+    def extend_data(self, transactions: Iterable[Transaction]) -> int:
+        """Append transactions to partitions of their months in large batches, saving the
+        manifest at the end."""
+        with self.locked():
+            partitions = self.read_manifest()
+            batch = {}
+            count = 0
+            for transaction in transactions:
+                batch.setdefault(month_of(transaction.date), []).append(transaction)
+                count += 1
+                if count % APPEND_BATCH_SIZE == 0:
+                    self._append(partitions, batch)
+                    batch = {}
+            self._append(partitions, batch)
+            if count:
+                self._save_manifest(partitions)
+        return count
+
+    def count_data(self) -> int:
+        return sum(partition["count"] for partition in self.read_manifest().values())
+
+    def read_totals(self) -> tuple[int, int]:
+        """Add up partition totals from the manifest, without reading any partition."""
+        partitions = self.read_manifest().values()
+        return (
+            sum(partition["income"] for partition in partitions),
+            sum(partition["expenses"] for partition in partitions),
+        )
+
+    def find_data(
+        self,
+        index: int | tuple[int, int] | None,
+        date: datetime.datetime | tuple[datetime.datetime, datetime.datetime] | None,
+        amount: int | tuple[int, int] | None,
+        category: str | None,
+        description: str | re.Pattern | None,
+    ) -> Iterator[dict]:
+        """Scan partitions of months within index and date range, yielding matching
+        transactions as they are found."""
+        start, stop = 0, None
+        if index is not None:
+            start, stop = index if isinstance(index, tuple) else (index, index)
+        months = None
+        if date is not None:
+            date_from, date_to = date if isinstance(date, tuple) else (date, date)
+            months = month_of(date_from), month_of(date_to)
+
+        matches = Query(date, amount, category, description).predicate()
+        end = 0
+        for month, partition in self.read_manifest().items():
+            first, end = end, end + partition["count"]
+            if stop is not None and first > stop:
+                break
+            if end <= start or months is not None and not months[0] <= month <= months[1]:
+                continue
+            for i, transaction in enumerate(self._iter_partition(month), first):
+                if start <= i and (stop is None or i <= stop) and matches(transaction):
+                    yield {"index": i, **transaction.as_dict()}
+
+    @staticmethod
+    def _locate(partitions: dict[str, dict], index: int) -> tuple[str, int]:
+        """Return month of the partition holding transaction by its index and its position
+        in the partition."""
+        if index >= 0:
+            for month, partition in partitions.items():
+                if index < partition["count"]:
+                    return month, index
+                index -= partition["count"]
+        raise IndexError(index)
+
+    def get_data(self, index: int) -> Transaction:
+        """Return transaction by its index, reading only its partition."""
+        month, position = self._locate(self.read_manifest(), index)
+        return list(self._iter_partition(month))[position]
+
+    def update_data(
+        self, index: int, transaction: Transaction, previous: Transaction | None = None
+    ) -> None:
+        """Rewrite partition of the transaction. Transaction moved to another month is
+        appended to its partition."""
+        with self.locked():
+            partitions = self.read_manifest()
+            month, position = self._locate(partitions, index)
+            transactions = list(self._iter_partition(month))
+            if month_of(transaction.date) == month:
+                transactions[position] = transaction
+                self._write_partition(partitions, month, transactions)
+            else:
+                transactions.pop(position)
+                self._write_partition(partitions, month, transactions)
+                self._append(partitions, {month_of(transaction.date): [transaction]})
+            self._save_manifest(partitions)
+
+    def delete_data(self, index: int, previous: Transaction | None = None) -> None:
+        """Rewrite partition of the transaction without it."""
+        with self.locked():
+            partitions = self.read_manifest()
+            month, position = self._locate(partitions, index)
+            transactions = list(self._iter_partition(month))
+            transactions.pop(position)
+            self._write_partition(partitions, month, transactions)
+            self._save_manifest(partitions)
@@ -0,0 +1,149 @@
+import datetime
+import operator
+import re
+from typing import Callable
+
+from personal_wallet.models.description_index import parse_pattern
+from personal_wallet.models.transaction import Transaction
+from personal_wallet.models.transaction_table import TransactionTable
+
+# Ranks of checks, in the order they are evaluated: cheap comparisons that usually rule
+# out most rows go first, string scans and regexes last.
+EQUAL_AMOUNT, EQUAL_DATE, EQUAL_DESCRIPTION = 0, 1, 2
+AMOUNT_RANGE, DATE_RANGE, CATEGORY = 3, 4, 5
+PREFIX_OR_SUFFIX, SUBSTRING, REGEX = 6, 7, 8
+
+
+def equal(get: Callable, value) -> Callable:
+    return lambda row: get(row) == value
+
+
+def within(get: Callable, low, high) -> Callable:
+    return lambda row: low <= get(row) <= high
+
+
+def prefix(get: Callable, literal: str) -> Callable:
+    return lambda row: (get(row) or "").startswith(literal)
+
+
+def suffix(get: Callable, literal: str) -> Callable:
+    return lambda row: (get(row) or "").endswith(literal)
+
+
+def substring(get: Callable, literal: str) -> Callable:
+    return lambda row: literal in (get(row) or "")
+
+
+def search(get: Callable, pattern: re.Pattern) -> Callable:
+    return lambda row: pattern.search(get(row) or "") is not None
+
+
+# Checks of field values got by a getter of a row, by check kind.
+CHECKS = {
+    "equal": equal,
+    "range": within,
+    "prefix": prefix,
+    "suffix": suffix,
+    "substring": substring,
+    "regex": search,
+}
+
+# Table columns of transaction fields.
+COLUMNS = {
+    "date": "dates",
+    "amount": "amounts",
+    "category": "categories",
+    "description": "descriptions",
+}
+
+
+def conjunction(checks: list[Callable]) -> Callable:
+    """Return predicate of rows passing all the checks, checked in order."""
+    if not checks:
+        return lambda row: True
+    first, *rest = checks
+    if not rest:
+        return first
+    second = conjunction(rest)
+    return lambda row: first(row) and second(row)
+
+
+class Query:
+    """Filters of transactions compiled into a single predicate.
+
+    Only the filters given are checked, in order of their rank, and `%` description
+    patterns of plain strings are checked with string methods instead of regexes. Each
+    check is a closure specialized for its filter, getting the field of a transaction
+    object or of a row of a transaction table, so no filter is dispatched on its type
+    per row.
+    """
+
+    def __init__(
+        self,
+        date: datetime.datetime | tuple[datetime.datetime, datetime.datetime] | None,
+        amount: int | tuple[int, int] | None,
+        category: str | None,
+        description: str | re.Pattern | None,
+    ):
+        # Checks as (rank, field, kind, constants).
+        self.checks: list[tuple[int, str, str, tuple]] = []
+        if amount is not None:
+            if isinstance(amount, tuple):
+                self.checks.append((AMOUNT_RANGE, "amount", "range", amount))
+            else:
+                self.checks.append((EQUAL_AMOUNT, "amount", "equal", (amount,)))
+        if date is not None:
+            if isinstance(date, tuple):
+                self.checks.append((DATE_RANGE, "date", "range", date))
+            else:
+                self.checks.append((EQUAL_DATE, "date", "equal", (date,)))
+        if category is not None:
+            self.checks.append((CATEGORY, "category", "equal", (category,)))
+        if description is not None:
+            self.checks.append(self._description_check(description))
+        self.checks.sort(key=lambda check: check[0])
+
+    @staticmethod
+    def _description_check(description: str | re.Pattern) -> tuple[int, str, str, tuple]:
+        if isinstance(description, str):
+            return EQUAL_DESCRIPTION, "description", "equal", (description,)
+        parsed = parse_pattern(description)
+        if parsed is None:
+            return REGEX, "description", "regex", (description,)
+        literal, at_start, at_end = parsed
+        if at_start:
+            return PREFIX_OR_SUFFIX, "description", "prefix", (literal,)
+        if at_end:
+            return PREFIX_OR_SUFFIX, "description", "suffix", (literal,)
+        return SUBSTRING, "description", "substring", (literal,)
+
+    def predicate(self) -> Callable[[Transaction], bool]:
+        """Return predicate of transactions matching the filters."""
+        return self._combine(operator.attrgetter, lambda field, value: value)
+
+    def row_predicate(self, table: TransactionTable) -> Callable[[int], bool]:
+        """Return predicate of positions of table rows matching the filters, checked on
+        table columns without creating transactions."""
+
+        def column(field: str) -> Callable[[int], object]:
+            return getattr(table, COLUMNS[field]).__getitem__
+
+        def encode(field: str, value):
+            if field == "date":
+                return value.toordinal()
+            if field == "category":
+                # Category not in the table matches no rows.
+                return table.category_codes.get(value, -1)
+            return value
+
+        return self._combine(column, encode)
+
+    def _combine(self, getter: Callable, encode: Callable) -> Callable:
+        """Return conjunction of checks of fields got by getter of a field, with filter
+        values encoded for them."""
+        return conjunction(
+            [
+                CHECKS[kind](getter(field), *(encode(field, value) for value in values))
+                for _, field, kind, values in self.checks
+            ]
+        )
@@ -0,0 +1,244 @@
+import datetime
+import re
+import sqlite3
+from contextlib import closing, contextmanager
+from typing import Iterable, Iterator
+
+from personal_wallet.models.description_index import parse_pattern
+from personal_wallet.models.storage import IndexedStorage
+from personal_wallet.models.transaction import Transaction
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    position INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    amount INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    description TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_transactions_position ON transactions (position);
+DROP INDEX IF EXISTS ix_transactions_position;
+CREATE INDEX IF NOT EXISTS ix_transactions_date ON transactions (date);
+CREATE INDEX IF NOT EXISTS ix_transactions_amount ON transactions (amount);
+CREATE INDEX IF NOT EXISTS ix_transactions_category ON transactions (category, amount);
+CREATE INDEX IF NOT EXISTS ix_transactions_description ON transactions (description);
+"""
+
+COLUMNS = "position, date, amount, category, description"
+
+
+def regexp(pattern: str, value: str | None) -> bool:
+    """Implementation of sqlite REGEXP operator."""
+    # Missing description is matched as an empty one, as in csv storage.
+    return re.search(pattern, value or "") is not None
+
+
+def literal_prefix(pattern: re.Pattern) -> str | None:
+    """Return the literal prefix of a `prefix%` description pattern, if it has one."""
+    # Literals have no regex metacharacters, which include GLOB wildcards as well.
+    parsed = parse_pattern(pattern)
+    if parsed is None:
+        return None
+    literal, at_start, at_end = parsed
+    if not literal or not at_start or at_end:
+        return None
+    return literal
+
+
+def to_row(position: int, transaction: Transaction) -> tuple:
+    row = transaction.as_dict()
+    return position, row["date"], row["amount"], row["category"], row["description"]
+
+
+def renumber(connection: sqlite3.Connection) -> None:
+    """Give transactions consecutive positions in their current order, transactions
+    sharing a position ordered as they were added."""
+    with connection:
+        connection.execute("BEGIN IMMEDIATE")
+        ids = connection.execute("SELECT id FROM transactions ORDER BY position, id").fetchall()
+        connection.executemany(
+            "UPDATE transactions SET position = ? WHERE id = ?",
+            ((position, row["id"]) for position, row in enumerate(ids)),
+        )
+
+
+class SqliteStorage(IndexedStorage):
+    """Concrete class for SQLite storage with indexed queries.
+
+    Every change is a single write transaction begun before reading anything, so
+    positions read in it aren't changed by another process until it's committed.
+    """
+
+    filename = "transactions.db"
+
+    def connect(self) -> sqlite3.Connection:
+        """Open the database, creating the file and schema if they don't exist yet."""
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.file)
+        connection.row_factory = sqlite3.Row
+        connection.create_function("REGEXP", 2, regexp, deterministic=True)
+        try:
+            connection.executescript(SCHEMA)
+        except sqlite3.IntegrityError:
+            # Earlier versions could give transactions added concurrently the same position.
+            renumber(connection)
+            connection.executescript(SCHEMA)
+        return connection
+
+    @contextmanager
+    def writing(self) -> Iterator[sqlite3.Connection]:
+        """Open the database in a write transaction, committed once the block is left."""
+        with closing(self.connect()) as connection, connection:
+            connection.execute("BEGIN IMMEDIATE")
+            yield connection
+
+    def read_data(self) -> list[Transaction]:
+        """Read all transactions ordered by their index."""
+        return list(self.iter_data())
+
+    def iter_data(self) -> Iterator[Transaction]:
+        """Read transactions row by row, ordered by their index."""
+        with closing(self.connect()) as connection:
+            for row in connection.execute(f"SELECT {COLUMNS} FROM transactions ORDER BY position"):
+                yield Transaction.from_csv_row(row)
+
+    def write_data(self, transactions: list[Transaction]) -> None:
+        """Replace all the stored transactions."""
+        with self.writing() as connection:
+            connection.execute("DELETE FROM transactions")
+            connection.executemany(
+                f"INSERT INTO transactions ({COLUMNS}) VALUES (?, ?, ?, ?, ?)",
+                (to_row(i, transaction) for i, transaction in enumerate(transactions)),
+            )
+
+    def append_data(self, transaction: Transaction) -> None:
+        """Append a new transaction."""
+        self.extend_data([transaction])
+
+    def extend_data(self, transactions: Iterable[Transaction]) -> int:
+        """Append many transactions in a single database transaction."""
+        with self.writing() as connection:
+            start = self._count(connection)
+            connection.executemany(
+                f"INSERT INTO transactions ({COLUMNS}) VALUES (?, ?, ?, ?, ?)",
+                (to_row(i, transaction) for i, transaction in enumerate(transactions, start)),
+            )
+            return self._count(connection) - start
+
+    def count_data(self) -> int:
+        with closing(self.connect()) as connection:
+            return self._count(connection)
+
+    def read_totals(self) -> tuple[int, int]:
+        """Return total income and total expenses."""
+        with closing(self.connect()) as connection:
+            totals = dict(
+                connection.execute(
+                    "SELECT category, SUM(amount) FROM transactions GROUP BY category"
+                ).fetchall()
+            )
+        return totals.get("income", 0), totals.get("expenses", 0)
+
+    def find_data(
+        self,
+        index: int | tuple[int, int] | None,
+        date: datetime.datetime | tuple[datetime.datetime, datetime.datetime] | None,
+        amount: int | tuple[int, int] | None,
+        category: str | None,
+        description: str | re.Pattern | None,
+    ) -> Iterator[dict]:
+        """Select transactions matching index, date, amount, category or description,
+        yielding them row by row."""
+        conditions = []
+        params = []
+
+        def where_equal_or_between(column, value):
+            if isinstance(value, tuple):
+                conditions.append(f"{column} BETWEEN ? AND ?")
+                params.extend(value)
+            else:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+
+        if index is not None:
+            where_equal_or_between("position", index)
+        if date is not None:
+            if isinstance(date, tuple):
+                date = tuple(str(d.date()) for d in date)
+            else:
+                date = str(date.date())
+            where_equal_or_between("date", date)
+        if amount is not None:
+            where_equal_or_between("amount", amount)
+        if category is not None:
+            where_equal_or_between("category", category)
+        if isinstance(description, str):
+            where_equal_or_between("description", description)
+        elif isinstance(description, re.Pattern):
+            # GLOB on a literal prefix lets sqlite use the description index.
+            prefix = literal_prefix(description)
+            if prefix is not None:
+                conditions.append("description GLOB ?")
+                params.append(f"{prefix}*")
+            conditions.append("description REGEXP ?")
+            params.append(description.pattern)
+
+        query = f"SELECT {COLUMNS} FROM transactions"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY position"
+
+        with closing(self.connect()) as connection:
+            for row in connection.execute(query, params):
+                yield {
+                    "index": row["position"],
+                    "date": row["date"],
+                    "amount": row["amount"],
+                    "category": row["category"],
+                    "description": row["description"],
+                }
+
+    def get_data(self, index: int) -> Transaction:
+        """Return transaction by its index."""
+        with closing(self.connect()) as connection:
+            row = connection.execute(
+                f"SELECT {COLUMNS} FROM transactions WHERE position = ?", (index,)
+            ).fetchone()
+        if row is None:
+            raise IndexError(index)
+        return Transaction.from_csv_row(row)
+
+    def update_data(
+        self, index: int, transaction: Transaction, previous: Transaction | None = None
+    ) -> None:
+        """Overwrite transaction by its index."""
+        with self.writing() as connection:
+            cursor = connection.execute(
+                "UPDATE transactions SET date = ?, amount = ?, category = ?, description = ? "
+                "WHERE position = ?",
+                (*to_row(index, transaction)[1:], index),
+            )
+            if cursor.rowcount == 0:
+                raise IndexError(index)
+
+    def delete_data(self, index: int, previous: Transaction | None = None) -> None:
+        """Delete transaction by its index and shift the following indexes."""
+        with self.writing() as connection:
+            cursor = connection.execute("DELETE FROM transactions WHERE position = ?", (index,))
+            if cursor.rowcount == 0:
+                raise IndexError(index)
+            # Positions are unique at every row updated, so the following ones are moved out
+            # of the way first.
+            connection.execute(
+                "UPDATE transactions SET position = -position WHERE position > ?", (index,)
+            )
+            connection.execute(
+                "UPDATE transactions SET position = -position - 1 WHERE position < 0"
+            )
+
+    @staticmethod
+    def _count(connection: sqlite3.Connection) -> int:
+        # The position index makes this a single lookup instead of a table scan.
+        query = "SELECT COALESCE(MAX(position) + 1, 0) FROM transactions"
+        return connection.execute(query).fetchone()[0]
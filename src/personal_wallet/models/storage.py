@@ -1,15 +1,55 @@
+import bisect
+import contextlib
 import csv
+import datetime
+import io
+import json
+import os
+import re
+import time
+import zlib
 from abc import ABC, abstractmethod
 from pathlib import Path
+from typing import Iterable, Iterator
 
+from personal_wallet.models import parallel_scan
+from personal_wallet.models.commit_queue import CommitQueue
+from personal_wallet.models.csv_decoder import CsvRowDecoder
+from personal_wallet.models.file_lock import FileLock
 from personal_wallet.models.transaction import Transaction
+from personal_wallet.models.transaction_table import TransactionTable
+
+# Size of write buffer for appending transactions in batches.
+WRITE_BUFFER_SIZE = 1 << 20
+
+# Seconds between checks whether a queued transaction was committed by another process.
+COMMIT_POLL_INTERVAL = 0.001
+
+# Size of chunks of csv file read back looking for the end of its last complete row.
+TAIL_CHUNK_SIZE = 1 << 16
 
 
 class Storage(ABC):
     """Abstract base class for storage."""
 
-    def __init__(self, file: Path):
+    # Name of the data file inside the data directory.
+    filename = "transactions"
+
+    def __init__(self, file: Path, workers: int = 1):
         self.file = file
+        # Number of processes reading data in parallel, where storage supports it.
+        self.workers = workers
+        # Lock held across processes while data is changed.
+        self.lock = FileLock(file.with_name(file.name + ".lock"))
+        # Called with data file identity before and after appending and the appended
+        # transactions by the process committing them, while the lock is still held.
+        self.on_append = None
+
+    @contextlib.contextmanager
+    def locked(self):
+        """Hold the storage lock, so other processes don't change the data meanwhile."""
+        with self.lock:
+            yield
 
     @abstractmethod
     def read_data(self):
@@ -23,53 +63,636 @@ class Storage(ABC):
     def append_data(self, transaction):
         pass
 
+    def iter_data(self) -> Iterator[Transaction]:
+        """Yield stored transactions one by one."""
+        yield from self.read_data()
+
+    def identity(self) -> dict | None:
+        """Return inode, size and modification time of data file, which tell whether it was
+        changed or replaced, or None if there is no data file yet."""
+        try:
+            stat = self.file.stat()
+        except FileNotFoundError:
+            return None
+        return {"inode": stat.st_ino, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def read_table(self) -> TransactionTable:
+        """Read all the transactions into a columnar table."""
+        table = TransactionTable()
+        table.extend(self.iter_data())
+        return table
+
+    def read_totals(self) -> tuple[int, int] | None:
+        """Return total income and total expenses if storage can tell them without reading
+        all transactions, otherwise None."""
+        return None
+
+    def scan_data(
+        self,
+        index: int | tuple[int, int] | None,
+        date: datetime.datetime | tuple[datetime.datetime, datetime.datetime] | None,
+        amount: int | tuple[int, int] | None,
+        category: str | None,
+        description: str | re.Pattern | None,
+    ) -> Iterator[dict] | None:
+        """Return transactions matching index, date, amount, category and description
+        found by worker processes, or None if storage can't be scanned in parallel."""
+        return None
+
+    def extend_data(self, transactions: Iterable[Transaction]) -> int:
+        """Append many transactions and return how many were written."""
+        count = 0
+        for transaction in transactions:
+            self.append_data(transaction)
+            count += 1
+        return count
+
+    def update_data(
+        self, index: int, transaction: Transaction, previous: Transaction | None = None
+    ) -> None:
+        """Replace transaction by its index. Previous transaction is given when it's known.
+        Rewrites all the data by default."""
+        with self.locked():
+            transactions = self.read_data()
+            transactions[index] = transaction
+            self.write_data(transactions)
+
+    def delete_data(self, index: int, previous: Transaction | None = None) -> None:
+        """Delete transaction by its index. Rewrites all the data by default."""
+        with self.locked():
+            transactions = self.read_data()
+            transactions.pop(index)
+            self.write_data(transactions)
+
+    def compact(self) -> None:
+        """Fold pending changes into the data file. Nothing to do by default."""
+
+
+class IndexedStorage(Storage):
+    """Abstract base class for storage answering wallet queries without loading all data."""
+
+    @abstractmethod
+    def count_data(self) -> int:
+        pass
+
+    @abstractmethod
+    def read_totals(self) -> tuple[int, int]:
+        pass
+
+    @abstractmethod
+    def find_data(
+        self,
+        index: int | tuple[int, int] | None,
+        date: datetime.datetime | tuple[datetime.datetime, datetime.datetime] | None,
+        amount: int | tuple[int, int] | None,
+        category: str | None,
+        description: str | re.Pattern | None,
+    ) -> Iterator[dict]:
+        pass
+
+    @abstractmethod
+    def get_data(self, index: int) -> Transaction:
+        pass
+
+    @abstractmethod
+    def update_data(
+        self, index: int, transaction: Transaction, previous: Transaction | None = None
+    ) -> None:
+        pass
+
+    @abstractmethod
+    def delete_data(self, index: int, previous: Transaction | None = None) -> None:
+        pass
+
+
+def tally(totals: dict, transactions: Iterable[Transaction]) -> Iterator[Transaction]:
+    """Pass transactions through, adding them to income, expenses and count totals."""
+    for transaction in transactions:
+        match transaction.category:
+            case "income":
+                totals["income"] += transaction.amount
+            case "expenses":
+                totals["expenses"] += transaction.amount
+        totals["count"] += 1
+        yield transaction
+
+
+def encode_rows(transactions: Iterable[Transaction]) -> bytes:
+    """Return csv rows of transactions as they are written to csv file."""
+    rows = io.StringIO(newline="")
+    writer = csv.writer(rows)
+    for transaction in transactions:
+        row = transaction.as_dict()
+        writer.writerow([row[name] for name in Transaction.fieldnames()])
+    return rows.getvalue().encode("utf-8")
+
+
+def csv_line(fields: list[str]) -> bytes:
+    """Return csv line of fields as it's written to csv files."""
+    line = io.StringIO(newline="")
+    csv.writer(line).writerow(fields)
+    return line.getvalue().encode("utf-8")
+
+
+def log_checksum(fields: list[str]) -> str:
+    """Return checksum of change log entry fields, telling entries written only partially
+    by a crash."""
+    return f"{zlib.crc32(chr(31).join(fields).encode('utf-8')):08x}"
+
+
+def sync_directory(directory: Path) -> None:
+    """Sync directory entries to disk, so a file renamed into it is found after a crash."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        # Directories can't be opened on Windows, where renames are synced with the file.
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def count_totals(transactions: Iterable[Transaction]) -> dict:
+    """Return income, expenses and count totals of transactions."""
+    totals = {"income": 0, "expenses": 0, "count": 0}
+    for _ in tally(totals, transactions):
+        pass
+    return totals
+
 
 class CsvStorage(Storage):
-    """Concrete class for CSV storage."""
+    """Concrete class for CSV storage.
+
+    Updates and deletions are appended to a change log instead of rewriting the csv file,
+    every change checksummed and synced to disk on its own. The log is replayed on reading
+    up to the first entry cut off by a crash and folded back into the csv file by
+    compaction, which replaces the csv file atomically once the log grows over
+    compact_threshold changes.
+
+    Totals are kept in a sidecar file next to the csv file together with the csv and log
+    files size and modification time, so the balance is known without reading transactions.
+    Sidecar is rebuilt once the files are found changed by something else.
+
+    Changes are made holding the storage lock. Transactions appended while another process
+    holds it are queued and committed together by the next process taking it. Every
+    append is recorded by the commit queue, so rows left incomplete by a crash while
+    appending are cut off once the lock is taken.
+    """
+
+    filename = "transactions.csv"
+
+    # Number of logged changes that triggers compaction.
+    compact_threshold = 1000
+
+    @property
+    def log_file(self) -> Path:
+        return self.file.with_suffix(".log")
+
+    @property
+    def totals_file(self) -> Path:
+        return self.file.with_suffix(".totals")
+
+    @property
+    def queue(self) -> CommitQueue:
+        return CommitQueue(self.file)
+
+    @contextlib.contextmanager
+    def locked(self):
+        """Hold the storage lock, first finishing a commit interrupted by a crash."""
+        with self.lock:
+            self.queue.recover()
+            self._terminate_last_row()
+            yield
+
+    def _terminate_last_row(self) -> None:
+        """Append line break missing after the last row of csv file, as left by editing it
+        by hand, so the next append isn't glued onto the row. Rows torn by a crash are cut
+        off by the commit queue recovery beforehand, so a last row that isn't complete
+        is left for the user to fix. Called holding the lock."""
+        try:
+            csvfile = open(self.file, "r+b")
+        except FileNotFoundError:
+            return
+        with csvfile:
+            end = csvfile.seek(0, os.SEEK_END)
+            if not end or os.pread(csvfile.fileno(), 1, end - 1) == b"\n":
+                return
+            start = end
+            while start:
+                chunk_start = max(0, start - TAIL_CHUNK_SIZE)
+                chunk = os.pread(csvfile.fileno(), start - chunk_start, chunk_start)
+                line_break = chunk.rfind(b"\n")
+                if line_break >= 0:
+                    start = chunk_start + line_break + 1
+                    break
+                start = chunk_start
+            if start:
+                csvfile.seek(0)
+                last_row = os.pread(csvfile.fileno(), end - start, start)
+                if not self._is_complete_row(csvfile.readline(), last_row):
+                    raise ValueError(
+                        f"Error: Last row of {self.file} is incomplete: {last_row!r}. "
+                        "Fix or remove it."
+                    )
+            csvfile.seek(end)
+            csvfile.write(b"\r\n")
+            csvfile.flush()
+            os.fsync(csvfile.fileno())
+
+    @staticmethod
+    def _is_complete_row(header_line: bytes, line: bytes) -> bool:
+        """Return whether csv line has all the columns of header line and decodes."""
+        try:
+            header = next(csv.reader([header_line.decode("utf-8")]))
+            row = next(csv.reader([line.decode("utf-8")]))
+            if len(row) != len(header):
+                return False
+            CsvRowDecoder(header).decode(row)
+        except (ValueError, TypeError, csv.Error, StopIteration):
+            return False
+        return True
+
+    def identity(self) -> dict | None:
+        """Return inode, size and modification time of csv file and size and modification
+        time of log file."""
+        identity = super().identity()
+        if identity is None:
+            return None
+        try:
+            stat = self.log_file.stat()
+            identity.update(log_size=stat.st_size, log_mtime_ns=stat.st_mtime_ns)
+        except FileNotFoundError:
+            identity.update(log_size=0, log_mtime_ns=0)
+        return identity
+
+    def _load_totals(self) -> dict | None:
+        """Return sidecar totals if they are up to date with csv file."""
+        if not self.file.exists():
+            return {"income": 0, "expenses": 0, "count": 0}
+        try:
+            totals = json.loads(self.totals_file.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return None
+        identity = totals.pop("file", None)
+        if identity != self.identity():
+            return None
+        return totals
+
+    def _save_totals(self, totals: dict) -> None:
+        """Write totals along with current csv file identity, replacing sidecar atomically."""
+        data = {**totals, "file": self.identity()}
+        temp_file = self.totals_file.with_suffix(".totals.tmp")
+        temp_file.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(temp_file, self.totals_file)
+
+    def read_totals(self) -> tuple[int, int]:
+        """Return total income and total expenses from sidecar, rebuilding it if needed."""
+        totals = self._load_totals()
+        if totals is None:
+            if self.workers > 1 and not self.log_file.exists():
+                chunks = parallel_scan.CsvChunks(self.file, self.workers)
+                totals = count_totals([])
+                for chunk_totals in chunks.map(parallel_scan.count_rows):
+                    totals = {key: totals[key] + chunk_totals[key] for key in totals}
+            else:
+                totals = count_totals(self.iter_data())
+            self._save_totals(totals)
+        return totals["income"], totals["expenses"]
+
+    def scan_data(
+        self,
+        index: int | tuple[int, int] | None,
+        date: datetime.datetime | tuple[datetime.datetime, datetime.datetime] | None,
+        amount: int | tuple[int, int] | None,
+        category: str | None,
+        description: str | re.Pattern | None,
+    ) -> Iterator[dict] | None:
+        """Parse csv file in chunks by worker processes, which filter out their rows.
+        Files with logged changes aren't scanned in parallel, until compacted."""
+        if self.workers < 2 or self.log_file.exists():
+            return None
+        chunks = parallel_scan.CsvChunks(self.file, self.workers)
+        filters = (date, amount, category, description)
+        return self._merge_found(chunks.map(parallel_scan.find_rows, filters), index)
+
+    @staticmethod
+    def _merge_found(
+        results: Iterable[tuple[int, list[tuple[int, dict]]]],
+        index: int | tuple[int, int] | None,
+    ) -> Iterator[dict]:
+        """Number rows found in chunks by their index in the file, filtering out index."""
+        start, stop = 0, None
+        if index is not None:
+            start, stop = index if isinstance(index, tuple) else (index, index)
+        offset = 0
+        for count, found in results:
+            for row_number, row in found:
+                i = offset + row_number
+                if start <= i and (stop is None or i <= stop):
+                    yield {"index": i, **row}
+            offset += count
 
     def read_data(self) -> [Transaction]:
         """Read csv file and return a list of transactions."""
+        return list(self.iter_data())
+
+    def iter_data(self) -> Iterator[Transaction]:
+        """Read csv file row by row, yielding transactions with logged changes applied."""
+        updated, deleted = self._read_log()
+        deleted = set(deleted)
+        for row, transaction in enumerate(self._iter_file()):
+            if row not in deleted:
+                yield updated.get(row, transaction)
+
+    def read_table(self) -> TransactionTable:
+        """Read csv file into a columnar table, with logged changes applied."""
+        table = TransactionTable()
+        updated, deleted = self._read_log()
+        deleted = set(deleted)
+        for row_number, (decoder, row) in enumerate(self._iter_rows()):
+            if row_number in updated:
+                table.append(updated[row_number])
+            elif row_number not in deleted:
+                decoder.decode_into(table, row)
+        return table
+
+    def _iter_file(self) -> Iterator[Transaction]:
+        for decoder, row in self._iter_rows():
+            yield decoder.decode(row)
+
+    def _iter_rows(self) -> Iterator[tuple[CsvRowDecoder, list[str]]]:
+        """Read csv file, yielding its rows along with the decoder for them."""
+        try:
+            csvfile = open(self.file, "r", encoding="utf-8")
+        except FileNotFoundError:
+            return
+        with csvfile:
+            reader = csv.reader(csvfile)
+            header = next(reader, None)
+            if header is None:
+                return
+            decoder = CsvRowDecoder(header)
+            for row in reader:
+                # Blank lines are skipped, as csv.DictReader does.
+                if row:
+                    yield decoder, row
+
+    def _log_header(self) -> list[str]:
+        # Compaction replaces csv file with a new one, so the inode tells which csv file
+        # the log belongs to and a log left over from an interrupted compaction is ignored.
+        return ["#base", str(self.file.stat().st_ino), "crc32"]
+
+    def _load_log(self) -> tuple[list[list[str]], int, bool] | None:
+        """Return change log entries, size of the log up to the end of the last of them and
+        whether they are checksummed, or None if there's no log of the current csv file.
+
+        Entries from the first one failing its checksum on, which was written only
+        partially by a crash, are left out.
+        """
         try:
-            with open(self.file, "r", encoding="utf-8") as csvfile:
-                reader = csv.DictReader(csvfile)
-                transactions = []
-                for row in reader:
-                    transaction = Transaction.from_csv_row(row)
-                    transactions.append(transaction)
-                return transactions
+            data = self.log_file.read_bytes()
         except FileNotFoundError:
-            return []
+            return None
+        if not self.file.exists():
+            return None
+        reader = csv.reader(io.StringIO(data.decode("utf-8", errors="replace"), newline=""))
+        try:
+            header = next(reader, None)
+        except csv.Error:
+            return None
+        expected = self._log_header()
+        if header == expected:
+            checked = True
+        elif header == expected[:2]:
+            # Written by an earlier version, without checksums.
+            checked = False
+        else:
+            return None
+
+        entries = []
+        size = len(csv_line(header))
+        try:
+            for row in reader:
+                if checked:
+                    *row, checksum = row or [""]
+                    if checksum != log_checksum(row):
+                        break
+                    size += len(csv_line([*row, checksum]))
+                entries.append(row)
+        except csv.Error:
+            # Quoted field cut off at the end of the log.
+            pass
+        return entries, size, checked
+
+    def _read_log(self) -> tuple[dict[int, Transaction], list[int]]:
+        """Replay change log, returning updated and deleted csv rows by their row numbers."""
+        updated, deleted = {}, []
+        log = self._load_log()
+        if log is None:
+            return updated, deleted
+
+        decode = CsvRowDecoder(Transaction.fieldnames()).decode
+        for operation, index, *values in log[0]:
+            # Logged index counts rows left after earlier deletions.
+            row = int(index)
+            for deleted_row in deleted:
+                if deleted_row > row:
+                    break
+                row += 1
+            if operation == "U":
+                updated[row] = decode(values)
+            else:
+                updated.pop(row, None)
+                bisect.insort(deleted, row)
+        return updated, deleted
+
+    def _append_log(self, *values) -> int:
+        """Append a change to the log, syncing it to disk, and return how many changes the
+        log holds. Called holding the lock."""
+        log = self._load_log()
+        if log is not None and not log[2]:
+            # Log without checksums is folded in before checksummed changes are logged.
+            self.compact()
+            log = None
+        fields = ["" if value is None else str(value) for value in values]
+        entry = csv_line([*fields, log_checksum(fields)])
+        if log is None:
+            entries, size = [], 0
+            data = csv_line(self._log_header()) + entry
+        else:
+            entries, size, _ = log
+            data = entry
+        with open(self.log_file, "r+b" if log is not None else "wb") as logfile:
+            # Anything after the last complete change is cut off.
+            logfile.truncate(size)
+            logfile.seek(size)
+            logfile.write(data)
+            logfile.flush()
+            os.fsync(logfile.fileno())
+        return len(entries) + 1
+
+    def update_data(
+        self, index: int, transaction: Transaction, previous: Transaction | None = None
+    ) -> None:
+        """Log updated transaction instead of rewriting csv file."""
+        row = transaction.as_dict()
+        self._log_change(
+            previous, transaction, "U", index, *(row[name] for name in Transaction.fieldnames())
+        )
+
+    def delete_data(self, index: int, previous: Transaction | None = None) -> None:
+        """Log deleted transaction instead of rewriting csv file."""
+        self._log_change(previous, None, "D", index)
+
+    def _log_change(self, previous: Transaction | None, transaction: Transaction | None, *values):
+        with self.locked():
+            totals = self._load_totals() if previous is not None else None
+            count = self._append_log(*values)
+            if totals is not None:
+                removed = count_totals([previous])
+                added = count_totals([transaction] if transaction is not None else [])
+                self._save_totals({key: totals[key] - removed[key] + added[key] for key in totals})
+            else:
+                self.totals_file.unlink(missing_ok=True)
+
+            if count >= self.compact_threshold:
+                self.compact()
+
+    def compact(self) -> None:
+        """Fold change log into csv file."""
+        with self.locked():
+            if self.log_file.exists():
+                self.write_data(self.iter_data())
 
     def write_data(self, transactions: [Transaction]) -> None:
-        """Write all the transactions to csv file."""
+        """Write all the transactions to csv file, replacing it atomically."""
 
         # Get header names.
         fieldnames = Transaction.fieldnames()
 
         self.file.parent.mkdir(parents=True, exist_ok=True)
 
-        with open(self.file, "w", encoding="utf-8", newline="") as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
+        # Transactions may be streamed from the current file, so it's replaced only when
+        # the new one is complete and synced to disk.
+        temp_file = self.file.with_suffix(".csv.tmp")
+        totals = {"income": 0, "expenses": 0, "count": 0}
+        with self.locked():
+            with open(temp_file, "w", encoding="utf-8", newline="") as csvfile:
+                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+                writer.writeheader()
 
-            for transaction in transactions:
-                writer.writerow(transaction.as_dict())
+                for transaction in tally(totals, transactions):
+                    writer.writerow(transaction.as_dict())
+                csvfile.flush()
+                os.fsync(csvfile.fileno())
+            os.replace(temp_file, self.file)
+            # Changes are dropped along with the log only once the new file is in place.
+            sync_directory(self.file.parent)
+            self.log_file.unlink(missing_ok=True)
+            self._save_totals(totals)
 
     def append_data(self, transaction: Transaction) -> None:
-        """Append a new transaction to csv file."""
+        """Append a new transaction to csv file.
+
+        If another process holds the lock, the transaction is queued and committed along
+        with other queued ones in a single write synced to disk once, by whichever process
+        takes the lock next.
+        """
+        data = encode_rows([transaction])
+        if self._try_commit(data):
+            return
+        queued = self.queue.put(data)
+        # Waiting on the lock would tell that the transaction was committed only once the
+        # lock is handed over, so its file is polled instead.
+        while queued.exists() and not self._try_commit():
+            time.sleep(COMMIT_POLL_INTERVAL)
+
+    def _try_commit(self, data: bytes = b"") -> bool:
+        """Commit queued rows and csv rows data unless another process holds the lock,
+        return whether it doesn't."""
+        if not self.lock.acquire(blocking=False):
+            return False
+        try:
+            with self.locked():
+                self._commit(data)
+        finally:
+            self.lock.release()
+        return True
+
+    def _commit(self, data: bytes = b"") -> None:
+        """Append queued rows and csv rows data to csv file, syncing them to disk once.
+        Called holding the lock."""
+        queue = self.queue
+        files, queued = queue.take()
+        data = queued + data
+        if not data:
+            return
+
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        totals = self._load_totals()
+        before = self.identity()
+        with open(self.file, "ab") as csvfile:
+            start = csvfile.tell()
+            # Header of a new file is recorded along with the rows, so it's cut off with them.
+            header = b"" if start else (",".join(Transaction.fieldnames()) + "\r\n").encode()
+            end = start + len(header) + len(data)
+            queue.begin(files, os.fstat(csvfile.fileno()).st_ino, start, end)
+            csvfile.write(header + data)
+            csvfile.flush()
+            os.fsync(csvfile.fileno())
+
+        decode = CsvRowDecoder(Transaction.fieldnames()).decode
+        transactions = [decode(row) for row in csv.reader(io.StringIO(data.decode("utf-8")))]
+        if totals is not None:
+            appended = count_totals(transactions)
+            self._save_totals({key: totals[key] + appended[key] for key in appended})
+        else:
+            self.totals_file.unlink(missing_ok=True)
+        if self.on_append is not None:
+            self.on_append(before, self.identity(), transactions)
+        queue.end(files)
+
+    def extend_data(self, transactions: Iterable[Transaction]) -> int:
+        """Append many transactions to csv file, opening it only once and writing them
+        in large buffered batches synced to disk at the end."""
 
         # Get header names.
         fieldnames = Transaction.fieldnames()
 
         self.file.parent.mkdir(parents=True, exist_ok=True)
 
-        # Create file if it's not exist and write headers.
-        if not self.file.exists():
-            with open(self.file, "w", encoding="utf-8", newline="") as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
+        with self.locked():
+            # Totals are updated incrementally only if they match the file before appending.
+            totals = self._load_totals()
+
+            # Create file if it's not exist and write headers.
+            if not self.file.exists():
+                with open(self.file, "w", encoding="utf-8", newline="") as csvfile:
+                    writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+                    writer.writeheader()
 
-        # Open for appending (avoids rewriting header).
-        with open(self.file, "a", encoding="utf-8", newline="") as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writerow(transaction.as_dict())
+            # Open for appending (avoids rewriting header).
+            appended = {"income": 0, "expenses": 0, "count": 0}
+            queue = self.queue
+            try:
+                with open(
+                    self.file, "a", encoding="utf-8", newline="", buffering=WRITE_BUFFER_SIZE
+                ) as csvfile:
+                    stat = os.fstat(csvfile.fileno())
+                    # Rows are cut off by recovery unless they are all written.
+                    queue.begin([], stat.st_ino, stat.st_size, None)
+                    writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+                    for transaction in tally(appended, transactions):
+                        writer.writerow(transaction.as_dict())
+                    csvfile.flush()
+                    os.fsync(csvfile.fileno())
+            finally:
+                # Transactions may fail midway, the ones written are kept and totals still
+                # cover them.
+                queue.end([])
+                if totals is not None:
+                    self._save_totals({key: totals[key] + appended[key] for key in appended})
+                else:
+                    self.totals_file.unlink(missing_ok=True)
+            return appended["count"]
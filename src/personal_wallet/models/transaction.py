@@ -5,6 +5,8 @@ import re
 class Transaction:
     """Represents a financial transaction."""
 
+    __slots__ = ("date", "amount", "category", "description")
+
     def __init__(
         self,
         date: datetime.datetime | None,
@@ -0,0 +1,153 @@
+import datetime
+import functools
+from array import array
+from typing import Iterable, Iterator
+
+from personal_wallet.models.journaled_file import JournaledFile
+from personal_wallet.models.transaction import Transaction
+
+# Version of table cache format.
+VERSION = 1
+
+# Range of amounts kept in the signed 64-bit amounts column.
+MIN_AMOUNT, MAX_AMOUNT = -(2**63), 2**63 - 1
+
+
+@functools.lru_cache(maxsize=4096)
+def date_of(ordinal: int) -> datetime.datetime:
+    return datetime.datetime.fromordinal(ordinal)
+
+
+def row_of(transaction: Transaction) -> tuple[int, int, str, str | None]:
+    """Return table row of transaction: date ordinal, amount, category and description."""
+    return (
+        transaction.date.toordinal(),
+        transaction.amount,
+        transaction.category,
+        transaction.description,
+    )
+
+
+def check_amount(amount: int) -> None:
+    """Raise ValueError if amount doesn't fit the amounts column, as amounts written by
+    earlier versions may not."""
+    if not MIN_AMOUNT <= amount <= MAX_AMOUNT:
+        raise ValueError(f"Error: Amount {amount} is out of range {MIN_AMOUNT}..{MAX_AMOUNT}.")
+
+
+class TransactionTable:
+    """Columnar in-memory table of transactions.
+
+    Dates are kept as ordinals, amounts and category codes in arrays and descriptions
+    in a list, instead of a Transaction object per row. Rows are read and written as
+    Transaction objects created on demand.
+    """
+
+    def __init__(self):
+        self.dates = array("i")
+        self.amounts = array("q")
+        self.categories = array("B")
+        self.descriptions: list[str | None] = []
+        # Categories are encoded with codes in order of their first appearance.
+        self.category_names: list[str] = []
+        self.category_codes: dict[str, int] = {}
+
+    def category_code(self, category: str) -> int:
+        try:
+            return self.category_codes[category]
+        except KeyError:
+            code = len(self.category_names)
+            self.category_names.append(category)
+            self.category_codes[category] = code
+            return code
+
+    def __len__(self) -> int:
+        return len(self.amounts)
+
+    def __getitem__(self, index: int) -> Transaction:
+        return Transaction(
+            date=date_of(self.dates[index]),
+            amount=self.amounts[index],
+            category=self.category_names[self.categories[index]],
+            description=self.descriptions[index],
+        )
+
+    def __setitem__(self, index: int, transaction: Transaction) -> None:
+        self.set_row(index, *row_of(transaction))
+
+    def set_row(
+        self, index: int, date: int, amount: int, category: str, description: str | None
+    ) -> None:
+        """Replace row at index with date ordinal, amount, category and description."""
+        check_amount(amount)
+        self.dates[index] = date
+        self.amounts[index] = amount
+        self.categories[index] = self.category_code(category)
+        self.descriptions[index] = description
+
+    def __iter__(self) -> Iterator[Transaction]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def append(self, transaction: Transaction) -> None:
+        self.append_row(*row_of(transaction))
+
+    def append_row(self, date: int, amount: int, category: str, description: str | None) -> None:
+        """Append a row given by date ordinal, amount, category and description."""
+        check_amount(amount)
+        self.dates.append(date)
+        self.amounts.append(amount)
+        self.categories.append(self.category_code(category))
+        self.descriptions.append(description)
+
+    def extend(self, transactions: Iterable[Transaction]) -> None:
+        for transaction in transactions:
+            self.append(transaction)
+
+    def pop(self, index: int) -> Transaction:
+        transaction = self[index]
+        for column in (self.dates, self.amounts, self.categories, self.descriptions):
+            column.pop(index)
+        return transaction
+
+    def to_dict(self) -> dict:
+        return {
+            "dates": self.dates.tobytes(),
+            "amounts": self.amounts.tobytes(),
+            "categories": self.categories.tobytes(),
+            "category_names": self.category_names,
+            "descriptions": self.descriptions,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TransactionTable":
+        table = cls()
+        for name in ("dates", "amounts", "categories"):
+            getattr(table, name).frombytes(data[name])
+        table.descriptions = data["descriptions"]
+        for category in data["category_names"]:
+            table.category_code(category)
+        return table
+
+
+class TableCacheFile(JournaledFile):
+    """Parsed transactions cached next to the data file, loaded instead of parsing it and
+    kept up to date by the journal of rows added, updated and deleted through the wallet."""
+
+    suffix = ".table"
+    version = VERSION
+
+    def to_dict(self, data: TransactionTable) -> dict:
+        return data.to_dict()
+
+    def from_dict(self, data: dict) -> TransactionTable:
+        return TransactionTable.from_dict(data)
+
+    def apply(self, data: TransactionTable, change: dict) -> None:
+        if change["operation"] == "add":
+            for row in change["rows"]:
+                data.append_row(*row)
+        elif change["operation"] == "update":
+            data.set_row(change["position"], *change["row"])
+        else:
+            data.pop(change["position"])
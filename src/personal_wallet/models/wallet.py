@@ -1,28 +1,171 @@
+import bisect
+import contextlib
+import copy
 import datetime
+import functools
+import itertools
 import re
-from pathlib import Path
+from typing import Callable, Iterable, Iterator
 
-from personal_wallet.models.storage import CsvStorage
+from personal_wallet import stats
+from personal_wallet.models.aggregation import aggregate
+from personal_wallet.models.description_index import DescriptionIndex, DescriptionIndexFile
+from personal_wallet.models.indexes import SortedIndex, intersect
+from personal_wallet.models.query import Query
+from personal_wallet.models.storage import IndexedStorage, Storage
 from personal_wallet.models.transaction import Transaction
+from personal_wallet.models.transaction_table import TableCacheFile, TransactionTable, row_of
 
+# Names of wallet indexes with functions returning the indexed key of a transaction.
+INDEX_KEYS: dict[str, Callable[[Transaction], int]] = {
+    "date_index": lambda transaction: transaction.date.toordinal(),
+    "amount_index": lambda transaction: transaction.amount,
+}
 
-class Wallet(CsvStorage):
+
+class Wallet:
     """Represents a wallet."""
 
-    def __init__(self, file: Path):
-        super().__init__(file)
-        self.transactions = self.read_data()
+    def __init__(self, storage: Storage, stream: bool = False):
+        self.storage = storage
+        # In streaming mode read-only queries go through storage row by row and
+        # transactions are never held in memory all at once.
+        self.stream = stream
+        # Indexed storage answers queries itself, so transactions are never loaded.
+        self.indexed = isinstance(storage, IndexedStorage)
+        self.description_index_file = DescriptionIndexFile(storage.file)
+        self.table_cache_file = TableCacheFile(storage.file)
+        storage.on_append = self._journal_appended
+
+    @functools.cached_property
+    def transactions(self) -> TransactionTable:
+        """All transactions, loaded on first access from table cache if it's up to date
+        with storage, otherwise read from storage into a columnar table and cached."""
+        with stats.phase("read") as phase:
+            identity = self.storage.identity()
+            table = self.table_cache_file.load(identity)
+            if table is None:
+                table = self.storage.read_table()
+                # Data changed while being read may not match its identity taken before.
+                if self.storage.identity() == identity:
+                    self.table_cache_file.save(table, identity)
+            phase.rows_read = len(table)
+        return table
+
+    @functools.cached_property
+    def date_index(self) -> SortedIndex:
+        """Index of transactions by date, built on first date query and kept up to date."""
+        return SortedIndex(self.transactions.dates)
+
+    @functools.cached_property
+    def amount_index(self) -> SortedIndex:
+        """Index of transactions by amount, built on first amount query and kept up to date."""
+        return SortedIndex(self.transactions.amounts)
+
+    @functools.cached_property
+    def description_index(self) -> DescriptionIndex:
+        """Index of transactions by description, loaded from index file if it's up to date
+        with storage, otherwise built on first description query and saved."""
+        with stats.phase("index"):
+            identity = self.storage.identity()
+            index = self.description_index_file.load(identity)
+            if index is None:
+                index = DescriptionIndex(self.transactions.descriptions)
+                self.description_index_file.save(index, identity)
+        return index
+
+    @contextlib.contextmanager
+    def _journal_description(self, operation: str, **change):
+        """Record change of storage made within the block to description index journal."""
+        if self.indexed or not self.description_index_file.exists():
+            yield
+            return
+        before = self.storage.identity()
+        yield
+        self.description_index_file.record(before, self.storage.identity(), operation, **change)
+
+    @contextlib.contextmanager
+    def _journal_table(self, operation: str, **change):
+        """Record change of storage made within the block to table cache journal."""
+        if self.indexed or not self.table_cache_file.exists():
+            yield
+            return
+        before = self.storage.identity()
+        yield
+        self.table_cache_file.record(before, self.storage.identity(), operation, **change)
+
+    def _journal_appended(
+        self, before: dict | None, after: dict | None, transactions: list[Transaction]
+    ) -> None:
+        """Record transactions appended to storage to description index and table cache
+        journals. Appends of other processes may be committed along with this wallet's
+        ones."""
+        if self.indexed:
+            return
+        if self.description_index_file.exists():
+            descriptions = [transaction.description for transaction in transactions]
+            self.description_index_file.record(before, after, "add", descriptions=descriptions)
+        if self.table_cache_file.exists():
+            rows = [row_of(transaction) for transaction in transactions]
+            self.table_cache_file.record(before, after, "add", rows=rows)
+
+    def _built_indexes(self) -> Iterator[tuple[SortedIndex, Callable[[Transaction], int]]]:
+        for name, key in INDEX_KEYS.items():
+            if name in self.__dict__:
+                yield self.__dict__[name], key
+
+    def __len__(self) -> int:
+        if self.indexed:
+            return self.storage.count_data()
+        return len(self.transactions)
+
+    def _iter_data(self) -> Iterable[Transaction]:
+        if self.stream:
+            return self.storage.iter_data()
+        return self.transactions
 
     def add_transaction(self, transaction: Transaction) -> None:
         """Add a new transaction to wallet and storage."""
-        self.transactions.append(transaction)
-        self.append_data(transaction)
+        if "transactions" in self.__dict__:
+            self.transactions.append(transaction)
+            for index, key in self._built_indexes():
+                index.add(len(self.transactions) - 1, key(transaction))
+        if "description_index" in self.__dict__:
+            self.description_index.add(self.description_index.rows, transaction.description)
+        with stats.phase("write"):
+            self.storage.append_data(transaction)
+
+    def add_transactions(self, transactions: Iterable[Transaction]) -> int:
+        """Add many transactions, streaming them to storage in a single append.
+        Return the number of added transactions."""
+        if "transactions" in self.__dict__:
+            transactions = self._append_loaded(transactions)
+        # Bulk appends aren't journaled, so description index is rebuilt on next query
+        # and transactions are read from storage on next load.
+        self.__dict__.pop("description_index", None)
+        self.description_index_file.remove()
+        self.table_cache_file.remove()
+        with stats.phase("write"):
+            return self.storage.extend_data(transactions)
+
+    def _append_loaded(self, transactions: Iterable[Transaction]) -> Iterator[Transaction]:
+        """Pass transactions through, appending them to loaded table and indexes."""
+        for transaction in transactions:
+            self.transactions.append(transaction)
+            for index, key in self._built_indexes():
+                index.add(len(self.transactions) - 1, key(transaction))
+            yield transaction
 
     def get_balance(self) -> tuple[int, int]:
         """Return total income and total expenses."""
+        with stats.phase("totals"):
+            totals = self.storage.read_totals()
+        if totals is not None:
+            return totals
+
         income = 0
         expenses = 0
-        for transaction in self.transactions:
+        for transaction in self._iter_data():
             match transaction.category:
                 case "income":
                     income += transaction.amount
@@ -30,6 +173,26 @@ class Wallet(CsvStorage):
                     expenses += transaction.amount
         return income, expenses
 
+    def report(
+        self,
+        group_by: list[str],
+        date: datetime.datetime | tuple[datetime.datetime, datetime.datetime] | None = None,
+        category: str | None = None,
+    ) -> list[dict]:
+        """Return count, totals, average, min and max amount of transactions within date and
+        category grouped by group_by, e.g. ["month", "category"]."""
+        if self.indexed:
+            # Indexed storage doesn't keep the loaded table up to date, so it's read anew.
+            with stats.phase("read") as phase:
+                table = self.storage.read_table()
+                phase.rows_read = len(table)
+        else:
+            table = self.transactions
+        with stats.phase("aggregate") as phase:
+            rows = aggregate(table, group_by, date, category)
+            phase.rows_matched = len(rows)
+        return rows
+
     def find_transactions(
         self,
         index: int | tuple[int, int] | None,
@@ -39,49 +202,86 @@ class Wallet(CsvStorage):
         description: str | re.Pattern | None,
     ) -> list[dict]:
         """Filter out transactions not matching index, date, amount, category or description."""
+        with stats.phase("filter") as phase:
+            found = list(self.iter_transactions(index, date, amount, category, description))
+            phase.rows_matched = len(found)
+        return found
+
+    def iter_transactions(
+        self,
+        index: int | tuple[int, int] | None,
+        date: datetime.datetime | tuple[datetime.datetime, datetime.datetime] | None,
+        amount: int | tuple[int, int] | None,
+        category: str | None,
+        description: str | re.Pattern | None,
+    ) -> Iterator[dict]:
+        """Yield transactions matching index, date, amount, category or description."""
+        if self.indexed:
+            yield from self.storage.find_data(index, date, amount, category, description)
+            return
+
+        if not self.stream and "transactions" not in self.__dict__:
+            # Storage read by several processes is scanned in parallel, instead of
+            # loading transactions.
+            found = self.storage.scan_data(index, date, amount, category, description)
+            if found is not None:
+                yield from found
+                return
 
         # Define search range.
-        n = len(self.transactions)
-        start, stop = 0, n
+        start, stop = 0, None
         if index is not None:
             if isinstance(index, tuple):
-                start, stop = index[0], min(n, index[1] + 1)
+                start, stop = index[0], index[1] + 1
             else:
-                start, stop = index, min(n, index + 1)
-
-        # Filtering out.
-        matching_transactions = []
-        for i in range(start, stop):
-            transaction = self.transactions[i]
-            if (
-                category is not None
-                and not transaction.match_category(category)
-                or date is not None
-                and (
-                    isinstance(date, datetime.datetime)
-                    and not transaction.match_date(date)
-                    or isinstance(date, tuple)
-                    and not transaction.match_date_range(date)
-                )
-                or amount is not None
-                and (
-                    isinstance(amount, int)
-                    and not transaction.match_amount(amount)
-                    or isinstance(amount, tuple)
-                    and not transaction.match_amount_range(amount)
-                )
-                or description is not None
-                and (
-                    isinstance(description, str)
-                    and not transaction.match_description(description)
-                    or isinstance(description, re.Pattern)
-                    and not transaction.match_description_pattern(description)
-                )
-            ):
-                continue
-            transaction = {"index": i, **transaction.as_dict()}
-            matching_transactions.append(transaction)
-        return matching_transactions
+                start, stop = index, index + 1
+
+        query = Query(date, amount, category, description)
+        if self.stream:
+            matches = query.predicate()
+            rows = itertools.islice(self.storage.iter_data(), start, stop)
+            for i, transaction in enumerate(rows, start):
+                if matches(transaction):
+                    yield {"index": i, **transaction.as_dict()}
+            return
+
+        n = len(self.transactions)
+        stop = n if stop is None else min(n, stop)
+        positions = self._lookup(date, amount, description)
+        if positions is not None:
+            # Only transactions found with indexes are checked.
+            positions = positions[
+                bisect.bisect_left(positions, start) : bisect.bisect_left(positions, stop)
+            ]
+        else:
+            positions = range(start, stop)
+        # Rows are checked on table columns, and transactions are created only for
+        # those matching.
+        for i in filter(query.row_predicate(self.transactions), positions):
+            yield {"index": i, **self.transactions[i].as_dict()}
+
+    def _lookup(
+        self,
+        date: datetime.datetime | tuple[datetime.datetime, datetime.datetime] | None,
+        amount: int | tuple[int, int] | None,
+        description: str | re.Pattern | None,
+    ) -> list[int] | None:
+        """Return sorted positions of transactions matching date, amount and description
+        according to indexes, or None if indexes can't narrow the search."""
+        candidates = []
+        if date is not None:
+            date_from, date_to = date if isinstance(date, tuple) else (date, date)
+            candidates.append(self.date_index.lookup(date_from.toordinal(), date_to.toordinal()))
+        if amount is not None:
+            amount_from, amount_to = amount if isinstance(amount, tuple) else (amount, amount)
+            candidates.append(self.amount_index.lookup(amount_from, amount_to))
+        if description is not None:
+            positions = self.description_index.lookup(description)
+            if positions is not None:
+                candidates.append(positions)
+        if not candidates:
+            return None
+        return functools.reduce(intersect, candidates)
 
     def update_transaction(
         self,
@@ -92,25 +292,69 @@ class Wallet(CsvStorage):
         description: str | re.Pattern | None,
     ) -> None:
         """Update transaction date, amount, category or description by its index."""
-        if not self.transactions:
-            raise IndexError("Wallet is empty, no transactions to update.")
-        try:
-            transaction = self.transactions[index]
-            transaction.update(date, amount, category, description)
-            self.write_data(self.transactions)
-        except IndexError as e:
-            raise LookupError(f"Error: Transaction with index {index} not found.") from e
-        except IOError as e:
-            raise IOError("Error: Error writing data after transaction deletion.") from e
+        # Held from reading the transaction, so it isn't changed by another process meanwhile.
+        with self.storage.locked():
+            if not len(self):
+                raise IndexError("Wallet is empty, no transactions to update.")
+            try:
+                if self.indexed:
+                    previous = self.storage.get_data(index)
+                else:
+                    previous = self.transactions[index]
+                transaction = copy.copy(previous)
+                transaction.update(date, amount, category, description)
+                with (
+                    stats.phase("write"),
+                    self._journal_description(
+                        "update",
+                        position=index,
+                        previous=previous.description,
+                        description=transaction.description,
+                    ),
+                    self._journal_table("update", position=index, row=row_of(transaction)),
+                ):
+                    self.storage.update_data(index, transaction, previous)
+                if not self.indexed:
+                    self.transactions[index] = transaction
+                    for sorted_index, key in self._built_indexes():
+                        if key(transaction) != key(previous):
+                            sorted_index.remove(index, key(previous))
+                            sorted_index.add(index, key(transaction))
+                    if "description_index" in self.__dict__:
+                        self.description_index.remove(index, previous.description)
+                        self.description_index.add(index, transaction.description)
+            except IndexError as e:
+                raise LookupError(f"Error: Transaction with index {index} not found.") from e
+            except IOError as e:
+                raise IOError("Error: Error writing data after transaction deletion.") from e
 
     def delete_transaction(self, index: int) -> None:
         """Delete a transaction by its index"""
-        if not self.transactions:
-            raise IndexError("Wallet is empty, no transactions to delete.")
-        try:
-            self.transactions.pop(index)
-            self.write_data(self.transactions)
-        except IndexError as e:
-            raise LookupError(f"Error: Transaction with index {index} not found.") from e
-        except IOError as e:
-            raise IOError("Error: Error writing data after transaction deletion.") from e
+        # Held from reading the transaction, so it isn't changed by another process meanwhile.
+        with self.storage.locked():
+            if not len(self):
+                raise IndexError("Wallet is empty, no transactions to delete.")
+            try:
+                if self.indexed:
+                    with stats.phase("write"):
+                        self.storage.delete_data(index)
+                else:
+                    previous = self.transactions.pop(index)
+                    # Positions after the deleted one are shifted, so sorted indexes are
+                    # rebuilt on next query.
+                    for name in INDEX_KEYS:
+                        self.__dict__.pop(name, None)
+                    if "description_index" in self.__dict__:
+                        self.description_index.delete(index, previous.description)
+                    with (
+                        stats.phase("write"),
+                        self._journal_description(
+                            "delete", position=index, previous=previous.description
+                        ),
+                        self._journal_table("delete", position=index),
+                    ):
+                        self.storage.delete_data(index, previous)
+            except IndexError as e:
+                raise LookupError(f"Error: Transaction with index {index} not found.") from e
+            except IOError as e:
+                raise IOError("Error: Error writing data after transaction deletion.") from e
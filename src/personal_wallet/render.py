@@ -0,0 +1,40 @@
+import itertools
+from typing import Iterable, Iterator
+
+# Rows used to choose column widths before the first line is printed.
+WIDTH_SAMPLE_SIZE = 1000
+
+
+def stream_table(rows: Iterable[dict]) -> Iterator[str]:
+    """Render rows as a table in tabulate's "simple" format, yielding it line by line.
+
+    Column widths are chosen from the first rows only, so printing starts before all
+    the rows are known. Wider values found later just shift the rest of their line.
+    """
+    rows = iter(rows)
+    sample = list(itertools.islice(rows, WIDTH_SAMPLE_SIZE))
+    if not sample:
+        yield ""
+        return
+
+    headers = list(sample[0])
+    numeric = [isinstance(sample[0][header], int) for header in headers]
+    widths = [
+        max(len(header) + 2, *(len(cell(row[header])) for row in sample)) for header in headers
+    ]
+
+    def line(values: Iterable[str]) -> str:
+        cells = (
+            value.rjust(width) if is_numeric else value.ljust(width)
+            for value, width, is_numeric in zip(values, widths, numeric)
+        )
+        return "  ".join(cells).rstrip()
+
+    yield line(headers)
+    yield "  ".join("-" * width for width in widths)
+    for row in itertools.chain(sample, rows):
+        yield line(cell(row[header]) for header in headers)
+
+
+def cell(value) -> str:
+    return "" if value is None else str(value)
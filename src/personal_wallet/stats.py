@@ -0,0 +1,169 @@
+import contextlib
+import json
+import sys
+import time
+from typing import Iterable, Iterator
+
+try:
+    import resource
+except ImportError:  # Not available on Windows.
+    resource = None
+
+FIELDS = ["wall", "cpu", "rows_read", "rows_matched", "bytes_read", "bytes_written", "peak_memory"]
+
+
+class Phase:
+    """Measurements of a phase of command execution.
+
+    Wall and CPU time are in seconds, bytes read and written are counted by the operating
+    system for the whole process, peak memory is the peak resident set size of the process
+    by the end of the phase. Measurements that can't be taken stay None.
+    """
+
+    __slots__ = ["name", "depth", *FIELDS]
+
+    def __init__(self, name: str, depth: int = 0):
+        self.name = name
+        self.depth = depth
+        for field in FIELDS:
+            setattr(self, field, None)
+
+    def as_dict(self) -> dict:
+        return {"name": self.name, "depth": self.depth, **{f: getattr(self, f) for f in FIELDS}}
+
+
+class Stats:
+    """Collects phases of command execution, in order of their start. Phases started
+    within other phases are nested in them, and their time is included in the outer one."""
+
+    def __init__(self):
+        self.phases: list[Phase] = []
+        self.depth = 0
+        self.total = Phase("total")
+        self.start = self.measure()
+
+    @staticmethod
+    def measure() -> tuple:
+        return time.perf_counter(), time.process_time(), *io_counters()
+
+    def finish(self, phase: Phase, start: tuple) -> None:
+        wall, cpu, bytes_read, bytes_written = self.measure()
+        phase.wall = wall - start[0]
+        phase.cpu = cpu - start[1]
+        if bytes_read is not None:
+            phase.bytes_read = bytes_read - start[2]
+            phase.bytes_written = bytes_written - start[3]
+        phase.peak_memory = peak_memory()
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[Phase]:
+        phase = Phase(name, self.depth)
+        self.phases.append(phase)
+        self.depth += 1
+        start = self.measure()
+        try:
+            yield phase
+        finally:
+            self.finish(phase, start)
+            self.depth -= 1
+
+    def as_dict(self) -> dict:
+        self.finish(self.total, self.start)
+        return {
+            "phases": [phase.as_dict() for phase in self.phases],
+            "total": self.total.as_dict(),
+        }
+
+    def format_text(self) -> str:
+        self.finish(self.total, self.start)
+        headers = ["phase", "wall s", "cpu s", "rows read", "matched", "read KiB", "written KiB"]
+        headers.append("peak MiB")
+        lines = [f"{headers[0]:<24}" + "".join(f"{header:>12}" for header in headers[1:])]
+        for phase in [*self.phases, self.total]:
+            values = [
+                format_value(phase.wall, "{:.3f}"),
+                format_value(phase.cpu, "{:.3f}"),
+                format_value(phase.rows_read, "{}"),
+                format_value(phase.rows_matched, "{}"),
+                format_value(phase.bytes_read, "{:.1f}", 1024),
+                format_value(phase.bytes_written, "{:.1f}", 1024),
+                format_value(phase.peak_memory, "{:.1f}", 1024 * 1024),
+            ]
+            name = "  " * phase.depth + phase.name
+            lines.append(f"{name:<24}" + "".join(f"{value:>12}" for value in values))
+        return "\n".join(lines)
+
+
+def format_value(value, template: str, unit: int = 1) -> str:
+    if value is None:
+        return "-"
+    return template.format(value / unit if unit != 1 else value)
+
+
+def io_counters() -> tuple[int | None, int | None]:
+    """Return bytes read and written by the process so far, if the system tells them."""
+    try:
+        with open("/proc/self/io", "r", encoding="ascii") as file:
+            counters = dict(line.split(": ") for line in file.read().splitlines())
+        return int(counters["rchar"]), int(counters["wchar"])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+def peak_memory() -> int | None:
+    """Return peak resident set size of the process in bytes, if the system tells it."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+# Stats of the running command, collected only when requested.
+active: Stats | None = None
+
+
+def enable() -> Stats:
+    global active
+    active = Stats()
+    return active
+
+
+def disable() -> None:
+    global active
+    active = None
+
+
+@contextlib.contextmanager
+def phase(name: str) -> Iterator[Phase]:
+    """Measure a phase of command execution if stats are collected. Counts of rows may
+    be set on the yielded phase."""
+    if active is None:
+        yield Phase(name)
+        return
+    with active.phase(name) as measured:
+        yield measured
+
+
+def counted(rows: Iterable, phase: Phase, field: str) -> Iterable:
+    """Pass rows through, counting them in a field of phase if stats are collected."""
+    if active is None:
+        return rows
+
+    def count():
+        setattr(phase, field, 0)
+        for row in rows:
+            setattr(phase, field, getattr(phase, field) + 1)
+            yield row
+
+    return count()
+
+
+def report(file, file_format: str) -> None:
+    """Write collected stats to file as text or JSON."""
+    if active is None:
+        return
+    if file_format == "json":
+        file.write(json.dumps(active.as_dict()) + "\n")
+    else:
+        file.write(active.format_text() + "\n")
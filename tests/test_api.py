@@ -0,0 +1,138 @@
+"""
+Tests for HTTP JSON API of the wallet.
+"""
+
+import asyncio
+import datetime
+import http.client
+import json
+import threading
+
+import pytest
+
+from personal_wallet import api, daemon
+from personal_wallet.constants import PROJECT_DIR
+from personal_wallet.models.storage import CsvStorage
+from personal_wallet.models.transaction import Transaction
+
+
+@pytest.fixture
+def client():
+    service = daemon.WalletService(CsvStorage(PROJECT_DIR / "tests" / "transactions.csv"))
+    servers = []
+    ready = threading.Event()
+
+    def on_ready(server):
+        servers.append((server, asyncio.get_running_loop()))
+        ready.set()
+
+    def run():
+        try:
+            asyncio.run(api.serve(api.WalletApi(service), "127.0.0.1", 0, on_ready))
+        except asyncio.CancelledError:
+            pass
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    assert ready.wait(5)
+    server, loop = servers[0]
+    connection = http.client.HTTPConnection(*server.sockets[0].getsockname()[:2], timeout=5)
+    yield connection
+    connection.close()
+    loop.call_soon_threadsafe(server.close)
+    thread.join(5)
+
+
+def request(connection, method, url, body=None):
+    connection.request(method, url, body=None if body is None else json.dumps(body))
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def test_api(client):
+    assert request(client, "GET", "/balance") == (200, {"balance": 0, "income": 0, "expenses": 0})
+    added = {"date": "2024-05-03", "amount": 153, "category": "income"}
+    assert request(client, "POST", "/transactions", added) == (
+        201,
+        {"message": "Added transaction successfully!"},
+    )
+    added = {"date": "2024-06-03", "amount": 257, "category": "expenses", "description": "Book"}
+    request(client, "POST", "/transactions", added)
+    assert request(client, "GET", "/balance")[1] == {
+        "balance": -104,
+        "income": 153,
+        "expenses": 257,
+    }
+
+    status, found = request(client, "GET", "/transactions?date=2024-06-01..2024-06-30")
+    assert status == 200
+    assert found == [
+        {
+            "index": 1,
+            "date": "2024-06-03",
+            "amount": 257,
+            "category": "expenses",
+            "description": "Book",
+        }
+    ]
+    assert request(client, "GET", "/transactions?description=%25oo%25")[1] == found
+    assert len(request(client, "GET", "/transactions")[1]) == 2
+
+    assert request(client, "PATCH", "/transactions/0", {"amount": 300}) == (
+        200,
+        {"message": "Updated transaction successfully!"},
+    )
+    assert request(client, "DELETE", "/transactions/1")[0] == 200
+    assert request(client, "GET", "/balance")[1]["balance"] == 300
+
+
+@pytest.mark.parametrize(
+    "method, url, body, status, error",
+    [
+        ("GET", "/transactions?amount=5..1", None, 400, "start value 5 is greater"),
+        ("GET", "/transactions?colour=red", None, 400, "Unknown fields colour"),
+        ("POST", "/transactions", {"amount": 1}, 400, "Amount and category are required"),
+        ("POST", "/transactions", {"amount": 1, "category": "gift"}, 400, "'category'"),
+        ("POST", "/transactions", {"amount": 2**63, "category": "income"}, 400, "'amount'"),
+        ("PATCH", "/transactions/0", {"amount": 1}, 404, "Wallet is empty"),
+        ("DELETE", "/transactions/x", None, 400, "'index'"),
+        ("PUT", "/balance", None, 405, "Method PUT not allowed"),
+        ("GET", "/nothing", None, 404, "No such resource"),
+    ],
+)
+def test_api_errors(client, method, url, body, status, error):
+    response_status, response = request(client, method, url, body)
+    assert response_status == status
+    assert error in response["error"]
+
+
+def test_api_reloads_changed_file(client):
+    request(client, "POST", "/transactions", {"amount": 100, "category": "income"})
+    # Written around the server, as by another process.
+    storage = CsvStorage(PROJECT_DIR / "tests" / "transactions.csv")
+    storage.append_data(Transaction(datetime.datetime(2024, 5, 3), 100, "income", None))
+    assert request(client, "GET", "/balance")[1]["income"] == 200
+
+
+def test_readers_share_lock_and_writer_waits():
+    async def scenario():
+        lock = api.ReadWriteLock()
+        events = []
+
+        async def reader(name):
+            async with lock.read():
+                events.append(f"{name} in")
+                await asyncio.sleep(0.01)
+                events.append(f"{name} out")
+
+        async def writer():
+            async with lock.write():
+                events.append("writer")
+
+        await asyncio.gather(reader("a"), reader("b"), writer(), reader("c"))
+        return events
+
+    events = asyncio.run(scenario())
+    assert events[:2] == ["a in", "b in"]
+    # Reader coming after a waiting writer gets the lock after it.
+    assert events.index("writer") < events.index("c in")
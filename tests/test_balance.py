@@ -3,6 +3,7 @@ Tests for 'balance' command.
 """
 
 from personal_wallet.cli import main
+from personal_wallet.constants import PROJECT_DIR
 
 
 def test_balance_is_zero(cli_runner, config):
@@ -41,6 +42,29 @@ def test_increased_and_decreased(cli_runner, config):
         balance_is_correct(cli_runner, config, total_income, total_expenses)
 
 
+def test_balance_after_update_and_delete(cli_runner, config):
+    increase_balance(cli_runner, config, 100)
+    decrease_balance(cli_runner, config, 30)
+    decrease_balance(cli_runner, config, 20)
+    balance_is_correct(cli_runner, config, 100, 50)
+
+    cli_runner.invoke(main, ["update", "-i", "0", "-a", "300", "--config", config])
+    balance_is_correct(cli_runner, config, 300, 50)
+
+    cli_runner.invoke(main, ["delete", "-i", "1", "--config", config])
+    balance_is_correct(cli_runner, config, 300, 20)
+
+
+def test_balance_after_external_change(cli_runner, config):
+    increase_balance(cli_runner, config, 100)
+    balance_is_correct(cli_runner, config, 100, 0)
+
+    csvfile = PROJECT_DIR / "tests" / "transactions.csv"
+    with open(csvfile, "a", encoding="utf-8", newline="") as file:
+        file.write("2024-05-01,70,expenses,Edited by hand\n")
+    balance_is_correct(cli_runner, config, 100, 70)
+
+
 def increase_balance(cli_runner, config, amount):
     cli_runner.invoke(main, ["add", "-a", amount, "-c", "income", "--config", config])
 
@@ -3,6 +3,7 @@ Tests for command line interface (CLI).
 """
 
 import subprocess
+import sys
 from importlib import import_module
 from importlib.metadata import version
 
@@ -57,3 +58,25 @@ def test_example_command(cli_runner, config):
     """
     result = cli_runner.invoke(main, "balance", "--version")
     assert result.exit_code == 0
+
+
+def test_commands_are_listed(cli_runner):
+    """
+    Are lazily loaded commands listed in help?
+    """
+    result = cli_runner.invoke(main, "--help")
+    for command in ["add", "balance", "compact", "delete", "export", "find", "import"]:
+        assert f"\n  {command} " in result.output
+
+
+def test_lazy_imports():
+    """
+    Does CLI start without importing commands and their heavy dependencies?
+    """
+    code = (
+        "import sys; from personal_wallet.cli import main; "
+        "print(' '.join(sorted(set(sys.modules) & {"
+        "'personal_wallet.commands', 'tabulate', 'sqlite3', 'multiprocessing', 'cProfile'})))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    assert result.stdout == "\n"
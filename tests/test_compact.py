@@ -0,0 +1,161 @@
+"""
+Tests for 'compact' command.
+"""
+
+import datetime
+import os
+
+from personal_wallet.cli import main
+from personal_wallet.constants import PROJECT_DIR
+from personal_wallet.models.storage import CsvStorage
+from personal_wallet.models.transaction import Transaction
+
+LOG_FILE = PROJECT_DIR / "tests" / "transactions.log"
+
+
+def test_changes_are_logged(cli_runner, config):
+    add_transactions(cli_runner, config)
+    change_transactions(cli_runner, config)
+    assert LOG_FILE.exists()
+    transactions_are_changed(cli_runner, config)
+
+
+def test_compact(cli_runner, config):
+    add_transactions(cli_runner, config)
+    change_transactions(cli_runner, config)
+    result = cli_runner.invoke(main, ["compact", "--config", config])
+    assert result.exit_code == 0
+    assert result.output == "Compacted transactions successfully!\n"
+    assert not LOG_FILE.exists()
+    transactions_are_changed(cli_runner, config)
+
+
+def test_compact_empty_wallet(cli_runner, config):
+    result = cli_runner.invoke(main, ["compact", "--config", config])
+    assert result.exit_code == 0
+    assert result.output == "Compacted transactions successfully!\n"
+
+
+def test_add_after_changes(cli_runner, config):
+    add_transactions(cli_runner, config)
+    change_transactions(cli_runner, config)
+    cli_runner.invoke(main, ["add", "-a", "5", "-c", "income", "-s", "Tip", "--config", config])
+    cli_runner.invoke(main, ["update", "-i", "2", "-a", "7", "--config", config])
+    result = cli_runner.invoke(main, ["find", "-i", "2", "--config", config])
+    assert "Tip" in result.output
+    assert "7" in result.output
+
+
+def test_changes_are_synced(cli_runner, config, monkeypatch):
+    add_transactions(cli_runner, config)
+    synced = []
+    fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: synced.append(fd) or fsync(fd))
+    change_transactions(cli_runner, config)
+    assert len(synced) == 2
+
+
+def test_change_cut_off_by_crash_is_dropped(cli_runner, config):
+    add_transactions(cli_runner, config)
+    change_transactions(cli_runner, config)
+    complete = LOG_FILE.read_bytes()
+    with open(LOG_FILE, "ab") as logfile:
+        logfile.write(b'U,0,2024-05-01,5,income,"Cut')
+    transactions_are_changed(cli_runner, config)
+
+    # Next change is appended after the last complete one.
+    cli_runner.invoke(main, ["update", "-i", "0", "-a", "300", "--config", config])
+    assert LOG_FILE.read_bytes().startswith(complete)
+    result = cli_runner.invoke(main, ["balance", "--config", config])
+    assert result.output == "Current balance: -700\nIncome: 0\nExpenses: 700\n"
+
+
+def test_row_cut_off_by_crash_is_dropped(cli_runner, config):
+    add_transactions(cli_runner, config)
+    storage = CsvStorage(PROJECT_DIR / "tests" / "transactions.csv")
+    complete = storage.file.read_bytes()
+    # Append was recorded, but the process crashed in the middle of writing its row.
+    storage.queue.begin([], storage.file.stat().st_ino, len(complete), len(complete) + 30)
+    with open(storage.file, "ab") as csvfile:
+        csvfile.write(b"2024-05-01,5,inc")
+
+    # Next row is appended after the last complete one.
+    cli_runner.invoke(main, ["add", "-a", "50", "-c", "income", "-s", "Gift", "--config", config])
+    assert storage.file.read_bytes().startswith(complete)
+    assert [t.amount for t in storage.read_data()] == [1000, 200, 400, 50]
+    result = cli_runner.invoke(main, ["balance", "--config", config])
+    assert result.output == "Current balance: 450\nIncome: 1050\nExpenses: 600\n"
+
+
+def test_row_without_line_break_is_kept(cli_runner, config):
+    add_transactions(cli_runner, config)
+    storage = CsvStorage(PROJECT_DIR / "tests" / "transactions.csv")
+    # Last line break removed by editing the file by hand.
+    storage.file.write_bytes(storage.file.read_bytes().rstrip(b"\r\n"))
+
+    cli_runner.invoke(main, ["add", "-a", "50", "-c", "income", "-s", "Gift", "--config", config])
+    assert [t.amount for t in storage.read_data()] == [1000, 200, 400, 50]
+    result = cli_runner.invoke(main, ["balance", "--config", config])
+    assert result.output == "Current balance: 450\nIncome: 1050\nExpenses: 600\n"
+
+
+def test_incomplete_row_not_appended_by_wallet_is_kept(cli_runner, config):
+    add_transactions(cli_runner, config)
+    storage = CsvStorage(PROJECT_DIR / "tests" / "transactions.csv")
+    with open(storage.file, "ab") as csvfile:
+        csvfile.write(b"2024-05-01,5")
+    data = storage.file.read_bytes()
+
+    result = cli_runner.invoke(
+        main, ["add", "-a", "50", "-c", "income", "-s", "Gift", "--config", config]
+    )
+    assert "Last row" in str(result.exception)
+    assert storage.file.read_bytes() == data
+
+
+def test_corrupt_change_is_dropped(cli_runner, config):
+    add_transactions(cli_runner, config)
+    change_transactions(cli_runner, config)
+    corrupt = LOG_FILE.read_bytes().replace(b"Bought a pen", b"Bought a pan")
+    LOG_FILE.write_bytes(corrupt)
+    result = cli_runner.invoke(main, ["find", "--config", config])
+    assert "Bought a pan" not in result.output
+    assert DESCRIPTIONS[2] in result.output
+
+
+def test_log_without_checksums_is_folded(cli_runner, config):
+    add_transactions(cli_runner, config)
+    storage = CsvStorage(PROJECT_DIR / "tests" / "transactions.csv")
+    inode = storage.file.stat().st_ino
+    LOG_FILE.write_text(f"#base,{inode}\r\nD,0\r\n", encoding="utf-8")
+    storage.update_data(0, Transaction(datetime.datetime(2024, 5, 1), 250, "expenses", "Pen"))
+    assert [t.amount for t in storage.read_data()] == [250, 400]
+    assert LOG_FILE.read_text(encoding="utf-8").startswith(
+        f"#base,{storage.file.stat().st_ino},crc32"
+    )
+
+
+DESCRIPTIONS = ["Salary", "Bought coffee", "Bought a book"]
+
+
+def add_transactions(cli_runner, config):
+    for amount, category, description in zip(
+        ["1000", "200", "400"], ["income", "expenses", "expenses"], DESCRIPTIONS
+    ):
+        cli_runner.invoke(
+            main, ["add", "-a", amount, "-c", category, "-s", description, "--config", config]
+        )
+
+
+def change_transactions(cli_runner, config):
+    cli_runner.invoke(main, ["delete", "-i", "0", "--config", config])
+    cli_runner.invoke(main, ["update", "-i", "1", "-s", "Bought a pen", "--config", config])
+
+
+def transactions_are_changed(cli_runner, config):
+    result = cli_runner.invoke(main, ["find", "--config", config])
+    assert DESCRIPTIONS[0] not in result.output
+    assert DESCRIPTIONS[1] in result.output
+    assert "Bought a pen" in result.output
+    result = cli_runner.invoke(main, ["balance", "--config", config])
+    assert result.output == "Current balance: -600\nIncome: 0\nExpenses: 600\n"
@@ -0,0 +1,136 @@
+"""
+Tests for storage of transactions in compressed blocks.
+"""
+
+import datetime
+import os
+
+import pytest
+
+from personal_wallet.constants import PROJECT_DIR
+from personal_wallet.models.compressed_storage import CompressedStorage
+from personal_wallet.models.transaction import Transaction
+from personal_wallet.models.wallet import Wallet
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    monkeypatch.setattr(CompressedStorage, "block_rows", 4)
+    storage = CompressedStorage(PROJECT_DIR / "tests" / CompressedStorage.filename)
+    # Five days of two transactions: blocks of days 1-2, 3-4 and the last block of day 5.
+    storage.extend_data(transaction(day, amount) for day in range(1, 6) for amount in (1, 2))
+    return storage
+
+
+@pytest.fixture
+def decompressed(storage, monkeypatch):
+    blocks = []
+    read_block = storage._read_block
+
+    def record(datafile, entry):
+        blocks.append(entry.get("offset", "last"))
+        return read_block(datafile, entry)
+
+    monkeypatch.setattr(storage, "_read_block", record)
+    return blocks
+
+
+def test_blocks_and_index(storage):
+    index = storage.read_index()
+    assert [entry["count"] for entry in index["blocks"]] == [4, 4]
+    assert [entry["min_date"] for entry in index["blocks"]] == ["2024-05-01", "2024-05-03"]
+    assert index["last"]["count"] == 2
+    assert [t.amount for t in storage.read_data()] == [1, 2] * 5
+    assert storage.read_totals() == (15, 0)
+
+
+def test_find_date_range_decompresses_matching_blocks(storage, decompressed):
+    found = Wallet(storage).find_transactions(
+        None, (datetime.datetime(2024, 5, 4), datetime.datetime(2024, 5, 5)), None, None, None
+    )
+    assert [row["index"] for row in found] == [6, 7, 8, 9]
+    assert decompressed == [storage.read_index()["blocks"][1]["offset"], "last"]
+
+
+def test_find_index_decompresses_its_block(storage, decompressed):
+    found = Wallet(storage).find_transactions((4, 5), None, None, None, None)
+    assert [row["date"] for row in found] == ["2024-05-03", "2024-05-03"]
+    assert len(decompressed) == 1
+
+
+def test_balance_decompresses_no_blocks(storage, decompressed):
+    assert Wallet(storage).get_balance() == (15, 0)
+    assert decompressed == []
+
+
+def test_append_touches_only_last_block(storage):
+    size = storage.file.stat().st_size
+    storage.append_data(transaction(5, 3))
+    assert storage.file.stat().st_size == size
+    assert storage.read_index()["last"]["count"] == 3
+    # Full last block is appended to the data file.
+    storage.append_data(transaction(5, 4))
+    assert storage.file.stat().st_size > size
+    assert storage.read_index()["last"] is None
+    assert storage.count_data() == 12
+
+
+def test_update_and_delete(storage):
+    wallet = Wallet(storage)
+    wallet.update_transaction(1, None, 10, None, None)
+    wallet.delete_transaction(8)
+    assert [t.amount for t in storage.read_data()] == [1, 10] + [1, 2] * 3 + [2]
+    assert storage.read_totals() == (22, 0)
+
+
+def test_replaced_blocks_are_compacted(storage):
+    for _ in range(4):
+        storage.update_data(0, transaction(1, 5))
+    current = sum(entry["length"] for entry in storage.read_index()["blocks"])
+    assert storage.file.stat().st_size <= 2 * current
+    assert [t.amount for t in storage.read_data()] == [5, 2] + [1, 2] * 4
+
+
+def test_emptied_block_is_compacted(storage, monkeypatch):
+    monkeypatch.setattr(CompressedStorage, "block_rows", 1)
+    storage.write_data([transaction(1, 1), transaction(2, 2)])
+    for amount in (3, 4):
+        storage.update_data(1, transaction(2, amount))
+    # Emptied block is the first one in the data file, before the replaced ones.
+    storage.delete_data(0)
+    assert storage.file.stat().st_size <= 2 * storage.read_index()["blocks"][0]["length"]
+    assert [t.amount for t in storage.read_data()] == [4]
+
+
+def test_index_rebuilt_after_interrupted_rewrite(storage):
+    transactions = storage.read_data()
+    last_block = storage.last_file.read_bytes()
+    storage.write_data(transactions)
+    storage.index_file.unlink()
+    # Last block file left over from before the rewrite.
+    storage.last_file.write_bytes(last_block)
+    assert [t.as_dict() for t in storage.read_data()] == [t.as_dict() for t in transactions]
+    assert not storage.last_file.exists()
+
+
+@pytest.mark.parametrize(
+    "damage",
+    [lambda index_file: index_file.unlink(), lambda index_file: index_file.write_text("{")],
+    ids=["removed", "truncated"],
+)
+def test_index_rebuilt_with_last_block(storage, damage):
+    damage(storage.index_file)
+    assert [t.amount for t in storage.read_data()] == [1, 2] * 5
+    assert storage.read_index()["last"]["count"] == 2
+
+
+def test_last_block_replaced_behind_index_is_described(storage):
+    index = storage.read_index()
+    storage.append_data(transaction(5, 3))
+    storage._save_index(index)
+    assert storage.count_data() == 11
+    assert os.path.exists(storage.last_file)
+
+
+def transaction(day, amount):
+    return Transaction(datetime.datetime(2024, 5, day), amount, "income", f"Row {amount}")
@@ -0,0 +1,83 @@
+"""
+Tests for decoding rows of transactions csv file.
+"""
+
+import datetime
+
+import pytest
+
+from personal_wallet.models.csv_decoder import CsvRowDecoder
+from personal_wallet.models.transaction_table import TransactionTable
+
+HEADER = ["date", "amount", "category", "description"]
+
+
+def decode(header, row):
+    transaction = CsvRowDecoder(header).decode(row)
+    return transaction.date, transaction.amount, transaction.category, transaction.description
+
+
+def test_decode_row():
+    assert decode(HEADER, ["2024-05-01", "1000", "income", "Salary"]) == (
+        datetime.datetime(2024, 5, 1),
+        1000,
+        "income",
+        "Salary",
+    )
+
+
+def test_reordered_header_columns():
+    header = ["category", "description", "amount", "date"]
+    assert decode(header, ["expenses", "Bought coffee", "200", "2024-05-02"]) == (
+        datetime.datetime(2024, 5, 2),
+        200,
+        "expenses",
+        "Bought coffee",
+    )
+
+
+def test_extra_header_column_is_ignored():
+    header = ["id", *HEADER]
+    assert decode(header, ["7", "2024-05-02", "200", "expenses", "Coffee"])[1:] == (
+        200,
+        "expenses",
+        "Coffee",
+    )
+
+
+def test_empty_description_kept_empty():
+    assert decode(HEADER, ["2024-05-01", "50", "income", ""])[3] == ""
+
+
+def test_row_without_description_field():
+    assert decode(HEADER, ["2024-05-01", "50", "income"])[3] is None
+
+
+@pytest.mark.parametrize("row", [["2024-05-01", "50"], ["2024-05-01"], []])
+def test_row_missing_required_fields_fails(row):
+    with pytest.raises((TypeError, ValueError)):
+        decode(HEADER, row)
+
+
+def test_header_missing_column_fails():
+    with pytest.raises(ValueError, match="doesn't match"):
+        CsvRowDecoder(["date", "amount", "category"])
+
+
+def test_dates_memoized():
+    decoder = CsvRowDecoder(HEADER)
+    first = decoder.decode(["2024-05-01", "1", "income", "a"])
+    second = decoder.decode(["2024-05-01", "2", "income", "b"])
+    assert first.date is second.date
+    assert decoder.parse_ordinal("2024-05-01") == datetime.date(2024, 5, 1).toordinal()
+
+
+def test_decode_into_table():
+    decoder = CsvRowDecoder(["amount", "date", "description", "category"])
+    table = TransactionTable()
+    decoder.decode_into(table, ["200", "2024-05-02", "", "expenses"])
+    decoder.decode_into(table, ["1000", "2024-05-01", "Salary", "income"])
+    assert [t.as_dict() for t in table] == [
+        {"date": "2024-05-02", "amount": 200, "category": "expenses", "description": ""},
+        {"date": "2024-05-01", "amount": 1000, "category": "income", "description": "Salary"},
+    ]
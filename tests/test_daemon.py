@@ -0,0 +1,128 @@
+"""
+Tests for 'serve' command and commands answered by the wallet daemon.
+"""
+
+import datetime
+import threading
+
+import pytest
+
+from personal_wallet import daemon
+from personal_wallet.cli import main
+from personal_wallet.constants import PROJECT_DIR
+from personal_wallet.models.storage import CsvStorage, encode_rows
+from personal_wallet.models.transaction import Transaction
+
+
+@pytest.fixture
+def service():
+    service = daemon.WalletService(CsvStorage(PROJECT_DIR / "tests" / "transactions.csv"))
+    path = daemon.socket_path("tests", "csv")
+    servers = []
+    ready = threading.Event()
+
+    def on_ready(server):
+        servers.append(server)
+        ready.set()
+
+    thread = threading.Thread(target=daemon.serve, args=(service, path, on_ready), daemon=True)
+    thread.start()
+    assert ready.wait(5)
+    yield service
+    servers[0].shutdown()
+    thread.join(5)
+    assert not path.exists()
+
+
+def test_commands_answered_by_daemon(cli_runner, config, service):
+    result = invoke(cli_runner, config, "add", "-d", "2024-05-03", "-a", "153", "-c", "income")
+    assert result.output == "Added transaction successfully!\n"
+    invoke(
+        cli_runner, config, "add", "-d", "2024-06-03", "-a", "257", "-c", "expenses", "-s", "Book"
+    )
+    assert len(service.wallet.transactions) == 2
+
+    result = invoke(cli_runner, config, "balance")
+    assert result.output == "Current balance: -104\nIncome: 153\nExpenses: 257\n"
+
+    result = invoke(cli_runner, config, "update", "-i", "0", "-a", "300")
+    assert result.output == "Updated transaction successfully!\n"
+    result = invoke(cli_runner, config, "find", "-d", "2024-05-01..2024-05-31", "-a", "200..400")
+    assert "300" in result.output
+    result = invoke(cli_runner, config, "find", "-s", "%oo%")
+    assert "Book" in result.output
+    assert "income" not in result.output
+    result = invoke(cli_runner, config, "report", "-g", "month", "-d", "2024-06-01..2024-06-30")
+    assert result.output.splitlines()[2].split()[:5] == ["2024-06", "1", "0", "257", "-257"]
+
+    result = invoke(cli_runner, config, "delete", "-i", "1")
+    assert result.output == "Deleted transaction successfully!\n"
+    result = invoke(cli_runner, config, "balance")
+    assert result.output == "Current balance: 300\nIncome: 300\nExpenses: 0\n"
+
+    # Changes are written through to storage.
+    assert [t.amount for t in service.storage.read_data()] == [300]
+
+
+def test_errors_from_daemon(cli_runner, config, service):
+    result = invoke(cli_runner, config, "delete", "-i", "0")
+    assert result.output == "Wallet is empty, no transactions to delete.\n"
+    invoke(cli_runner, config, "add", "-a", "153", "-c", "income")
+    result = invoke(cli_runner, config, "update", "-i", "5", "-a", "1")
+    assert result.output == "Error: Transaction with index 5 not found.\n"
+
+
+def test_daemon_reloads_changed_file(cli_runner, config, service):
+    invoke(cli_runner, config, "add", "-a", "100", "-c", "income")
+    invoke(cli_runner, config, "balance")
+    # Written around the daemon, as by another process.
+    service.storage.append_data(Transaction(datetime.datetime(2024, 5, 3), 50, "expenses", None))
+    result = invoke(cli_runner, config, "balance")
+    assert result.output == "Current balance: 50\nIncome: 100\nExpenses: 50\n"
+    assert len(service.wallet.transactions) == 2
+
+
+def test_daemon_reloads_rows_committed_with_its_own(cli_runner, config, service):
+    invoke(cli_runner, config, "add", "-a", "100", "-c", "income")
+    # Queued by another process waiting for the lock, committed along with the next add.
+    queued = [
+        Transaction(datetime.datetime(2024, 5, 3), amount, "expenses", None) for amount in (1, 2)
+    ]
+    CsvStorage(service.storage.file).queue.put(encode_rows(queued))
+    invoke(cli_runner, config, "add", "-a", "200", "-c", "income")
+    assert service.stale()
+    result = invoke(cli_runner, config, "find", "-c", "expenses")
+    assert len(result.output.splitlines()) == 4
+    assert len(service.wallet.transactions) == 4
+
+
+def test_remote_error_shown_as_command_error(cli_runner, config, monkeypatch):
+    def request(*args, **kwargs):
+        raise daemon.RemoteError("Wallet daemon closed the connection.")
+
+    monkeypatch.setattr(daemon, "request", request)
+    result = invoke(cli_runner, config, "balance")
+    assert result.exit_code == 1
+    assert result.output == "Error: Wallet daemon closed the connection.\n"
+
+
+def test_serve_refuses_second_daemon(service):
+    with pytest.raises(RuntimeError, match="already running"):
+        daemon.serve(service, daemon.socket_path("tests", "csv"))
+
+
+def test_request_without_daemon():
+    with pytest.raises(daemon.NotRunning):
+        daemon.request("tests", "csv", "balance")
+
+
+def test_commands_run_locally_on_too_long_socket_path(cli_runner, config):
+    data_path = "tests/" + "d" * 120
+    with pytest.raises(daemon.NotRunning):
+        daemon.request(data_path, "csv", "balance")
+    result = invoke(cli_runner, config, "balance", "--data-path", data_path)
+    assert result.output.startswith("Current balance: 0\n")
+
+
+def invoke(cli_runner, config, *args):
+    return cli_runner.invoke(main, [*args, "--config", config])
@@ -0,0 +1,101 @@
+"""
+Tests for 'export' command.
+"""
+
+import json
+
+import pytest
+
+from personal_wallet.cli import main
+
+TRANSACTIONS = [
+    ("2024-05-03", "153", "income", "Sold a book"),
+    ("2024-06-03", "257", "expenses", "Bought a book, a pen"),
+    ("2024-06-05", "40", "expenses", "Coffee"),
+]
+
+
+@pytest.fixture(params=["csv", "sqlite", "binary"])
+def storage(request, cli_runner, config):
+    for date, amount, category, description in TRANSACTIONS:
+        cli_runner.invoke(
+            main,
+            [
+                "add",
+                *("-d", date, "-a", amount, "-c", category, "-s", description),
+                *("--storage", request.param, "--config", config),
+            ],
+        )
+    return request.param
+
+
+def test_export_csv(cli_runner, config, storage):
+    result = export(cli_runner, config, storage)
+    assert result.exit_code == 0
+    assert result.output == (
+        "index,date,amount,category,description\n"
+        "0,2024-05-03,153,income,Sold a book\n"
+        '1,2024-06-03,257,expenses,"Bought a book, a pen"\n'
+        "2,2024-06-05,40,expenses,Coffee\n"
+    )
+
+
+def test_export_tsv_with_filters(cli_runner, config, storage):
+    result = export(cli_runner, config, storage, "-f", "tsv", "-c", "expenses", "-a", "100..300")
+    assert result.exit_code == 0
+    assert result.output == (
+        "index\tdate\tamount\tcategory\tdescription\n"
+        "1\t2024-06-03\t257\texpenses\tBought a book, a pen\n"
+    )
+
+
+def test_export_jsonl(cli_runner, config, storage):
+    result = export(cli_runner, config, storage, "--format", "jsonl", "-s", "%book%")
+    assert result.exit_code == 0
+    assert [json.loads(line) for line in result.output.splitlines()] == [
+        {
+            "index": 0,
+            "date": "2024-05-03",
+            "amount": 153,
+            "category": "income",
+            "description": "Sold a book",
+        },
+        {
+            "index": 1,
+            "date": "2024-06-03",
+            "amount": 257,
+            "category": "expenses",
+            "description": "Bought a book, a pen",
+        },
+    ]
+
+
+def test_export_nothing_found(cli_runner, config, storage):
+    result = export(cli_runner, config, storage, "-d", "2023-01-01")
+    assert result.exit_code == 0
+    assert result.output == "index,date,amount,category,description\n"
+
+
+def test_export_into_file(cli_runner, config, storage, tmp_path):
+    file = tmp_path / "slice.jsonl"
+    result = export(cli_runner, config, storage, "-f", "jsonl", "-o", str(file), "-i", "1..2")
+    assert result.exit_code == 0
+    assert result.output == "Exported 2 transactions successfully!\n"
+    assert [json.loads(line)["index"] for line in file.read_text().splitlines()] == [1, 2]
+
+
+def test_export_can_be_imported(cli_runner, config, storage):
+    exported = export(cli_runner, config, storage).output
+    result = cli_runner.invoke(
+        main, ["import", "-", "--storage", storage, "--config", config], input=exported
+    )
+    assert result.output.startswith("Imported 3 transactions successfully")
+    assert export(cli_runner, config, storage, "-i", "3..5").output.splitlines()[1:] == [
+        "3,2024-05-03,153,income,Sold a book",
+        '4,2024-06-03,257,expenses,"Bought a book, a pen"',
+        "5,2024-06-05,40,expenses,Coffee",
+    ]
+
+
+def export(cli_runner, config, storage, *args):
+    return cli_runner.invoke(main, ["export", *args, "--storage", storage, "--config", config])
@@ -155,3 +155,24 @@ def found_matching_transaction(result):
 
 def found_none(result):
     assert result.output == "\n"
+
+
+class TestFindStreaming:
+    @pytest.mark.parametrize(
+        "options",
+        [
+            [],
+            ["-i", INDEX_RANGE],
+            ["-i", WRONG_INDEX],
+            ["-d", DATE_RANGE],
+            ["-a", AMOUNT],
+            ["-c", CATEGORY],
+            ["-s", DESCRIPTION_PREFIX],
+            ["-s", WRONG_DESCRIPTION_SUFFIX],
+        ],
+    )
+    def test_streamed_as_table(self, cli_runner, config, add_transaction, options):
+        expected = cli_runner.invoke(main, ["find", *options, "--config", config])
+        result = cli_runner.invoke(main, ["find", *options, "--stream", "--config", config])
+        assert result.exit_code == 0
+        assert result.output == expected.output
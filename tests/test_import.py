@@ -0,0 +1,110 @@
+"""
+Tests for 'import' command.
+"""
+
+import datetime
+import re
+
+import pytest
+
+from personal_wallet.cli import main
+
+CSV_DATA = (
+    "date,amount,category,description\n"
+    "2024-05-03,153,income,Sold a book\n"
+    "2024-06-03,257,expenses,Bought a book\n"
+    ",40,expenses,\n"
+)
+
+JSONL_DATA = (
+    '{"date": "2024-05-03", "amount": 153, "category": "income", "description": "Sold a book"}\n'
+    "\n"
+    '{"date": "2024-06-03", "amount": "257", "category": "expenses"}\n'
+)
+
+
+@pytest.mark.parametrize("storage", ["csv", "sqlite", "binary"])
+def test_import_csv(cli_runner, config, storage):
+    result = import_transactions(cli_runner, config, ["-"], CSV_DATA, storage)
+    imported_successfully(result, 3)
+
+    result = cli_runner.invoke(main, ["find", "--storage", storage, "--config", config])
+    assert "Sold a book" in result.output
+    assert "Bought a book" in result.output
+    assert datetime.date.today().strftime("%Y-%m-%d") in result.output
+    balance_is(cli_runner, config, storage, 153, 297)
+
+
+def test_import_jsonl(cli_runner, config):
+    result = import_transactions(cli_runner, config, ["--format", "jsonl", "-"], JSONL_DATA)
+    imported_successfully(result, 2)
+    balance_is(cli_runner, config, "csv", 153, 257)
+
+
+def test_import_format_by_extension(cli_runner, config, tmp_path):
+    file = tmp_path / "bank.jsonl"
+    file.write_text(JSONL_DATA)
+    result = import_transactions(cli_runner, config, [str(file)], None)
+    imported_successfully(result, 2)
+
+
+def test_import_appends_to_existing_transactions(cli_runner, config):
+    import_transactions(cli_runner, config, ["-"], CSV_DATA)
+    result = import_transactions(cli_runner, config, ["-"], CSV_DATA)
+    imported_successfully(result, 3)
+    balance_is(cli_runner, config, "csv", 306, 594)
+
+
+@pytest.mark.parametrize(
+    "row, message",
+    [
+        ("2024-13-01,10,income,x", "Row 2: '2024-13-01' does not match the format '%Y-%m-%d'."),
+        ("2024-05-03,-10,income,x", "Row 2: -10 is not in the range 0<=x<=9223372036854775807."),
+        ("2024-05-03,10,gift,x", "Row 2: 'gift' is not one of 'income', 'expenses'."),
+        ("2024-05-03,,income,x", "Row 2: Missing amount."),
+    ],
+)
+def test_import_invalid_row(cli_runner, config, row, message):
+    data = "date,amount,category,description\n2024-05-03,153,income,Sold a book\n" + row + "\n"
+    result = import_transactions(cli_runner, config, ["-"], data)
+    assert result.exit_code == 1
+    assert result.output == f"Error: {message} No transactions were imported.\n"
+
+
+@pytest.mark.parametrize("storage", ["csv", "sqlite", "binary"])
+def test_import_with_invalid_row_adds_nothing(cli_runner, config, storage):
+    import_transactions(cli_runner, config, ["-"], CSV_DATA, storage)
+    data = CSV_DATA + "2024-05-03,10,gift,x\n" + "2024-05-04,20,income,After\n"
+    result = import_transactions(cli_runner, config, ["-"], data, storage)
+    assert result.exit_code == 1
+    assert "Row 4:" in result.output
+    balance_is(cli_runner, config, storage, 153, 297)
+
+
+def test_import_invalid_json(cli_runner, config):
+    result = import_transactions(cli_runner, config, ["-f", "jsonl", "-"], "[1, 2]\n")
+    assert result.exit_code == 1
+    assert result.output == (
+        "Error: Row 1: Expected an object with transaction fields. "
+        "No transactions were imported.\n"
+    )
+
+
+def import_transactions(cli_runner, config, args, data, storage="csv"):
+    return cli_runner.invoke(
+        main, ["import", *args, "--storage", storage, "--config", config], input=data
+    )
+
+
+def imported_successfully(result, count):
+    assert result.exit_code == 0
+    assert re.fullmatch(
+        rf"Imported {count} transactions successfully in \d+\.\d\d s( \(\d+ rows/s\))?\.\n",
+        result.output,
+    )
+
+
+def balance_is(cli_runner, config, storage, income, expenses):
+    result = cli_runner.invoke(main, ["balance", "--storage", storage, "--config", config])
+    assert f"Income: {income}\n" in result.output
+    assert f"Expenses: {expenses}\n" in result.output
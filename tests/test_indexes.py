@@ -0,0 +1,130 @@
+"""
+Tests for wallet indexes staying correct while a wallet is changed.
+"""
+
+import datetime
+import random
+
+import pytest
+
+from personal_wallet.cli_types import STRING_OR_PATTERN
+from personal_wallet.models.storage import CsvStorage
+from personal_wallet.models.transaction import Transaction
+from personal_wallet.models.wallet import Wallet
+
+
+@pytest.fixture
+def wallet(tmp_path):
+    wallet = Wallet(CsvStorage(tmp_path / "transactions.csv"))
+    for _ in range(50):
+        wallet.add_transaction(random_transaction())
+    return wallet
+
+
+DAY = datetime.datetime(2024, 5, 1)
+DATES = [DAY + datetime.timedelta(days=i) for i in range(10)]
+
+
+@pytest.mark.parametrize("date", [DATES[3], (DATES[2], DATES[5]), (DATES[9], DATES[9])])
+def test_find_by_date_after_changes(wallet, date):
+    for _ in range(30):
+        wallet.find_transactions(None, date, None, None, None)
+        change_wallet(wallet)
+        found_same_as_scan(wallet, date=date)
+
+
+@pytest.mark.parametrize("index", [None, 5, (10, 20)])
+def test_find_by_date_and_index(wallet, index):
+    found_same_as_scan(wallet, index=index, date=(DATES[2], DATES[7]))
+
+
+@pytest.mark.parametrize("amount", [500, (100, 300), (900, 999)])
+def test_find_by_amount_after_changes(wallet, amount):
+    for _ in range(30):
+        wallet.find_transactions(None, None, amount, None, None)
+        change_wallet(wallet)
+        found_same_as_scan(wallet, amount=amount)
+
+
+@pytest.mark.parametrize("category", [None, "expenses"])
+def test_find_by_date_and_amount(wallet, category):
+    for _ in range(30):
+        found_same_as_scan(wallet, date=(DATES[1], DATES[6]), amount=(0, 600), category=category)
+        change_wallet(wallet)
+
+
+DESCRIPTION_QUERIES = ["Salary", "Bo%", "%ok", "%ght a%", "%a%", "B%k", "%.%"]
+
+
+@pytest.mark.parametrize("description", DESCRIPTION_QUERIES)
+def test_find_by_description_after_changes(wallet, description):
+    description = STRING_OR_PATTERN.convert(description, None, None)
+    for _ in range(30):
+        wallet.find_transactions(None, None, None, None, description)
+        change_wallet(wallet)
+        found_same_as_scan(wallet, description=description)
+
+
+@pytest.mark.parametrize("description", DESCRIPTION_QUERIES)
+def test_persisted_description_index(wallet, description):
+    description = STRING_OR_PATTERN.convert(description, None, None)
+    wallet.find_transactions(None, None, None, None, description)
+    assert wallet.description_index_file.exists()
+    for _ in range(30):
+        # Every change is made by a new wallet, as separate commands do.
+        change_wallet(Wallet(wallet.storage))
+        found_same_as_scan(Wallet(wallet.storage), description=description)
+
+
+def test_description_index_after_external_change(wallet):
+    description = STRING_OR_PATTERN.convert("%coffee", None, None)
+    wallet.find_transactions(None, None, None, None, description)
+    with open(wallet.storage.file, "a", encoding="utf-8") as file:
+        file.write("2024-05-01,70,expenses,Bought coffee\n")
+    found_same_as_scan(Wallet(wallet.storage), description=description)
+
+
+rng = random.Random(0)
+
+
+def random_transaction():
+    return Transaction(
+        date=rng.choice(DATES),
+        amount=rng.randrange(1000),
+        category=rng.choice(["income", "expenses"]),
+        description=rng.choice(["Salary", "Bought coffee", "Bought a book", "Book", "A.B"]),
+    )
+
+
+def change_wallet(wallet):
+    action = rng.randrange(3)
+    if action == 0:
+        wallet.add_transaction(random_transaction())
+    elif action == 1:
+        wallet.update_transaction(
+            rng.randrange(len(wallet)),
+            rng.choice(DATES),
+            rng.randrange(1000),
+            None,
+            random_transaction().description,
+        )
+    else:
+        wallet.delete_transaction(rng.randrange(len(wallet)))
+
+
+def found_same_as_scan(wallet, index=None, date=None, amount=None, category=None, description=None):
+    found = wallet.find_transactions(index, date, amount, category, description)
+    scanned = Wallet(wallet.storage, stream=True).find_transactions(
+        index, date, amount, category, description
+    )
+    assert found == scanned
+
+
+def test_delete_keeps_persisted_description_index(wallet):
+    description = STRING_OR_PATTERN.convert("%ook", None, None)
+    wallet.find_transactions(None, None, None, None, description)
+    Wallet(wallet.storage).delete_transaction(3)
+    assert wallet.description_index_file.journal_file.exists()
+    deleted = Wallet(wallet.storage)
+    found_same_as_scan(deleted, description=description)
+    assert deleted.description_index.rows == len(deleted)
@@ -0,0 +1,148 @@
+"""
+Tests for storage locking and group commit of concurrent appends.
+"""
+
+import datetime
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from personal_wallet.constants import PROJECT_DIR
+from personal_wallet.models.file_lock import FileLock
+from personal_wallet.models.sqlite_storage import SqliteStorage
+from personal_wallet.models.storage import CsvStorage, encode_rows
+from personal_wallet.models.transaction import Transaction
+from personal_wallet.models.wallet import Wallet
+
+
+@pytest.fixture
+def storage():
+    storage = CsvStorage(PROJECT_DIR / "tests" / "transactions.csv")
+    storage.append_data(transaction(0))
+    return storage
+
+
+def test_lock_excludes_other_holders(storage):
+    other = FileLock(storage.lock.file)
+    with storage.lock:
+        assert storage.lock.held
+        # Reentrant within a thread.
+        assert storage.lock.acquire(blocking=False)
+        storage.lock.release()
+        assert not other.acquire(blocking=False)
+    assert not storage.lock.held
+    assert other.acquire(blocking=False)
+    other.release()
+
+
+def test_queued_appends_committed_together(storage, monkeypatch):
+    syncs = []
+    fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: syncs.append(fd) or fsync(fd))
+    holder = FileLock(storage.lock.file)
+    holder.acquire()
+    threads = [
+        threading.Thread(target=CsvStorage(storage.file).append_data, args=(transaction(i),))
+        for i in range(1, 4)
+    ]
+    for thread in threads:
+        thread.start()
+    wait_for(lambda: len(list(storage.queue.directory.glob("*.row"))) == 3)
+    holder.release()
+    for thread in threads:
+        thread.join(5)
+
+    assert sorted(t.amount for t in storage.read_data()) == [0, 1, 2, 3]
+    # Record of the batch and the batch itself.
+    assert len(syncs) == 2
+    assert not storage.queue.directory.exists()
+    assert Wallet(storage).get_balance() == (6, 0)
+
+
+def test_interrupted_commit_is_cut_off_and_redone(storage):
+    queue = storage.queue
+    files = [queue.put(encode_rows([transaction(1)])), queue.put(encode_rows([transaction(2)]))]
+    start = storage.file.stat().st_size
+    queue.begin(files, storage.file.stat().st_ino, start, start + 100)
+    with open(storage.file, "ab") as csvfile:
+        csvfile.write(b"2024-01-01,1,inc")
+
+    storage.append_data(transaction(3))
+    assert [t.amount for t in storage.read_data()] == [0, 1, 2, 3]
+    assert not queue.directory.exists()
+
+
+def test_complete_commit_is_not_repeated(storage):
+    queue = storage.queue
+    data = encode_rows([transaction(1)])
+    files = [queue.put(data)]
+    start = storage.file.stat().st_size
+    queue.begin(files, storage.file.stat().st_ino, start, start + len(data))
+    with open(storage.file, "ab") as csvfile:
+        csvfile.write(data)
+
+    storage.append_data(transaction(2))
+    assert [t.amount for t in storage.read_data()] == [0, 1, 2]
+    assert not queue.directory.exists()
+
+
+def test_appends_are_journaled(storage):
+    wallet = Wallet(storage)
+    wallet.find_transactions(None, None, None, None, "Row 0")
+    wallet.add_transaction(transaction(1))
+    index = wallet.description_index_file.load(storage.identity())
+    assert index is not None
+    assert index.lookup("Row 1") == [1]
+
+
+def add_to_sqlite(file, amounts):
+    storage = SqliteStorage(file)
+    for amount in amounts:
+        storage.append_data(transaction(amount))
+
+
+def test_concurrent_sqlite_appends_get_own_positions():
+    file = PROJECT_DIR / "tests" / SqliteStorage.filename
+    SqliteStorage(file).write_data([])
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=add_to_sqlite, args=(file, range(i * 50, (i + 1) * 50)))
+        for i in range(4)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(30)
+
+    storage = SqliteStorage(file)
+    assert storage.count_data() == 200
+    # Every position from 0 to 199 holds a transaction of its own.
+    assert sorted(storage.get_data(i).amount for i in range(200)) == list(range(200))
+
+
+def test_sqlite_positions_shared_by_earlier_version_are_renumbered():
+    file = PROJECT_DIR / "tests" / SqliteStorage.filename
+    SqliteStorage(file).write_data([transaction(i) for i in range(3)])
+    with sqlite3.connect(file) as connection:
+        connection.execute("DROP INDEX ux_transactions_position")
+        connection.execute("UPDATE transactions SET position = 0 WHERE amount = 1")
+    storage = SqliteStorage(file)
+    assert [t.amount for t in storage.read_data()] == [0, 1, 2]
+    assert storage.count_data() == 3
+    storage.delete_data(0)
+    assert [storage.get_data(i).amount for i in range(2)] == [1, 2]
+
+
+def transaction(amount):
+    return Transaction(datetime.datetime(2024, 5, 1), amount, "income", f"Row {amount}")
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
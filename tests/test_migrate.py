@@ -0,0 +1,91 @@
+"""
+Tests for 'migrate' command.
+"""
+
+from personal_wallet.cli import main
+
+
+def test_migrate_csv_to_sqlite(cli_runner, config):
+    add_transaction(cli_runner, config)
+    result = migrate(cli_runner, config, "csv", "sqlite")
+    migrated_successfully(result, 1)
+    transaction_is_found(cli_runner, config, "sqlite")
+
+
+def test_migrate_csv_to_binary(cli_runner, config):
+    add_transaction(cli_runner, config)
+    result = migrate(cli_runner, config, "csv", "binary")
+    migrated_successfully(result, 1)
+    transaction_is_found(cli_runner, config, "binary")
+
+
+def test_migrate_sqlite_to_csv(cli_runner, config):
+    add_transaction(cli_runner, config, "sqlite")
+    result = migrate(cli_runner, config, "sqlite", "csv")
+    migrated_successfully(result, 1)
+    transaction_is_found(cli_runner, config, "csv")
+
+
+def test_migrate_empty_wallet(cli_runner, config):
+    result = migrate(cli_runner, config, "csv", "sqlite")
+    migrated_successfully(result, 0)
+
+
+def test_migrate_into_non_empty_storage(cli_runner, config):
+    add_transaction(cli_runner, config)
+    add_transaction(cli_runner, config, "sqlite")
+    result = migrate(cli_runner, config, "csv", "sqlite")
+    assert result.exit_code == 0
+    assert result.output == "Error: Target storage already contains transactions.\n"
+
+
+def test_migrate_into_same_storage(cli_runner, config):
+    result = migrate(cli_runner, config, "csv", "csv")
+    assert result.exit_code == 0
+    assert result.output == "Error: Source and target storage are the same.\n"
+
+
+DATE = "2024-06-03"
+AMOUNT = "257"
+CATEGORY = "expenses"
+DESCRIPTION = "Bought a book"
+
+
+def add_transaction(cli_runner, config, storage="csv"):
+    cli_runner.invoke(
+        main,
+        [
+            "add",
+            "-d",
+            DATE,
+            "-a",
+            AMOUNT,
+            "-c",
+            CATEGORY,
+            "-s",
+            DESCRIPTION,
+            "--storage",
+            storage,
+            "--config",
+            config,
+        ],
+    )
+
+
+def migrate(cli_runner, config, source, target):
+    return cli_runner.invoke(
+        main, ["migrate", "--storage", source, "--to", target, "--config", config]
+    )
+
+
+def migrated_successfully(result, count):
+    assert result.exit_code == 0
+    assert result.output == f"Migrated {count} transactions successfully!\n"
+
+
+def transaction_is_found(cli_runner, config, storage):
+    result = cli_runner.invoke(main, ["find", "--storage", storage, "--config", config])
+    assert DATE in result.output
+    assert AMOUNT in result.output
+    assert CATEGORY in result.output
+    assert DESCRIPTION in result.output
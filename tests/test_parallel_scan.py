@@ -0,0 +1,103 @@
+"""
+Tests for parallel scan of csv file.
+"""
+
+import datetime
+import random
+import re
+
+import pytest
+
+from personal_wallet.cli import main
+from personal_wallet.constants import PROJECT_DIR
+from personal_wallet.models import parallel_scan
+from personal_wallet.models.storage import CsvStorage
+from personal_wallet.models.transaction import Transaction
+from personal_wallet.models.wallet import Wallet
+
+DESCRIPTIONS = ["Salary", 'Bought "The Book"', "Line\nbreak", 'Quoted "line\nbreak"', "", "a, b"]
+
+QUERIES = [
+    (None, None, None, None, None),
+    (None, (datetime.datetime(2024, 1, 5), datetime.datetime(2024, 1, 20)), None, "income", None),
+    ((50, 400), None, (10, 50), None, re.compile(r".*?break")),
+    (17, None, None, None, None),
+    (None, None, None, None, "Line\nbreak"),
+]
+
+
+@pytest.fixture
+def csv_file(tmp_path, monkeypatch):
+    # Small chunks, so a few hundred rows are split between processes.
+    monkeypatch.setattr(parallel_scan, "CHUNK_SIZE", 512)
+    rng = random.Random(0)
+    CsvStorage(tmp_path / "transactions.csv").extend_data(
+        Transaction(
+            datetime.datetime(2024, 1, 1) + datetime.timedelta(days=rng.randrange(60)),
+            rng.randrange(100),
+            rng.choice(["income", "expenses"]),
+            rng.choice(DESCRIPTIONS),
+        )
+        for _ in range(500)
+    )
+    return tmp_path / "transactions.csv"
+
+
+def test_chunks_end_at_rows(csv_file):
+    chunks = parallel_scan.CsvChunks(csv_file, workers=2)
+    assert len(chunks.ranges) > 10
+    data = csv_file.read_bytes()
+    for start, end in chunks.ranges:
+        assert data[end - 1 : end] == b"\n"
+        assert data[:end].count(b'"') % 2 == 0
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_parallel_find_matches_serial(csv_file, query):
+    serial = Wallet(CsvStorage(csv_file)).find_transactions(*query)
+    parallel = Wallet(CsvStorage(csv_file, workers=2)).find_transactions(*query)
+    assert parallel == serial
+
+
+def test_parallel_balance_matches_serial(csv_file):
+    storage = CsvStorage(csv_file)
+    expected = Wallet(storage, stream=True).get_balance()
+    storage.totals_file.unlink()
+    assert Wallet(CsvStorage(csv_file, workers=2)).get_balance() == expected
+    assert storage._load_totals()["count"] == 500
+
+
+def test_logged_changes_are_scanned_serially(csv_file):
+    storage = CsvStorage(csv_file, workers=2)
+    Wallet(storage).delete_transaction(0)
+    assert storage.scan_data(None, None, None, None, None) is None
+    assert Wallet(storage).find_transactions(*QUERIES[0]) == Wallet(
+        CsvStorage(csv_file)
+    ).find_transactions(*QUERIES[0])
+
+
+def test_workers_option(cli_runner, config):
+    cli_runner.invoke(main, ["add", "-a", "10", "-c", "income", "--config", config])
+    (PROJECT_DIR / "tests" / "transactions.totals").unlink()
+    result = cli_runner.invoke(main, ["balance", "--workers", "2", "--config", config])
+    assert result.output.startswith("Current balance: 10\n")
+    result = cli_runner.invoke(main, ["find", "-w", "0", "--config", config])
+    assert "income" in result.output
+
+
+def test_workers_config(cli_runner, tmp_path, monkeypatch):
+    config = tmp_path / "config.ini"
+    config.write_text(f"[options]\ndata_path={tmp_path}\nworkers=2\n")
+    cli_runner.invoke(main, ["add", "-a", "10", "-c", "income", "--config", config])
+
+    workers = []
+    scan_data = CsvStorage.scan_data
+
+    def spy(storage, *args):
+        workers.append(storage.workers)
+        return scan_data(storage, *args)
+
+    monkeypatch.setattr(CsvStorage, "scan_data", spy)
+    result = cli_runner.invoke(main, ["find", "--config", config])
+    assert "income" in result.output
+    assert workers == [2]
@@ -0,0 +1,111 @@
+"""
+Tests for storage partitioned by month.
+"""
+
+import datetime
+import json
+
+import pytest
+
+from personal_wallet.constants import PROJECT_DIR
+from personal_wallet.models.partitioned_storage import PartitionedStorage
+from personal_wallet.models.transaction import Transaction
+from personal_wallet.models.wallet import Wallet
+
+
+@pytest.fixture
+def storage():
+    storage = PartitionedStorage(PROJECT_DIR / "tests" / PartitionedStorage.filename)
+    storage.extend_data(
+        [
+            transaction("2024-05-01", 1000, "income"),
+            transaction("2024-06-03", 300, "expenses"),
+            transaction("2024-05-09", 200, "expenses"),
+            transaction("2024-07-01", 50, "expenses"),
+        ]
+    )
+    return storage
+
+
+@pytest.fixture
+def opened(storage, monkeypatch):
+    months = []
+    iter_partition = storage._iter_partition
+
+    def record(month):
+        months.append(month)
+        return iter_partition(month)
+
+    monkeypatch.setattr(storage, "_iter_partition", record)
+    return months
+
+
+def test_partitions_and_manifest(storage):
+    assert sorted(path.name for path in storage.directory.glob("*.csv")) == [
+        "2024-05.csv",
+        "2024-06.csv",
+        "2024-07.csv",
+    ]
+    manifest = json.loads(storage.file.read_text(encoding="utf-8"))["partitions"]
+    assert manifest["2024-05"]["count"] == 2
+    assert manifest["2024-05"]["income"] == 1000
+    assert manifest["2024-05"]["expenses"] == 200
+    # Numbered month by month.
+    assert [t.amount for t in storage.read_data()] == [1000, 200, 300, 50]
+
+
+def test_find_date_range_reads_matching_partitions(storage, opened):
+    found = Wallet(storage).find_transactions(
+        None, (datetime.datetime(2024, 5, 1), datetime.datetime(2024, 5, 9)), None, None, None
+    )
+    assert [row["index"] for row in found] == [0, 1]
+    assert opened == ["2024-05"]
+
+
+def test_find_index_reads_its_partition(storage, opened):
+    found = Wallet(storage).find_transactions(2, None, None, None, None)
+    assert [row["amount"] for row in found] == [300]
+    assert opened == ["2024-06"]
+
+
+def test_balance_reads_no_partitions(storage, opened):
+    assert Wallet(storage).get_balance() == (1000, 550)
+    assert opened == []
+
+
+def test_update_rewrites_only_its_partition(storage):
+    inodes = {path.name: path.stat().st_ino for path in storage.directory.glob("*.csv")}
+    Wallet(storage).update_transaction(2, None, 350, None, None)
+    assert storage.get_data(2).amount == 350
+    assert storage.read_totals() == (1000, 600)
+    changed = [
+        path.name
+        for path in storage.directory.glob("*.csv")
+        if path.stat().st_ino != inodes[path.name]
+    ]
+    assert changed == ["2024-06.csv"]
+
+
+def test_update_moves_transaction_to_its_month(storage):
+    Wallet(storage).update_transaction(2, datetime.datetime(2024, 5, 20), None, None, None)
+    assert [t.amount for t in storage.read_data()] == [1000, 200, 300, 50]
+    assert not storage.partition_file("2024-06").exists()
+    assert list(storage.read_manifest()) == ["2024-05", "2024-07"]
+
+
+def test_delete_removes_empty_partition(storage):
+    Wallet(storage).delete_transaction(3)
+    assert storage.count_data() == 3
+    assert not storage.partition_file("2024-07").exists()
+    assert storage.read_totals() == (1000, 500)
+
+
+def test_partition_changed_behind_manifest_is_recounted(storage):
+    with open(storage.partition_file("2024-07"), "a", encoding="utf-8", newline="") as csvfile:
+        csvfile.write("2024-07-02,25,income,\r\n")
+    assert storage.read_totals() == (1025, 550)
+    assert storage.count_data() == 5
+
+
+def transaction(date, amount, category):
+    return Transaction(datetime.datetime.fromisoformat(date), amount, category, f"Row {amount}")
@@ -0,0 +1,109 @@
+"""
+Tests for compiled filters of transactions.
+"""
+
+import datetime
+import itertools
+import re
+
+import pytest
+
+from personal_wallet.models.query import Query
+from personal_wallet.models.transaction import Transaction
+from personal_wallet.models.transaction_table import TransactionTable
+
+TRANSACTIONS = [
+    Transaction(datetime.datetime(2024, 5, 1), 1000, "income", "Salary"),
+    Transaction(datetime.datetime(2024, 5, 2), 200, "expenses", "Bought coffee"),
+    Transaction(datetime.datetime(2024, 5, 6), 400, "expenses", "Bought a book"),
+    Transaction(datetime.datetime(2024, 5, 6), 100, "expenses", "Coffee. Bought"),
+    Transaction(datetime.datetime(2024, 6, 1), 50, "income", None),
+]
+
+DATES = [
+    None,
+    datetime.datetime(2024, 5, 6),
+    (datetime.datetime(2024, 5, 2), datetime.datetime(2024, 5, 31)),
+]
+AMOUNTS = [None, 200, (100, 400)]
+CATEGORIES = [None, "expenses", "savings"]
+DESCRIPTIONS = [
+    None,
+    "Salary",
+    re.compile("^Bought.*?"),
+    re.compile(".*?coffee$"),
+    re.compile(".*?o"),
+    re.compile(".*?. "),
+    re.compile("^Bou.*?ght.*?"),
+]
+
+FILTERS = list(itertools.product(DATES, AMOUNTS, CATEGORIES, DESCRIPTIONS))
+
+
+def matches(transaction, date, amount, category, description):
+    """Return whether transaction matches the filters, checked one by one."""
+    date_from, date_to = date if isinstance(date, tuple) else (date, date)
+    amount_from, amount_to = amount if isinstance(amount, tuple) else (amount, amount)
+    return (
+        (date is None or date_from <= transaction.date <= date_to)
+        and (amount is None or amount_from <= transaction.amount <= amount_to)
+        and (category is None or transaction.category == category)
+        and (
+            description is None
+            or isinstance(description, str)
+            and transaction.description == description
+            or isinstance(description, re.Pattern)
+            and description.search(transaction.description or "") is not None
+        )
+    )
+
+
+def test_predicate_matches_as_transactions():
+    for filters in FILTERS:
+        predicate = Query(*filters).predicate()
+        assert [predicate(t) for t in TRANSACTIONS] == [matches(t, *filters) for t in TRANSACTIONS]
+
+
+def test_row_predicate_matches_as_transactions():
+    table = TransactionTable()
+    table.extend(TRANSACTIONS)
+    for filters in FILTERS:
+        predicate = Query(*filters).row_predicate(table)
+        assert [predicate(i) for i in range(len(table))] == [
+            matches(t, *filters) for t in TRANSACTIONS
+        ]
+
+
+def test_checks_ordered_by_rank():
+    query = Query(
+        (datetime.datetime(2024, 5, 1), datetime.datetime(2024, 5, 31)),
+        200,
+        "expenses",
+        re.compile(".*?coffee"),
+    )
+    assert [(field, kind) for _, field, kind, _ in query.checks] == [
+        ("amount", "equal"),
+        ("date", "range"),
+        ("category", "equal"),
+        ("description", "substring"),
+    ]
+
+
+@pytest.mark.parametrize(
+    "pattern, kind",
+    [
+        ("^Bought.*?", "prefix"),
+        (".*?coffee$", "suffix"),
+        (".*?coffee", "substring"),
+        (".*?c.ffee", "regex"),
+        ("^Bou.*?ght.*?", "regex"),
+    ],
+)
+def test_patterns_of_plain_strings_use_string_methods(pattern, kind):
+    [(_, _, check, _)] = Query(None, None, None, re.compile(pattern)).checks
+    assert check == kind
+
+
+def test_no_filters_match_everything():
+    assert Query(None, None, None, None).checks == []
+    assert all(map(Query(None, None, None, None).predicate(), TRANSACTIONS))
@@ -0,0 +1,145 @@
+"""
+Tests for 'report' command.
+"""
+
+import datetime
+
+import pytest
+
+from personal_wallet.cli import main
+from personal_wallet.models.aggregation import aggregate
+from personal_wallet.models.transaction import Transaction
+from personal_wallet.models.transaction_table import TransactionTable
+
+TRANSACTIONS = [
+    ("2024-04-30", 1000, "income", "Salary"),
+    ("2024-05-01", 200, "expenses", "Bought coffee"),
+    ("2024-05-06", 400, "expenses", "Bought a book"),
+    ("2024-05-31", 100, "expenses", "Bought coffee"),
+    ("2025-01-01", 50, "income", None),
+]
+
+
+@pytest.fixture
+def table():
+    table = TransactionTable()
+    for date, amount, category, description in TRANSACTIONS:
+        table.append(
+            Transaction(datetime.datetime.fromisoformat(date), amount, category, description)
+        )
+    return table
+
+
+def test_group_by_month(table):
+    assert aggregate(table, ["month"]) == [
+        {
+            "month": "2024-04",
+            "count": 1,
+            "income": 1000,
+            "expenses": 0,
+            "balance": 1000,
+            "average": 1000,
+            "min": 1000,
+            "max": 1000,
+        },
+        {
+            "month": "2024-05",
+            "count": 3,
+            "income": 0,
+            "expenses": 700,
+            "balance": -700,
+            "average": 233.33,
+            "min": 100,
+            "max": 400,
+        },
+        {
+            "month": "2025-01",
+            "count": 1,
+            "income": 50,
+            "expenses": 0,
+            "balance": 50,
+            "average": 50,
+            "min": 50,
+            "max": 50,
+        },
+    ]
+
+
+@pytest.mark.parametrize(
+    "group_by, groups, counts",
+    [
+        (["year"], [("2024",), ("2025",)], [4, 1]),
+        (["week"], [("2024-W18",), ("2024-W19",), ("2024-W22",), ("2025-W01",)], [2, 1, 1, 1]),
+        (["category"], [("expenses",), ("income",)], [3, 2]),
+        (
+            ["description"],
+            [("",), ("Bought a book",), ("Bought coffee",), ("Salary",)],
+            [1, 1, 2, 1],
+        ),
+        (
+            ["year", "category"],
+            [("2024", "expenses"), ("2024", "income"), ("2025", "income")],
+            [3, 1, 1],
+        ),
+    ],
+)
+def test_group_by(table, group_by, groups, counts):
+    rows = aggregate(table, group_by)
+    assert [tuple(row[grouping] for grouping in group_by) for row in rows] == groups
+    assert [row["count"] for row in rows] == counts
+
+
+def test_combinations_found_in_table(table, monkeypatch):
+    monkeypatch.setattr("personal_wallet.models.aggregation.MAX_COMBINED_GROUPS", 1)
+    rows = aggregate(table, ["month", "description"])
+    assert [(row["month"], row["description"], row["count"]) for row in rows] == [
+        ("2024-04", "Salary", 1),
+        ("2024-05", "Bought a book", 1),
+        ("2024-05", "Bought coffee", 2),
+        ("2025-01", "", 1),
+    ]
+
+
+def test_filter_by_date_and_category(table):
+    date = (datetime.datetime(2024, 5, 1), datetime.datetime(2024, 5, 31))
+    rows = aggregate(table, ["description"], date, "expenses")
+    assert [(row["description"], row["expenses"]) for row in rows] == [
+        ("Bought a book", 400),
+        ("Bought coffee", 300),
+    ]
+    assert aggregate(table, ["month"], None, "income")[0]["income"] == 1000
+    assert aggregate(TransactionTable(), ["month"]) == []
+
+
+@pytest.mark.parametrize("storage", ["csv", "sqlite"])
+def test_report_command(cli_runner, config, storage):
+    for date, amount, category, description in TRANSACTIONS:
+        options = ["-d", date, "-a", str(amount), "-c", category]
+        if description is not None:
+            options += ["-s", description]
+        cli_runner.invoke(main, ["add", *options, "--storage", storage, "--config", config])
+
+    result = cli_runner.invoke(
+        main, ["report", "-g", "year", "-g", "category", "--storage", storage, "--config", config]
+    )
+    assert result.exit_code == 0
+    lines = result.output.splitlines()
+    assert lines[0].split() == [
+        "year",
+        "category",
+        "count",
+        "income",
+        "expenses",
+        "balance",
+        "average",
+        "min",
+        "max",
+    ]
+    assert lines[2].split() == ["2024", "expenses", "3", "0", "700", "-700", "233.33", "100", "400"]
+    assert len(lines) == 5
+
+
+def test_report_requires_grouping(cli_runner, config):
+    result = cli_runner.invoke(main, ["report", "--config", config])
+    assert result.exit_code == 2
+    assert "Missing option '-g' / '--group-by'" in result.output
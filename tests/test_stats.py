@@ -0,0 +1,68 @@
+"""
+Tests for '--stats' and '--profile' options.
+"""
+
+import json
+import pstats
+
+from personal_wallet import stats
+from personal_wallet.cli import main
+
+
+def test_stats_text(cli_runner, config):
+    add_transaction(cli_runner, config)
+    result = cli_runner.invoke(main, ["--stats", "find", "-c", "income", "--config", config])
+    assert result.exit_code == 0
+    assert "Sold a book" in result.stdout
+    lines = result.stderr.splitlines()
+    assert lines[0].split()[:3] == ["phase", "wall", "s"]
+    phases = [line.split()[0] for line in lines[1:]]
+    assert phases == ["configure", "filter", "read", "render", "total"]
+    assert lines[2].split()[4] == "1"  # filter matched
+    assert lines[3].split()[3] == "1"  # read rows
+    assert stats.active is None
+
+
+def test_stats_json(cli_runner, config):
+    add_transaction(cli_runner, config)
+    result = cli_runner.invoke(
+        main, ["--stats", "--stats-format", "json", "find", "--stream", "--config", config]
+    )
+    assert result.exit_code == 0
+    report = json.loads(result.stderr)
+    assert [phase["name"] for phase in report["phases"]] == ["configure", "stream"]
+    assert report["phases"][1]["rows_matched"] == 1
+    assert report["total"]["wall"] >= report["phases"][1]["wall"] > 0
+    assert report["total"]["cpu"] >= 0
+
+
+def test_stats_write_phases(cli_runner, config):
+    add_transaction(cli_runner, config)
+    result = cli_runner.invoke(
+        main,
+        ["--stats", "--stats-format", "json", "update", "-i", "0", "-a", "1", "--config", config],
+    )
+    assert [phase["name"] for phase in json.loads(result.stderr)["phases"]] == [
+        "configure",
+        "read",
+        "write",
+    ]
+
+
+def test_no_stats_by_default(cli_runner, config):
+    result = add_transaction(cli_runner, config)
+    assert result.stderr == ""
+
+
+def test_profile(cli_runner, config, tmp_path):
+    profile = tmp_path / "balance.prof"
+    result = cli_runner.invoke(main, ["--profile", str(profile), "balance", "--config", config])
+    assert result.exit_code == 0
+    functions = {function for _, _, function in pstats.Stats(str(profile)).stats}
+    assert "get_balance" in functions
+
+
+def add_transaction(cli_runner, config):
+    return cli_runner.invoke(
+        main, ["add", "-a", "153", "-c", "income", "-s", "Sold a book", "--config", config]
+    )
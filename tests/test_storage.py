@@ -0,0 +1,159 @@
+"""
+Tests for commands running on indexed storage backends.
+"""
+
+import datetime
+import os
+
+import pytest
+
+from personal_wallet.cli import main
+from personal_wallet.constants import PROJECT_DIR
+from personal_wallet.models.binary_storage import BinaryStorage
+from personal_wallet.models.transaction import Transaction
+
+
+def test_balance(cli_runner, config, invoke, add_transactions):
+    result = invoke(cli_runner, config, "balance")
+    assert result.exit_code == 0
+    assert result.output == "Current balance: 400\nIncome: 1000\nExpenses: 600\n"
+
+
+@pytest.mark.parametrize(
+    "options, found",
+    [
+        ([], [0, 1, 2]),
+        (["-i", "1"], [1]),
+        (["-i", "1..5"], [1, 2]),
+        (["-d", "2024-05-02"], [1]),
+        (["-d", "2024-05-02..2024-05-03"], [1, 2]),
+        (["-a", "1000"], [0]),
+        (["-a", "100..500"], [1, 2]),
+        (["-c", "expenses"], [1, 2]),
+        (["-s", "Bought coffee"], [1]),
+        (["-s", "Bought%"], [1, 2]),
+        (["-s", "%book"], [2]),
+        (["-s", "%ala%"], [0]),
+        (["-c", "income", "-a", "100..500"], []),
+    ],
+)
+def test_find(cli_runner, config, invoke, add_transactions, options, found):
+    result = invoke(cli_runner, config, "find", *options)
+    assert result.exit_code == 0
+    for i, description in enumerate(DESCRIPTIONS):
+        assert (description in result.output) == (i in found)
+
+
+def test_update(cli_runner, config, invoke, add_transactions):
+    result = invoke(cli_runner, config, "update", "-i", "1", "-a", "50", "-s", "Bought tea")
+    assert result.output == "Updated transaction successfully!\n"
+    result = invoke(cli_runner, config, "find", "-i", "1")
+    assert "Bought tea" in result.output
+    assert "50" in result.output
+
+
+def test_update_missing_index(cli_runner, config, invoke, add_transactions):
+    result = invoke(cli_runner, config, "update", "-i", "3", "-a", "50")
+    assert result.output == "Error: Transaction with index 3 not found.\n"
+
+
+def test_delete_shifts_indexes(cli_runner, config, invoke, add_transactions):
+    result = invoke(cli_runner, config, "delete", "-i", "0")
+    assert result.output == "Deleted transaction successfully!\n"
+    result = invoke(cli_runner, config, "find", "-i", "0")
+    assert DESCRIPTIONS[1] in result.output
+    result = invoke(cli_runner, config, "find", "-i", "2")
+    assert result.output == "\n"
+
+
+def test_delete_on_empty_wallet(cli_runner, config, invoke):
+    result = invoke(cli_runner, config, "delete", "-i", "0")
+    assert result.output == "Wallet is empty, no transactions to delete.\n"
+
+
+@pytest.mark.parametrize("storage", ["binary"])
+def test_binary_delete_replaces_records_file(cli_runner, config, invoke, add_transactions):
+    records_file = PROJECT_DIR / "tests" / BinaryStorage.filename
+    inode = records_file.stat().st_ino
+    invoke(cli_runner, config, "delete", "-i", "1")
+    assert records_file.stat().st_ino != inode
+    assert not records_file.with_suffix(".bin.tmp").exists()
+    result = invoke(cli_runner, config, "find")
+    assert [line.split()[0] for line in result.output.splitlines()[2:]] == ["0", "1"]
+    assert DESCRIPTIONS[1] not in result.output
+    assert DESCRIPTIONS[2] in result.output
+
+
+def test_binary_append_is_synced(monkeypatch):
+    storage = BinaryStorage(PROJECT_DIR / "tests" / BinaryStorage.filename)
+    storage.write_data([])
+    synced = []
+    fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: synced.append(fd) or fsync(fd))
+    storage.append_data(Transaction(datetime.datetime(2024, 5, 1), 100, "income", "Salary"))
+    assert len(synced) == 2
+
+
+DESCRIPTIONS = ["Salary", "Bought coffee", "Bought a book"]
+
+
+@pytest.fixture(params=["sqlite", "binary", "partitioned", "compressed"])
+def storage(request):
+    return request.param
+
+
+@pytest.fixture
+def add_transactions(cli_runner, config, invoke):
+    for date, amount, category, description in [
+        ("2024-05-01", "1000", "income", DESCRIPTIONS[0]),
+        ("2024-05-02", "200", "expenses", DESCRIPTIONS[1]),
+        ("2024-05-03", "400", "expenses", DESCRIPTIONS[2]),
+    ]:
+        invoke(
+            cli_runner, config, "add", "-d", date, "-a", amount, "-c", category, "-s", description
+        )
+
+
+@pytest.fixture
+def invoke(storage):
+    def invoke_command(cli_runner, config, command, *options):
+        return cli_runner.invoke(
+            main, [command, *options, "--storage", storage, "--config", config]
+        )
+
+    return invoke_command
+
+
+def test_pattern_matches_transaction_without_description(
+    cli_runner, config, invoke, add_transactions
+):
+    invoke(cli_runner, config, "add", "-d", "2024-05-04", "-a", "777", "-c", "expenses")
+    result = invoke(cli_runner, config, "find", "-s", "%")
+    assert result.exit_code == 0
+    assert "777" in result.output
+    assert all(description in result.output for description in DESCRIPTIONS)
+
+
+@pytest.mark.parametrize(
+    "scan",
+    [
+        lambda storage: storage.iter_data(),
+        lambda storage: storage.find_data(None, None, None, "income", None),
+    ],
+    ids=["iter", "find"],
+)
+@pytest.mark.skipif(not os.path.exists("/proc/self/maps"), reason="Needs Linux procfs")
+def test_binary_scan_stopped_early_leaves_files_closed(scan):
+    storage = BinaryStorage(PROJECT_DIR / "tests" / BinaryStorage.filename)
+    storage.write_data(
+        [Transaction(datetime.datetime(2024, 5, 1), i, "income", f"Row {i}") for i in range(3)]
+    )
+    rows = scan(storage)
+    assert next(rows) is not None
+    # Neither the files nor their maps are held by the suspended scan.
+    with open("/proc/self/maps", encoding="utf-8") as file:
+        maps = file.read()
+    assert str(storage.file) not in maps
+    assert str(storage.heap_file) not in maps
+    open_files = {os.path.realpath(f"/proc/self/fd/{fd}") for fd in os.listdir("/proc/self/fd")}
+    assert str(storage.file) not in open_files
@@ -0,0 +1,117 @@
+"""
+Tests for cache of parsed transactions.
+"""
+
+import datetime
+import marshal
+
+import pytest
+
+from personal_wallet.constants import PROJECT_DIR
+from personal_wallet.models.storage import CsvStorage
+from personal_wallet.models.transaction import Transaction
+from personal_wallet.models.wallet import Wallet
+
+
+@pytest.fixture
+def storage():
+    storage = CsvStorage(PROJECT_DIR / "tests" / CsvStorage.filename)
+    storage.extend_data(transaction(day, day * 100) for day in range(1, 6))
+    # First load reads csv file and saves the cache.
+    len(Wallet(storage))
+    return storage
+
+
+@pytest.fixture
+def parsed(storage, monkeypatch):
+    """Count reads of the csv file."""
+    reads = []
+    read_table = storage.read_table
+
+    def record():
+        reads.append(True)
+        return read_table()
+
+    monkeypatch.setattr(storage, "read_table", record)
+    return reads
+
+
+def test_load_from_cache(storage, parsed):
+    wallet = Wallet(storage)
+    assert wallet.table_cache_file.exists()
+    assert [t.amount for t in wallet.transactions] == [100, 200, 300, 400, 500]
+    assert wallet.transactions.category_names == ["expenses"]
+    assert parsed == []
+
+
+def test_changes_through_wallet_keep_cache_up_to_date(storage, parsed):
+    wallet = Wallet(storage)
+    wallet.add_transaction(transaction(6, 600))
+    wallet.update_transaction(1, None, 250, "income", None)
+    wallet.delete_transaction(0)
+    assert wallet.table_cache_file.journal_file.exists()
+
+    cached = Wallet(storage)
+    assert [t.as_dict() for t in cached.transactions] == [t.as_dict() for t in storage.iter_data()]
+    assert parsed == []
+    # Journal is folded into the cache once loaded.
+    assert not cached.table_cache_file.journal_file.exists()
+
+
+def test_appended_without_loading_transactions(storage, parsed):
+    Wallet(storage).add_transaction(transaction(6, 600))
+    assert [t.amount for t in Wallet(storage).transactions][-1] == 600
+    assert parsed == []
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        lambda storage: append_row(storage, "2024-05-07,700,expenses,Row 700\r\n"),
+        lambda storage: storage.write_data(storage.read_data()),
+    ],
+    ids=["appended", "replaced"],
+)
+def test_data_changed_behind_cache_is_read(storage, parsed, change):
+    change(storage)
+    assert len(Wallet(storage)) == len(storage.read_data())
+    assert parsed == [True]
+
+
+def test_bulk_append_removes_cache(storage, parsed):
+    wallet = Wallet(storage)
+    wallet.add_transactions([transaction(6, 600), transaction(7, 700)])
+    assert not wallet.table_cache_file.exists()
+    assert len(Wallet(storage)) == 7
+    assert parsed == [True]
+
+
+@pytest.mark.parametrize(
+    "damage",
+    [
+        lambda data: {**data, "version": 0},
+        lambda data: {k: v for k, v in data.items() if k != "dates"},
+    ],
+    ids=["other version", "missing column"],
+)
+def test_cache_of_other_version_or_damaged_is_ignored(storage, parsed, damage):
+    wallet = Wallet(storage)
+    data = marshal.loads(wallet.table_cache_file.file.read_bytes())
+    wallet.table_cache_file.file.write_bytes(marshal.dumps(damage(data)))
+    assert len(wallet) == 5
+    assert parsed == [True]
+
+
+def append_row(storage, row):
+    with open(storage.file, "a", encoding="utf-8", newline="") as csvfile:
+        csvfile.write(row)
+
+
+def transaction(day, amount):
+    return Transaction(datetime.datetime(2024, 5, day), amount, "expenses", f"Row {amount}")
+
+
+def test_amount_written_by_earlier_version_out_of_range(storage):
+    append_row(storage, f"2024-05-07,{2**63},income,Too much\r\n")
+    with pytest.raises(ValueError, match="out of range"):
+        len(Wallet(storage))
@@ -0,0 +1,76 @@
+"""
+Tests for columnar table of transactions.
+"""
+
+import datetime
+
+import pytest
+
+from personal_wallet.models.transaction import Transaction
+from personal_wallet.models.transaction_table import TransactionTable
+
+TRANSACTIONS = [
+    Transaction(datetime.datetime(2024, 5, 1), 1000, "income", "Salary"),
+    Transaction(datetime.datetime(2024, 5, 2), 200, "expenses", None),
+    Transaction(datetime.datetime(2024, 5, 3), 400, "expenses", "Bought a book"),
+]
+
+
+@pytest.fixture
+def table():
+    table = TransactionTable()
+    table.extend(TRANSACTIONS)
+    return table
+
+
+def test_rows_read_as_transactions(table):
+    assert len(table) == 3
+    assert [table[i].as_dict() for i in range(3)] == [t.as_dict() for t in TRANSACTIONS]
+    assert table[1].description is None
+    assert table[-1].amount == 400
+    assert [t.amount for t in table] == [1000, 200, 400]
+
+
+def test_categories_encoded_in_order_of_appearance(table):
+    assert table.category_names == ["income", "expenses"]
+    assert list(table.categories) == [0, 1, 1]
+
+
+def test_set_row(table):
+    table[0] = Transaction(datetime.datetime(2024, 6, 1), 50, "savings", None)
+    assert table[0].as_dict() == {
+        "date": "2024-06-01",
+        "amount": 50,
+        "category": "savings",
+        "description": None,
+    }
+    assert table.category_names == ["income", "expenses", "savings"]
+    assert [t.amount for t in table] == [50, 200, 400]
+
+
+def test_pop(table):
+    popped = table.pop(1)
+    assert popped.amount == 200 and popped.description is None
+    assert [t.description for t in table] == ["Salary", "Bought a book"]
+    assert len(table.dates) == len(table.categories) == len(table.descriptions) == 2
+
+
+def test_dict_round_trip(table):
+    loaded = TransactionTable.from_dict(table.to_dict())
+    assert [t.as_dict() for t in loaded] == [t.as_dict() for t in TRANSACTIONS]
+    assert loaded.category_codes == {"income": 0, "expenses": 1}
+    loaded.append(Transaction(datetime.datetime(2024, 5, 4), 10, "income", None))
+    assert loaded[3].category == "income"
+
+
+def test_empty_table_round_trip():
+    assert len(TransactionTable.from_dict(TransactionTable().to_dict())) == 0
+
+
+@pytest.mark.parametrize("amount", [2**63, -(2**63) - 1])
+def test_amount_out_of_range_leaves_table_unchanged(table, amount):
+    with pytest.raises(ValueError, match="out of range"):
+        table.append_row(datetime.date(2024, 5, 4).toordinal(), amount, "income", None)
+    with pytest.raises(ValueError, match="out of range"):
+        table.set_row(0, datetime.date(2024, 5, 4).toordinal(), amount, "income", None)
+    assert [t.as_dict() for t in table] == [t.as_dict() for t in TRANSACTIONS]
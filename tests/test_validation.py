@@ -101,6 +101,12 @@ class TestAmountValidation:
         result = cli_runner.invoke(main, [*command, "-a", negative_amount, "--config", config])
         value_is_negative(result)
 
+    @pytest.mark.parametrize("command", [["add"], ["update", "-i", "0"]])
+    def test_amount_too_large_to_store(self, cli_runner, config, command):
+        result = cli_runner.invoke(main, [*command, "-a", str(2**63), "--config", config])
+        assert "Error: Invalid value" in result.output
+        assert "is not in the range 0<=x<=9223372036854775807" in result.output
+
     @pytest.mark.parametrize("valid_amount_range", ["100..300", "0..100"])
     def test_valid_amount_range(self, cli_runner, config, valid_amount_range):
         result = cli_runner.invoke(main, ["find", "-a", valid_amount_range, "--config", config])
@@ -163,7 +169,8 @@ def value_is_invalid_int(result):
 
 def value_is_negative(result):
     assert "Error: Invalid value" in result.output
-    assert "is not in the range x>=0" in result.output
+    # Amounts stored are bounded from above as well.
+    assert "is not in the range x>=0" in result.output or "0<=x<=" in result.output
 
 
 def value_is_invalid_range(result):